@@ -1,200 +1,62 @@
+import sys
+import time
+# Time the game started (python Snake.py --startup-time shows how long each part of the launch took)
+started = time.perf_counter()
 import pygame
-from random import randint
-from tkinter import *
-
-# Length in pixels of each square
-BOX = 32
-# Colors used
-RED = (255, 0, 0)
-BLUE = (0, 100, 255)
-GREEN = (0, 160, 0)
-BLACK = (0, 0, 0)
-WHITE = (255, 255, 255)
-YELLOW = (255, 255, 0)
-
-# Default grid dimensions
-num_col = 17
-num_row = 15
-# Default number of players
-num_player = 1
+import config
+import fonts
+from autopilot import Autopilot
+from engine import GameState
+from replay import Recorder
+from timing import Profiler
+from render import BOX, RED, BLUE, GREEN, WHITE, YELLOW, Renderer, Timer, is_fullscreen, text_cache
+
+# Settings of the last game (17x15 and one player the first time, see config.py)
+saved = config.load()
+# Grid dimensions
+num_col = saved['columns']
+num_row = saved['rows']
+# Number of players
+num_player = saved['players']
+# True to start in fullscreen (the window was fullscreen when the game was closed)
+fullscreen = bool(saved['fullscreen'])
 # Width and Height of the game grid in pixels
 game_w = num_col * BOX
 game_h = num_row * BOX
 # Width and Height of the window in pixels (changes depending on window mode)
 win_width = game_w
 win_height = game_h + 75
-# Initial apple position
-applec = 3 * num_col // 4
-appler = num_row // 2
-
-# Initialize pygame
-pygame.init()
+# Number of times per second the snakes move
+TICK_RATE = 5
+# Maximum number of frames drawn per second
+FPS = 60
+
+# Initialize the parts of pygame the game uses (sound and joysticks are not used and can be slow to start)
+imported = time.perf_counter()
+pygame.display.init()
 pygame.font.init()
-# Create fonts
-FONT = pygame.font.SysFont('comicsans', 30)
-FONT_50 = pygame.font.SysFont('comicsans', 50)
-
-
-# Drawing the grid
-def grid(win):
-    # Grid dimensions depend on window size
-    w, h = win.get_size()
-    x = w / 2 - game_w / 2
-    y = (h - 75) / 2 - game_h / 2
-    # Draw a rectangle which is the outline of the entire game grid
-    r1 = pygame.Rect((int(x), int(y)), (game_w, game_h))
-    pygame.draw.rect(win, (255, 255, 255), r1, 1)
-
-    # Draw a rectangle for every two columns (one rectangle = two lines = two columns drawn)
-    for n in range(1, num_col // 2 + 1):
-        r_x = x + (2 * n - 1) * BOX
-        r_n = pygame.Rect((int(r_x), int(y)), (BOX, game_h))
-        pygame.draw.rect(win, (255, 255, 255), r_n, 1)
-
-    # Draw a rectangle for every two rows (one rectangle = two lines = two rows drawn)
-    for n in range(1, num_row // 2 + 1):
-        r_y = y + (2 * n - 1) * BOX
-        r_n = pygame.Rect((int(x), int(r_y)), (game_w, BOX))
-        pygame.draw.rect(win, (255, 255, 255), r_n, 1)
-
-
-# General function for drawing a solid square based on column and row alone (no need to calculate pixels every time)
-def square(win, color, col, row, width=0):
-    w, h = win.get_size()
-    x = w / 2 - game_w / 2
-    y = (h - 75) / 2 - game_h / 2
-    # Important to put int(x) and int(y) to round them to the nearest integer (pixel number)
-    square1 = pygame.Rect((int(x) + col * BOX, int(y) + row * BOX), (BOX, BOX))
-    pygame.draw.rect(win, color, square1, width)
-
-
-# Draw the window
-def draw(win):
-    win.fill(BLACK)
-    grid(win)
-
-
-# Create a class for the snake object (every snake has the same attributes)
-class Snake:
-    # Declare the attributes that each snake has
-    def __init__(self, start_col, start_row, color):
-        # Snake body is a list that contains the position of each body part as tuples (column, row)
-        self.body = [(start_col, start_row), (start_col - 1, start_row), (start_col - 2, start_row)]
-        # Dictionary that stores the position at which each body part has to turn and the turn itself
-        # (column, row) = (right, left, up or down)
-        self.turns = {}
-        # Each body part has a speed on the x axis and on the y axis
-        # Index of speeds is the same as index of body parts
-        self.speed_x = [0, 0, 0]
-        self.speed_y = [0, 0, 0]
-        # Temporary variable that stores the turn at one precise moment
-        self.dir = 0
-        # Snakes have different colors
-        self.color = color
-
-    # Moving the snake by one box
-    def move_snake(self):
-        # For each body part on the snake
-        for i in range(len(self.body)):
-            # Reverse the order to move tail first, in order to remove turns that are not in body anymore
-            ind = -i - 1
-            (col, row) = self.body[ind]
-            # Check if the body part position corresponds to a turn
-            if (col, row) in self.turns.keys():
-                # Get the turn and change speed accordingly
-                self.dir = self.turns.get((col, row))
-                if self.dir == 'r':
-                    self.speed_x[ind] = 1
-                    self.speed_y[ind] = 0
-                if self.dir == 'l':
-                    self.speed_x[ind] = -1
-                    self.speed_y[ind] = 0
-                if self.dir == 'u':
-                    self.speed_x[ind] = 0
-                    self.speed_y[ind] = -1
-                if self.dir == 'd':
-                    self.speed_x[ind] = 0
-                    self.speed_y[ind] = 1
-
-            # Change position of body part based on speed
-            col += self.speed_x[ind]
-            row += self.speed_y[ind]
-            self.body[ind] = (col, row)
-
-            # Delete turns that are gone (turns that are outside of the snake body)
-            for (col, row) in list(self.turns):
-                if (col, row) not in self.body:
-                    self.turns.pop((col, row))
-
-    # Draw a square for every body part of the snake
-    def draw_snake(self, win):
-        for (col, row) in self.body:
-            square(win, self.color, col, row)
-
-    # Check if snake lost (boolean function -> if snake dies, returns True, otherwise, False)
-    def lose(self):
-        # Check if snake head is outside of game grid
-        (col, row) = self.body[0]
-        if (col, row) in self.body[1:]:
-            return True
-        if col < 0 or row < 0 or col >= num_col or row >= num_row:
-            return True
-        # Default return value of function
-        return False
-
-    # Check collision between snake head and apple (boolean function)
-    def check_eat(self, win):
-        # Get window dimensions
-        w, h = win.get_size()
-        x = w / 2 - game_w / 2
-        y = (h - 75) / 2 - game_h / 2
-        # Get snake head position
-        (col, row) = self.body[0]
-        # Get rectangles that represent the snake head and the apple
-        head = pygame.Rect((int(x) + col * BOX, int(y) + row * BOX), (BOX, BOX))
-        apple1 = pygame.Rect((int(x) + applec * BOX, int(y) + appler * BOX), (BOX, BOX))
-        # If the two rectangles overlap, there is collision
-        if head.colliderect(apple1):
-            # Add one body part to the tail depending on the tail's current speed
-            (col, row) = self.body[-1]
-            # Add new tail one square behind current tail
-            self.body.append((col - self.speed_x[-1], row - self.speed_y[-1]))
-            # Add the current tail speed at the end of the speed list for the new tail
-            self.speed_x.append(self.speed_x[-1])
-            self.speed_y.append(self.speed_y[-1])
-            return True
-        # If no collision, function returns False
-        return False
-
-
-# Create new apple
-def apple(win, body1, body2):
-    while True:
-        # Change the apple position globally, not just locally
-        global applec, appler
-        applec = randint(0, num_col - 1)
-        appler = randint(0, num_row - 1)
-        # Get a position that is not already in a snake
-        if (applec, appler) not in body1 and (applec, appler) not in body2:
-            break
-    # Draw red apple square and update display
-    square(win, RED, applec, appler)
-
-
-# Main function
-def main():
-    global num_col, num_row, game_w, game_h, win_width, win_height, applec, appler
-
-    # Create window
-    pygame.display.set_mode((win_width, win_height))
-    pygame.display.set_caption("Snake")
-    icon = pygame.image.load('data/snake.png')
-    pygame.display.set_icon(icon)
+initialized = time.perf_counter()
+# Create fonts (the font files found are cached, see fonts.py)
+FONT = fonts.load('comicsans', 30)
+FONT_50 = fonts.load('comicsans', 50)
+fonts_loaded = time.perf_counter()
+
+
+# Score texts shown under the grid depending on number of players: (text, color, x offset from the left of the grid)
+def score_texts(state):
+    if num_player == 1:
+        return [("SCORE : " + str(state.score), BLUE, 20)]
+    return [("GREEN : " + str(state.wins[1]), GREEN, (num_col - 6) * BOX), ("BLUE : " + str(state.wins[0]), BLUE, 20)]
+
+
+# Settings window (grid size, number of players and fullscreen), tkinter is only loaded when it is shown
+def settings():
+    from tkinter import Button, Checkbutton, Entry, IntVar, Label, LabelFrame, Radiobutton, StringVar, Tk
 
     # Create pop-up window
     root = Tk()
     root.title("Game Settings")
-    root.iconbitmap("data/snake.ico")
+    root.iconbitmap(config.data_path('snake.ico'))
     root.resizable(width=False, height=False)
 
     # Check if input is valid
@@ -244,8 +106,9 @@ def main():
 
     # What to do when button is clicked
     def click():
-        global num_col, num_row, num_player
+        global num_col, num_row, num_player, fullscreen
         num_player = player_num.get()
+        fullscreen = bool(full_value.get())
         num_col = cols.get()
         num_col = int(num_col[:2])
         num_row = rows.get()
@@ -290,13 +153,19 @@ def main():
     frame2.grid(row=1, column=0, padx=10, pady=10)
     # Select number of players
     player_num = IntVar()
-    player_num.set("1")
+    player_num.set(num_player)
     single = Radiobutton(frame2, text="Singleplayer", variable=player_num, value=1, font="Verdana 16 bold",
                          bg="white", fg="#006170", activebackground="white", activeforeground="#038ca1")
     single.grid(row=0, column=0, sticky="w")
     multi = Radiobutton(frame2, text="Multiplayer", variable=player_num, value=2,  font="Verdana 16 bold",
                         bg="white", fg="#006170", activebackground="white", activeforeground="#038ca1")
     multi.grid(row=1, column=0, sticky="w")
+    # Start in fullscreen (F11 and Escape still switch during the game)
+    full_value = IntVar()
+    full_value.set(int(fullscreen))
+    full = Checkbutton(frame2, text="Fullscreen", variable=full_value, font="Verdana 16", bg="white",
+                       fg="#006170", activebackground="white", activeforeground="#038ca1")
+    full.grid(row=2, column=0, sticky="w")
 
     # Button
     button = Button(mainframe, text="Apply", font="Verdana 16", state="normal", cursor="arrow", command=click,
@@ -312,41 +181,71 @@ def main():
     # Tkinter loop to keep window open
     root.mainloop()
 
+
+# Main function, soak is a soak.Soak when the game is played by bots without a window
+# quick starts with the settings of the last game without showing the settings window
+def main(soak=None, quick=False):
+    global num_col, num_row, num_player, fullscreen, game_w, game_h, win_width, win_height
+
+    pygame.display.set_caption("Snake")
+    icon = pygame.image.load(config.data_path('snake.png'))
+    pygame.display.set_icon(icon)
+
+    if soak is not None:
+        # Soak test (soak.py): no settings window, everything comes from the command line
+        (num_col, num_row, num_player) = (soak.num_col, soak.num_row, soak.num_player)
+        fullscreen = False
+    elif not quick:
+        # Create window (empty while the settings window is open, closing it closes the game)
+        pygame.display.set_mode((win_width, win_height))
+        settings()
+
     # Width and Height of the game grid in pixels
     game_w = num_col * BOX
     game_h = num_row * BOX
     # Width and Height of the window in pixels (changes depending on window mode)
     win_width = game_w
     win_height = game_h + 75
-    # Initial apple position
-    applec = 3 * num_col // 4
-    appler = num_row // 2
 
-    # Make resizable window
-    win = pygame.display.set_mode((win_width, win_height), pygame.RESIZABLE)
-
-    # Initialize each score as 0
-    b_score = 0
-    g_score = 0
-    score = 0
+    # Make resizable window, or fullscreen
+    if fullscreen:
+        win = pygame.display.set_mode((win_width, win_height), pygame.FULLSCREEN)
+    else:
+        win = pygame.display.set_mode((win_width, win_height), pygame.RESIZABLE)
+    # Draws on the window only what changed
+    renderer = Renderer(win, num_col, num_row, FONT_50)
+    # Time spent drawing each frame and time between a key and the move it asked are shown in the window title
+    # when F3 is pressed
+    show_time = False
+    input_lag = Timer()
+
+    # Game rules, snakes, apple and scores (each score starts at 0)
+    state = GameState(num_col, num_row, num_player, None if soak is None else soak.seed)
+    # Turns taken on every tick are saved in the replays folder (not during a soak test unless asked, hours of
+    # ticks would be saved again at the end of every round)
+    recorder = Recorder(state) if soak is None or soak.record else None
+    # Time spent in each part of a frame, shown on the window while F4 is on and saved to profile.csv when the game
+    # closes (profiled keeps the last profiler once profiling is turned off)
+    profiler = None
+    profiled = None
+    overlay_font = None
+    # Snakes played by the autopilot (F1 for the first snake, F2 for the second one), kept between rounds
+    pilots = [None] * num_player
+    if soak is not None:
+        pilots = soak.pilots(num_player)
 
     # Game loop
     game = True
     while game:
 
-        # Create snakes
-        if num_player == 1:
-            snakes = [Snake(4, num_row // 2, BLUE)]
-        elif num_player == 2:
-            snakes = [Snake(4, num_row // 2 - 1, BLUE), Snake(4, num_row // 2 + 1, GREEN)]
-
-        # Create list of losers in case of tie
-        loser = []
+        # Create snakes and put the apple back to its initial position
+        state.reset()
+        snakes = state.snakes
 
         # Initialize a clock that will regulate number of frames per second
         clock = pygame.time.Clock()
-        # Draw window (black background + grid)
-        draw(win)
+        # Draw window (black background + grid, apple, snakes and scores)
+        renderer.full(state, score_texts(state))
 
         # Loops activated
         run = True
@@ -355,6 +254,10 @@ def main():
         p1 = False
         if num_player == 2:
             p2 = False
+        # Soak test: no waiting for the players, the bots start right away
+        if soak is not None:
+            state.start()
+            start = False
 
         # While starting loop is active
         while start:
@@ -364,20 +267,8 @@ def main():
             w, h = win.get_size()
             x = w / 2 - game_w / 2
             y = (h - 75) / 2 - game_h / 2
-            # Print the score based on window size and number of players
-            if num_player == 1:
-                score_y = y + game_h + 20
-                score_x = x + 20
-                score_text = FONT_50.render("SCORE : " + str(score), True, BLUE)
-                win.blit(score_text, (int(score_x), int(score_y)))
-            elif num_player == 2:
-                score_y = y + game_h + 20
-                score1_x = x + 20
-                score1_text = FONT_50.render("BLUE : " + str(b_score), True, BLUE)
-                score2_x = x + (num_col - 6) * BOX
-                score2_text = FONT_50.render("GREEN : " + str(g_score), True, GREEN)
-                win.blit(score2_text, (int(score2_x), int(score_y)))
-                win.blit(score1_text, (int(score1_x), int(score_y)))
+            # Print the score if it changed
+            renderer.scores(score_texts(state))
 
             if num_player == 1:
                 if not p1:
@@ -386,7 +277,7 @@ def main():
                     ready_y = y + (num_row // 2 - 1) * BOX
                     text_box = pygame.Rect((int(ready_x) - 5, int(ready_y) - 5), (340, 30))
                     pygame.draw.rect(win, YELLOW, text_box)
-                    ready_text = FONT.render('When ready, press the right arrow', True, BLUE)
+                    ready_text = text_cache.render(FONT, 'When ready, press the right arrow', BLUE)
                     win.blit(ready_text, (int(ready_x), int(ready_y)))
             elif num_player == 2:
                 # If player 1 not ready
@@ -396,7 +287,7 @@ def main():
                     ready1_y = y + (num_row // 2 - 3) * BOX
                     text_box1 = pygame.Rect((int(ready_x) - 5, int(ready1_y) - 5), (230, 30))
                     pygame.draw.rect(win, YELLOW, text_box1)
-                    ready1_text = FONT.render('When ready, press "d"', True, BLUE)
+                    ready1_text = text_cache.render(FONT, 'When ready, press "d"', BLUE)
                     win.blit(ready1_text, (int(ready_x), int(ready1_y)))
                 # Same as player 1
                 if not p2:
@@ -404,14 +295,9 @@ def main():
                     ready2_y = y + (num_row // 2 + 3) * BOX
                     text_box2 = pygame.Rect((int(ready_x) - 5, int(ready2_y) - 5), (340, 30))
                     pygame.draw.rect(win, YELLOW, text_box2)
-                    ready2_text = FONT.render('When ready, press the right arrow', True, GREEN)
+                    ready2_text = text_cache.render(FONT, 'When ready, press the right arrow', GREEN)
                     win.blit(ready2_text, (int(ready_x), int(ready2_y)))
 
-            # Draw apple
-            square(win, RED, applec, appler)
-            # Draw each snake
-            for snake in snakes:
-                snake.draw_snake(win)
             # Scan for events
             for event in pygame.event.get():
                 # Quit
@@ -421,20 +307,23 @@ def main():
                     run = False
                     start = False
                 # Get new window size if window is maximized or minimized and not when window is fullscreen
-                if event.type == pygame.VIDEORESIZE and win.get_flags() != -2147483648:
+                if event.type == pygame.VIDEORESIZE and not is_fullscreen(win):
                     scrsize = event.size
                     win = pygame.display.set_mode(scrsize, pygame.RESIZABLE)
-                    draw(win)
+                    renderer.set_window(win)
+                    renderer.full(state, score_texts(state))
                 # If a key is pressed
                 if event.type == pygame.KEYDOWN:
                     # Fullscreen when F11 is pressed
-                    if event.key == pygame.K_F11 and win.get_flags() != -2147483648:
+                    if event.key == pygame.K_F11 and not is_fullscreen(win):
                         win = pygame.display.set_mode((win_width, win_height), pygame.FULLSCREEN)
-                        draw(win)
+                        renderer.set_window(win)
+                        renderer.full(state, score_texts(state))
                     # Escape -> resize window out of fullscreen
-                    if event.key == pygame.K_ESCAPE and win.get_flags() == -2147483648:
+                    if event.key == pygame.K_ESCAPE and is_fullscreen(win):
                         win = pygame.display.set_mode((win_width, win_height), pygame.RESIZABLE)
-                        draw(win)
+                        renderer.set_window(win)
+                        renderer.full(state, score_texts(state))
 
                     # If single player is ready
                     if num_player == 1 and event.key == pygame.K_RIGHT:
@@ -458,17 +347,13 @@ def main():
                 if num_player == 1 and p1:
                     # 3 second countdown
                     for i in range(3):
-                        count = FONT_50.render(str(3 - i), True, WHITE)
+                        count = text_cache.render(FONT_50, str(3 - i), WHITE)
                         win.blit(count, (w // 2 - 10, (h - 110 + i * 70) // 2))
                         pygame.display.flip()
                         pygame.time.delay(750)
 
-                    # Set all body part horizontal speeds to 1 to make snake go to the right
-                    (col1, row1) = snakes[0].body[0]
-                    snakes[0].turns[(col1, row1)] = 'r'
-                    snakes[0].speed_x[0] = 1
-                    snakes[0].speed_x[1] = 1
-                    snakes[0].speed_x[2] = 1
+                    # Make snake go to the right
+                    state.start()
 
                     # Break from start loop
                     start = False
@@ -477,212 +362,265 @@ def main():
                 elif num_player == 2 and p1 and p2:
                     # 3 second countdown
                     for i in range(3):
-                        count = FONT_50.render(str(3 - i), True, WHITE)
+                        count = text_cache.render(FONT_50, str(3 - i), WHITE)
                         win.blit(count, (w // 2 - 10, (h - 175 + i * 75) // 2))
                         pygame.display.flip()
                         pygame.time.delay(750)
 
-                    # Set all body part horizontal speeds to 1 and make everyone go to the right
-                    (col1, row1) = snakes[0].body[0]
-                    snakes[0].turns[(col1, row1)] = 'r'
-                    snakes[0].speed_x[0] = 1
-                    snakes[0].speed_x[1] = 1
-                    snakes[0].speed_x[2] = 1
-
-                    (col2, row2) = snakes[1].body[0]
-                    snakes[1].turns[(col2, row2)] = 'r'
-                    snakes[1].speed_x[0] = 1
-                    snakes[1].speed_x[1] = 1
-                    snakes[1].speed_x[2] = 1
+                    # Make everyone go to the right
+                    state.start()
 
                     # Break from start loop
                     start = False
             # Update display every loop
-            pygame.display.flip()
+            renderer.flip()
 
         # Redraw window to get rid of previous text boxed and transparent rectangles
-        draw(win)
+        renderer.full(state, score_texts(state))
+        # Time (in milliseconds) not played yet, the clock restarts so the countdown is not played
+        lag = 0
+        clock.tick()
         # Run loop (where game is playable)
         while run:
-            # Set maximum of 5 frames per second
-            clock.tick(5)
-
-            # Re-draw window to cover previous frame
-            draw(win)
-            # Draw apple
-            square(win, RED, applec, appler)
+            # Draw up to FPS frames per second, the snakes move TICK_RATE times per second
+            # (no more than 5 ticks in a row if a frame took too long, e.g. while the window is resized)
+            if soak is None:
+                lag = min(lag + clock.tick(FPS), 5000 / TICK_RATE)
+            else:
+                # No frame rate limit, two frames per tick (the second one is interpolated half way)
+                clock.tick()
+                lag += 500 / TICK_RATE
+            if profiler is not None:
+                profiler.mark('wait')
 
             # Get window size
             w, h = win.get_size()
-            x = w / 2 - game_w / 2
-            y = (h - 75) / 2 - game_h / 2
-
-            # Print the score based on window size and number of players
-            if num_player == 1:
-                score_y = y + game_h + 20
-                score_x = x + 20
-                score_text = FONT_50.render("SCORE : " + str(score), True, BLUE)
-                win.blit(score_text, (int(score_x), int(score_y)))
-            elif num_player == 2:
-                score_y = y + game_h + 20
-                score1_x = x + 20
-                score1_text = FONT_50.render("BLUE : " + str(b_score), True, BLUE)
-                score2_x = x + (num_col - 6) * BOX
-                score2_text = FONT_50.render("GREEN : " + str(g_score), True, GREEN)
-                win.blit(score2_text, (int(score2_x), int(score_y)))
-                win.blit(score1_text, (int(score1_x), int(score_y)))
 
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     game = False
                     run = False
-                if event.type == pygame.VIDEORESIZE and win.get_flags() != -2147483648:
+                if event.type == pygame.VIDEORESIZE and not is_fullscreen(win):
                     scrsize = event.size
                     win = pygame.display.set_mode(scrsize, pygame.RESIZABLE)
-                    draw(win)
+                    renderer.set_window(win)
+                    renderer.full(state, score_texts(state))
 
                 if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_ESCAPE and win.get_flags() == -2147483648:
+                    if event.key == pygame.K_ESCAPE and is_fullscreen(win):
                         win = pygame.display.set_mode((win_width, win_height), pygame.RESIZABLE)
-                        draw(win)
-                    elif event.key == pygame.K_F11 and win.get_flags() != -2147483648:
+                        renderer.set_window(win)
+                        renderer.full(state, score_texts(state))
+                    elif event.key == pygame.K_F11 and not is_fullscreen(win):
                         win = pygame.display.set_mode((win_width, win_height), pygame.FULLSCREEN)
-                        draw(win)
+                        renderer.set_window(win)
+                        renderer.full(state, score_texts(state))
+                    elif event.key == pygame.K_F3:
+                        show_time = not show_time
+                        pygame.display.set_caption("Snake")
+                    elif event.key == pygame.K_F1 or (event.key == pygame.K_F2 and len(pilots) == 2):
+                        ind = 0 if event.key == pygame.K_F1 else 1
+                        pilots[ind] = Autopilot(ind) if pilots[ind] is None else None
+                    elif event.key == pygame.K_F4:
+                        if profiler is None:
+                            profiler = profiled = Profiler()
+                            if overlay_font is None:
+                                overlay_font = fonts.load('couriernew', 16)
+                        else:
+                            profiler.clear(renderer, state)
+                            profiler = None
+                        state.profiler = renderer.profiler = profiler
 
                     if num_player == 1:
                         # Check if player turns
-                        if event.key == pygame.K_RIGHT and snakes[0].speed_x[0] == 0:
-                            (col, row) = snakes[0].body[0]
-                            snakes[0].turns[(col, row)] = 'r'
-                        elif event.key == pygame.K_LEFT and snakes[0].speed_x[0] == 0:
-                            (col, row) = snakes[0].body[0]
-                            snakes[0].turns[(col, row)] = 'l'
-                        if event.key == pygame.K_UP and snakes[0].speed_y[0] == 0:
-                            (col, row) = snakes[0].body[0]
-                            snakes[0].turns[(col, row)] = 'u'
-                        elif event.key == pygame.K_DOWN and snakes[0].speed_y[0] == 0:
-                            (col, row) = snakes[0].body[0]
-                            snakes[0].turns[(col, row)] = 'd'
+                        if event.key == pygame.K_RIGHT:
+                            snakes[0].turn('r', pygame.time.get_ticks())
+                        elif event.key == pygame.K_LEFT:
+                            snakes[0].turn('l', pygame.time.get_ticks())
+                        if event.key == pygame.K_UP:
+                            snakes[0].turn('u', pygame.time.get_ticks())
+                        elif event.key == pygame.K_DOWN:
+                            snakes[0].turn('d', pygame.time.get_ticks())
 
                     elif num_player == 2:
                         # Check if player one turns (keys w a s d)
-                        if event.key == pygame.K_d and snakes[0].speed_x[0] == 0:
-                            (col, row) = snakes[0].body[0]
-                            snakes[0].turns[(col, row)] = 'r'
-                        elif event.key == pygame.K_a and snakes[0].speed_x[0] == 0:
-                            (col, row) = snakes[0].body[0]
-                            snakes[0].turns[(col, row)] = 'l'
-                        if event.key == pygame.K_w and snakes[0].speed_y[0] == 0:
-                            (col, row) = snakes[0].body[0]
-                            snakes[0].turns[(col, row)] = 'u'
-                        elif event.key == pygame.K_s and snakes[0].speed_y[0] == 0:
-                            (col, row) = snakes[0].body[0]
-                            snakes[0].turns[(col, row)] = 'd'
+                        if event.key == pygame.K_d:
+                            snakes[0].turn('r', pygame.time.get_ticks())
+                        elif event.key == pygame.K_a:
+                            snakes[0].turn('l', pygame.time.get_ticks())
+                        if event.key == pygame.K_w:
+                            snakes[0].turn('u', pygame.time.get_ticks())
+                        elif event.key == pygame.K_s:
+                            snakes[0].turn('d', pygame.time.get_ticks())
                         # Check if player two turns (keys u l d r)
-                        if event.key == pygame.K_RIGHT and snakes[1].speed_x[0] == 0:
-                            (col, row) = snakes[1].body[0]
-                            snakes[1].turns[(col, row)] = 'r'
-                        elif event.key == pygame.K_LEFT and snakes[1].speed_x[0] == 0:
-                            (col, row) = snakes[1].body[0]
-                            snakes[1].turns[(col, row)] = 'l'
-                        if event.key == pygame.K_UP and snakes[1].speed_y[0] == 0:
-                            (col, row) = snakes[1].body[0]
-                            snakes[1].turns[(col, row)] = 'u'
-                        elif event.key == pygame.K_DOWN and snakes[1].speed_y[0] == 0:
-                            (col, row) = snakes[1].body[0]
-                            snakes[1].turns[(col, row)] = 'd'
-
-            # Move the snake both at the same time to get true ties
-            for snake in snakes:
-                snake.move_snake()
-
-            # Actions to do for each snake
-            for ind, snake in enumerate(snakes):
-                snake.draw_snake(win)
-
-                # Try/Except block to avoid index errors when snakes lose
-                try:
-                    if snake.lose():
-                        # Check which snake lost
-                        if ind == 0:
-                            loser.append(ind)
-                        elif ind == 1:
-                            loser.append(ind)
-                # If there's an IndexError, don't terminate the program, just ignore it
-                except IndexError:
-                    pass
-
-                # Check if the snake ate
-                if snake.check_eat(win):
-                    if num_player == 1:
-                        score += 1
-                        apple(win, snakes[0].body, [])
-                    elif num_player == 2:
-                        apple(win, snakes[0].body, snakes[1].body)
-
-            try:
-                # Check if the snakes head has the same position as any of the two snakes' body parts
-                for a in range(len(snakes[0].body)):
-                    if snakes[1].body[0] == snakes[0].body[a]:
-                        loser.append(1)
-                if num_player == 2:
-                    for b in range(len(snakes[1].body)):
-                        if snakes[0].body[0] == snakes[1].body[b]:
-                            loser.append(0)
-            except IndexError:
-                pass
-
-            # Game over
-            if len(loser) != 0:
-                # Check for tie
-                if len(loser) == 2:
-                    # Draw turquoise square on both heads if they collided with each other
-                    (head_x, head_y) = snakes[0].body[0]
-                    (head2_x, head2_y) = snakes[1].body[0]
-                    if (head_x, head_y) == (head2_x, head2_y):
-                        square(win, (0, 200, 150), head_x, head_y)
-                    # Display text box
-                    text_box = pygame.Rect((w // 2 - 50, (h - 100) // 2 - 15), (80, 60))
-                    pygame.draw.rect(win, YELLOW, text_box)
-                    text = FONT_50.render('TIE', True, RED)
-                    win.blit(text, (w // 2 - 40, (h - 100) // 2))
-                # If no tie
-                elif len(loser) == 1 and num_player == 2:
-                    # Check who lost, increase score of opponent and display text box
-                    if loser[0] == 0:
-                        text_box = pygame.Rect((w // 2 - 115, (h - 100) // 2 - 15), (255, 60))
+                        if event.key == pygame.K_RIGHT:
+                            snakes[1].turn('r', pygame.time.get_ticks())
+                        elif event.key == pygame.K_LEFT:
+                            snakes[1].turn('l', pygame.time.get_ticks())
+                        if event.key == pygame.K_UP:
+                            snakes[1].turn('u', pygame.time.get_ticks())
+                        elif event.key == pygame.K_DOWN:
+                            snakes[1].turn('d', pygame.time.get_ticks())
+
+            if profiler is not None:
+                profiler.mark('events')
+
+            # Play every tick that is due, keys pressed during this frame are used by the next tick
+            while run and lag >= 1000 / TICK_RATE:
+                lag -= 1000 / TICK_RATE
+                # Move the snakes, check if they lost or ate and respawn the apple
+                # The autopilot turns its snakes just before they move
+                for pilot in pilots:
+                    if pilot is not None:
+                        direction = pilot.decide(state)
+                        if direction is not None:
+                            snakes[pilot.ind].turn(direction)
+                if profiler is not None:
+                    profiler.mark('bot')
+                loser = state.step()
+                if recorder is not None:
+                    recorder.record()
+                if soak is not None:
+                    soak.tick(state)
+                    if soak.finished():
+                        game = False
+                        run = False
+                if profiler is not None:
+                    profiler.mark('record')
+                for snake in snakes:
+                    if snake.input_time is not None:
+                        input_lag.add((pygame.time.get_ticks() - snake.input_time) / 1000)
+
+                # Draw only what changed: new heads, removed tails, new apple and scores
+                renderer.tick(state, score_texts(state))
+                if profiler is not None:
+                    profiler.mark('draw')
+
+                # Game over
+                if state.over():
+                    # Check for tie
+                    if len(loser) == 2:
+                        # Draw turquoise square on both heads if they collided with each other
+                        (head_x, head_y) = snakes[0].body[0]
+                        (head2_x, head2_y) = snakes[1].body[0]
+                        if (head_x, head_y) == (head2_x, head2_y):
+                            renderer.square((0, 200, 150), head_x, head_y)
+                        # Display text box
+                        text_box = pygame.Rect((w // 2 - 50, (h - 100) // 2 - 15), (80, 60))
                         pygame.draw.rect(win, YELLOW, text_box)
-                        text = FONT_50.render('GREEN WINS', True, GREEN)
-                        win.blit(text, (w // 2 - 100, (h - 100) // 2))
-                        g_score += 1
-                    elif loser[0] == 1:
+                        text = text_cache.render(FONT_50, 'TIE', RED)
+                        win.blit(text, (w // 2 - 40, (h - 100) // 2))
+                    # If no tie
+                    elif len(loser) == 1 and num_player == 2:
+                        # Check who lost and display text box (opponent's score was increased by the game)
+                        if loser[0] == 0:
+                            text_box = pygame.Rect((w // 2 - 115, (h - 100) // 2 - 15), (255, 60))
+                            pygame.draw.rect(win, YELLOW, text_box)
+                            text = text_cache.render(FONT_50, 'GREEN WINS', GREEN)
+                            win.blit(text, (w // 2 - 100, (h - 100) // 2))
+                        elif loser[0] == 1:
+                            text_box = pygame.Rect((w // 2 - 115, (h - 100) // 2 - 15), (225, 60))
+                            pygame.draw.rect(win, YELLOW, text_box)
+                            text = text_cache.render(FONT_50, 'BLUE WINS', BLUE)
+                            win.blit(text, (w // 2 - 100, (h - 100) // 2))
+                    elif num_player == 1:
                         text_box = pygame.Rect((w // 2 - 115, (h - 100) // 2 - 15), (225, 60))
                         pygame.draw.rect(win, YELLOW, text_box)
-                        text = FONT_50.render('BLUE WINS', True, BLUE)
+                        text = text_cache.render(FONT_50, 'SCORE : ' + str(state.score), BLUE)
                         win.blit(text, (w // 2 - 100, (h - 100) // 2))
-                        b_score += 1
-                elif len(loser) == 1 and num_player == 1:
-                    text_box = pygame.Rect((w // 2 - 115, (h - 100) // 2 - 15), (225, 60))
-                    pygame.draw.rect(win, YELLOW, text_box)
-                    text = FONT_50.render('SCORE : ' + str(score), True, BLUE)
-                    win.blit(text, (w // 2 - 100, (h - 100) // 2))
-                    score = 0
-                # Wait 3 seconds and reset the game
-                pygame.display.flip()
-                pygame.time.delay(2500)
-                applec = 3 * num_col // 4
-                appler = num_row // 2
-                snakes = []
-                run = False
-
-            # Update display for every frame
-            pygame.display.flip()
-
-
-# Quitting without error messages
-try:
-    main()
-except pygame.error:
-    pass
-
-pygame.quit()
+                    # Wait 3 seconds and reset the game
+                    renderer.flip()
+                    if recorder is not None:
+                        recorder.save()
+                    if soak is None:
+                        pygame.time.delay(2500)
+                    run = False
+                    # The pause is not part of any phase
+                    if profiler is not None:
+                        profiler.skip()
+
+            # Squares under the overlay are drawn again before heads and tails move on them
+            if profiler is not None:
+                profiler.clear(renderer, state)
+                profiler.mark('overlay')
+
+            # Move heads and tails part of the way to their next square
+            if run:
+                renderer.interpolate(state, lag * TICK_RATE / 1000)
+            if profiler is not None:
+                profiler.mark('draw')
+                profiler.draw(renderer, overlay_font)
+                profiler.mark('overlay')
+
+            # Update the changed parts of the display for every frame
+            renderer.update()
+            if show_time:
+                caption = ("Snake - frame : %.2f ms - input : %.0f ms"
+                           % (renderer.timer.average(), input_lag.average()))
+                # Average time the autopilot takes to choose a turn
+                for pilot in pilots:
+                    if pilot is not None:
+                        caption += " - bot %d : %.2f ms" % (pilot.ind + 1, pilot.decision_time())
+                pygame.display.set_caption(caption)
+            if profiler is not None:
+                profiler.frame()
+
+    # Save the last round even if it wasn't finished
+    if recorder is not None:
+        recorder.save()
+    if profiled is not None:
+        profiled.export()
+    # Settings used by the next launch (fullscreen if the window is fullscreen now)
+    if soak is None:
+        config.save({'columns': num_col, 'rows': num_row, 'players': num_player,
+                     'fullscreen': int(is_fullscreen(win))})
+
+
+# python Snake.py --startup-time: open the window and draw the grid like main does, then show how long each part
+# of the launch took (also written to startup-time.txt, a build without a console has nowhere to print)
+def startup_time():
+    win = pygame.display.set_mode((win_width, win_height))
+    pygame.display.set_caption("Snake")
+    pygame.display.set_icon(pygame.image.load(config.data_path('snake.png')))
+    state = GameState(num_col, num_row, num_player)
+    Renderer(win, num_col, num_row, FONT_50).full(state, score_texts(state))
+    pygame.event.pump()
+    shown = time.perf_counter()
+    lines = ["imports         %7.1f ms" % ((imported - started) * 1000),
+             "pygame init     %7.1f ms" % ((initialized - imported) * 1000),
+             "fonts           %7.1f ms (%s)" % ((fonts_loaded - initialized) * 1000,
+                                                "system fonts listed" if fonts.scanned else "from the cache"),
+             "window + frame  %7.1f ms" % ((shown - fonts_loaded) * 1000),
+             "total           %7.1f ms (after Python started)" % ((shown - started) * 1000)]
+    print("\n".join(lines))
+    with open('startup-time.txt', 'w') as file:
+        file.write("\n".join(lines) + "\n")
+
+
+if __name__ == '__main__':
+    # python Snake.py --quick [columns rows players] [--fullscreen | --window]: no settings window, the settings of
+    # the last game are used (numbers and options given replace them)
+    quick = '--quick' in sys.argv
+    if quick:
+        names = ('columns', 'rows', 'players')
+        args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+        values = args + [num_col, num_row, num_player][len(args):]
+        for name, value in zip(names, values):
+            if config.valid(name, value) is None:
+                print("%s must be a number from %d to %d" % ((name,) + config.LIMITS[name]))
+                sys.exit(2)
+        (num_col, num_row, num_player) = [config.valid(name, value) for name, value in zip(names, values)]
+        if '--fullscreen' in sys.argv:
+            fullscreen = True
+        elif '--window' in sys.argv:
+            fullscreen = False
+    if '--startup-time' in sys.argv:
+        startup_time()
+    else:
+        # Quitting without error messages
+        try:
+            main(quick=quick)
+        except pygame.error:
+            pass
+
+    pygame.quit()
@@ -0,0 +1,191 @@
+import os
+import struct
+import sys
+import numpy as np
+from replay import Replay
+
+# Many recorded rounds in one archive folder, read with NumPy without parsing each replay again
+# Two append-only files, both a small header followed by fixed-width records:
+# games: one record per round (index of the rounds, with where its ticks start in the ticks file)
+# ticks: one record per tick (turns taken, apple, heads and lengths after the tick)
+# Ticks of a round are written before its game record, so a game record never points to missing ticks
+# and a write cut in the middle only leaves a partial record at the end, which is ignored
+
+HEADER = struct.Struct('<4sI8x')
+GAMES_MAGIC = b'SNKG'
+TICKS_MAGIC = b'SNKT'
+VERSION = 1
+
+# Why a snake lost, same order as the checks in GameState.step
+NONE = 0
+# Head went into its own body
+SELF = 1
+# Head went out of the grid
+WALL = 2
+# Both heads went into the same square
+HEAD = 3
+# Head went into the body of the other snake
+BODY = 4
+CAUSES = ['none', 'self', 'wall', 'head', 'body']
+
+# Values for the second snake of a singleplayer round are 0 (length 0 means there is no snake)
+GAME = np.dtype([('seed', '<u8'), ('tick_start', '<u8'), ('ticks', '<u4'), ('round', '<u4'), ('score', '<u4'),
+                 ('wins', '<u4', (2,)), ('length', '<u2', (2,)), ('cause', 'u1', (2,)), ('winner', 'i1'),
+                 ('num_col', 'u1'), ('num_row', 'u1'), ('num_player', 'u1')])
+# Turns are the replay byte of the tick, apple is 255 when the grid is full, heads are (column, row)
+TICK = np.dtype([('turns', 'u1'), ('apple', 'u1', (2,)), ('head', '<i2', (2, 2)), ('length', '<u2', (2,))])
+
+
+# Why snake ind lost (NONE if it didn't)
+def death_cause(state, ind):
+    if ind not in state.loser:
+        return NONE
+    snake = state.snakes[ind]
+    if snake.body.hit:
+        return SELF
+    (col, row) = snake.body[0]
+    if col < 0 or row < 0 or col >= state.num_col or row >= state.num_row:
+        return WALL
+    if any(other is not snake and other.body[0] == snake.body[0] for other in state.snakes):
+        return HEAD
+    return BODY
+
+
+# Create a file with its header if it doesn't exist yet, check the header if it does
+def _open(path, magic):
+    if not os.path.exists(path):
+        with open(path, 'wb') as file:
+            file.write(HEADER.pack(magic, VERSION))
+    with open(path, 'rb') as file:
+        data = file.read(HEADER.size)
+    # Empty or cut before the end of the header
+    if len(data) < HEADER.size:
+        raise ValueError("not a snake archive: " + path)
+    (found, version) = HEADER.unpack(data)
+    if found != magic or version != VERSION:
+        raise ValueError("not a snake archive: " + path)
+
+
+# Records of a file as a read-only array mapped on the file (only complete records)
+def _map(path, dtype):
+    count = (os.path.getsize(path) - HEADER.size) // dtype.itemsize
+    if count == 0:
+        return np.zeros(0, dtype)
+    return np.memmap(path, dtype, 'r', HEADER.size, (count,))
+
+
+class Archive:
+    def __init__(self, path):
+        os.makedirs(path, exist_ok=True)
+        self.games_path = os.path.join(path, 'games')
+        self.ticks_path = os.path.join(path, 'ticks')
+        _open(self.games_path, GAMES_MAGIC)
+        _open(self.ticks_path, TICKS_MAGIC)
+
+    # Every round in the archive, columns are views: archive.games()['score'] reads no other field
+    # The array doesn't grow, call again after appending to see the new rounds
+    def games(self):
+        return _map(self.games_path, GAME)
+
+    # Every tick of every round
+    def ticks(self):
+        return _map(self.ticks_path, TICK)
+
+    # Ticks of one round (game is a record of games())
+    def game_ticks(self, game, ticks=None):
+        if ticks is None:
+            ticks = self.ticks()
+        return ticks[game['tick_start']:game['tick_start'] + game['ticks']]
+
+    def __len__(self):
+        return (os.path.getsize(self.games_path) - HEADER.size) // GAME.itemsize
+
+    # Add a round: game is a GAME record (tick_start and ticks are filled here) and ticks an array of TICK records
+    def append(self, game, ticks):
+        ticks = np.asarray(ticks, TICK)
+        with open(self.ticks_path, 'ab') as file:
+            start = (file.tell() - HEADER.size) // TICK.itemsize
+            # Drop a partial record left by a write that was cut
+            if HEADER.size + start * TICK.itemsize != file.tell():
+                file.truncate(HEADER.size + start * TICK.itemsize)
+            file.write(ticks.tobytes())
+        game = np.array(game, GAME)
+        game['tick_start'] = start
+        game['ticks'] = len(ticks)
+        with open(self.games_path, 'ab') as file:
+            count = (file.tell() - HEADER.size) // GAME.itemsize
+            if HEADER.size + count * GAME.itemsize != file.tell():
+                file.truncate(HEADER.size + count * GAME.itemsize)
+            file.write(game.tobytes())
+
+    # Play a replay again and add each of its rounds, returns the number of rounds added
+    def add_replay(self, replay):
+        state = replay.new_state()
+        ticks = []
+        rounds = 0
+        for t in range(len(replay)):
+            if state.over():
+                self.append(self.game_record(state, rounds), ticks)
+                ticks = []
+                rounds += 1
+                replay.next_round(state)
+            replay.step(state, t)
+            ticks.append(self.tick_record(state, replay.moves[t]))
+        if ticks:
+            self.append(self.game_record(state, rounds), ticks)
+            rounds += 1
+        return rounds
+
+    # TICK record of the state after a tick
+    @staticmethod
+    def tick_record(state, turns):
+        heads = [snake.body[0] for snake in state.snakes]
+        lengths = [len(snake.body) for snake in state.snakes]
+        if len(heads) == 1:
+            heads.append((0, 0))
+            lengths.append(0)
+        apple = (255, 255) if state.applec is None else (state.applec, state.appler)
+        return (turns, apple, heads, lengths)
+
+    # GAME record of a round that ended (or of the last round of a replay, which may not be over)
+    @staticmethod
+    def game_record(state, round_num):
+        players = range(state.num_player)
+        pad = [0] * (2 - state.num_player)
+        winner = state.winner()
+        return (state.seed, 0, 0, round_num, state.score, list(state.wins) + pad,
+                [len(snake.body) for snake in state.snakes] + pad, [death_cause(state, ind) for ind in players] + pad,
+                -1 if winner is None else winner, state.num_col, state.num_row, state.num_player)
+
+
+# Go through the rounds of an archive one by one (game record, array of its ticks) reading only one round at a time,
+# so the memory used doesn't depend on the size of the archive
+def stream(path, chunk=1024):
+    archive = Archive(path)
+    with open(archive.games_path, 'rb') as games, open(archive.ticks_path, 'rb') as ticks:
+        games.seek(HEADER.size)
+        while True:
+            data = games.read(chunk * GAME.itemsize)
+            records = np.frombuffer(data[:len(data) - len(data) % GAME.itemsize], GAME)
+            if len(records) == 0:
+                return
+            for game in records:
+                ticks.seek(HEADER.size + int(game['tick_start']) * TICK.itemsize)
+                yield game, np.frombuffer(ticks.read(int(game['ticks']) * TICK.itemsize), TICK)
+
+
+# python archive.py folder [replay ...]: add replays to an archive, then print what is in it
+if __name__ == '__main__':
+    archive = Archive(sys.argv[1])
+    for name in sys.argv[2:]:
+        archive.add_replay(Replay.load(name))
+    games = archive.games()
+    print("%d rounds, %d ticks" % (len(games), games['ticks'].sum()))
+    if len(games):
+        solo = games[games['num_player'] == 1]
+        if len(solo):
+            print("singleplayer: mean score %.2f, best %d" % (solo['score'].mean(), solo['score'].max()))
+        print("mean ticks per round %.1f, mean final length %.1f"
+              % (games['ticks'].mean(), games['length'][:, 0].mean()))
+        counts = np.bincount(games['cause'][games['length'] > 0], minlength=len(CAUSES))
+        print("deaths: " + ", ".join("%s %d" % (name, n) for name, n in zip(CAUSES[1:], counts[1:])))
@@ -0,0 +1,223 @@
+import math
+import sys
+import time
+from random import Random
+from autopilot import greedy_turn
+from engine import GameState, Snake
+from freecells import FreeCells
+
+# Any number of snakes on one grid (bots or players), a snake that loses leaves the grid and the others keep going
+# until only one is left
+# Collisions use a grid counting the body parts on each square, kept up to date as the snakes move:
+# a head on a square with more than one body part hit something (its own body, another body or another head),
+# so a tick costs the same for each snake whatever the length of the bodies
+
+# Smallest space given to each snake when the round starts (3 squares + 3 free squares, every other row)
+SLOT_W = 6
+SLOT_H = 2
+
+
+class Arena(GameState):
+    def __init__(self, num_col=50, num_row=30, num_player=64, seed=None):
+        if num_player > (num_col // SLOT_W) * (num_row // SLOT_H):
+            raise ValueError("too many snakes for a %dx%d grid" % (num_col, num_row))
+        super().__init__(num_col, num_row, num_player, seed)
+
+    # Snakes spread over the grid in rows, all going to the right
+    def spawn(self):
+        # About as many snakes per row as the shape of the grid allows (not more rows than fit)
+        per_row = min(self.num_player, self.num_col // SLOT_W,
+                      max(math.ceil(math.sqrt(self.num_player * self.num_col / self.num_row)),
+                          math.ceil(self.num_player / (self.num_row // SLOT_H))))
+        rows = -(-self.num_player // per_row)
+        col_space = self.num_col // per_row
+        row_space = self.num_row // rows
+        return [Snake(2 + (ind % per_row) * col_space, (ind // per_row) * row_space + row_space // 2)
+                for ind in range(self.num_player)]
+
+    # Start a new round (wins are kept)
+    def reset(self):
+        self.snakes = self.spawn()
+        # Number of body parts on each square (row * num_col + col)
+        self.grid = [0] * (self.num_col * self.num_row)
+        for snake in self.snakes:
+            for (col, row) in snake.body:
+                self.grid[row * self.num_col + col] += 1
+        self.free = FreeCells(self.num_col, self.num_row, [pos for snake in self.snakes for pos in snake.body])
+        self.alive = [True] * self.num_player
+        # Apples eaten by each snake this round
+        self.scores = [0] * self.num_player
+        self.score = 0
+        # Snakes that lost, in the order they lost
+        self.loser = []
+        self.ticks = 0
+        self.apple()
+
+    # Over once one snake is left (none in singleplayer) or the grid is full
+    def over(self):
+        if self.applec is None:
+            return True
+        if self.num_player == 1:
+            return not self.alive[0]
+        return sum(self.alive) <= 1
+
+    # Last snake alive, None if there is none
+    def winner(self):
+        if self.num_player > 1 and sum(self.alive) == 1:
+            return self.alive.index(True)
+        return None
+
+    # True if the square is in the grid and nothing is on it
+    def empty(self, col, row):
+        return 0 <= col < self.num_col and 0 <= row < self.num_row and self.grid[row * self.num_col + col] == 0
+
+    # Play one tick, actions has a turn or None for each snake (snakes that lost are skipped)
+    # Returns the list of snakes that lost on this tick
+    def step(self, actions=None):
+        snakes = self.snakes
+        num_col = self.num_col
+        num_row = self.num_row
+        grid = self.grid
+        free = self.free
+        playing = [ind for ind in range(self.num_player) if self.alive[ind]]
+        if actions is not None:
+            for ind in playing:
+                if actions[ind] is not None:
+                    snakes[ind].turn(actions[ind])
+
+        moved = [ind for ind in playing if snakes[ind].move_snake()]
+        self.ticks += 1
+        # Tails leave their square before the heads come, a head can go where a tail just was
+        for ind in moved:
+            (col, row) = snakes[ind].body.last_tail
+            grid[row * num_col + col] -= 1
+            if grid[row * num_col + col] == 0:
+                free.give((col, row))
+        heads = []
+        for ind in moved:
+            (col, row) = snakes[ind].body[0]
+            if 0 <= col < num_col and 0 <= row < num_row:
+                heads.append(row * num_col + col)
+                grid[row * num_col + col] += 1
+                free.take((col, row))
+            else:
+                heads.append(None)
+
+        # A snake alone on the apple eats it (its tail stays, so a head going there hits it)
+        eaten = False
+        for ind, head in zip(moved, heads):
+            snake = snakes[ind]
+            if head is not None and snake.body[0] == (self.applec, self.appler) and grid[head] == 1:
+                snake.body.grow()
+                (col, row) = snake.body[-1]
+                grid[row * num_col + col] += 1
+                free.take((col, row))
+                self.scores[ind] += 1
+                self.score += 1
+                eaten = True
+
+        # Outside of the grid or on a square with something else on it
+        loser = [ind for ind, head in zip(moved, heads) if head is None or grid[head] > 1]
+        # Snakes that lost leave the grid
+        for ind in loser:
+            self.alive[ind] = False
+            for (col, row) in snakes[ind].body:
+                if 0 <= col < num_col and 0 <= row < num_row:
+                    grid[row * num_col + col] -= 1
+                    if grid[row * num_col + col] == 0:
+                        free.give((col, row))
+        self.loser.extend(loser)
+        if eaten:
+            self.apple()
+
+        winner = self.winner()
+        if winner is not None:
+            self.wins[winner] += 1
+        return loser
+
+    # Turn that keeps a snake alive on the next move and brings it closer to the apple (None to go straight)
+    def bot_turn(self, ind):
+        return greedy_turn(self.snakes[ind], self.empty, None if self.applec is None else (self.applec, self.appler))
+
+
+# Color of each snake, spread around the color wheel
+def colors(count):
+    import pygame
+    result = []
+    for ind in range(count):
+        color = pygame.Color(0)
+        color.hsva = (360 * ind / count, 80, 100, 100)
+        result.append(tuple(color)[:3])
+    return result
+
+
+# Watch bots play in a window, the first snake is played with the arrows if play is True
+def watch(arena, tick_rate=10, play=False):
+    import fonts
+    import pygame
+    from render import BOX, RED, Renderer
+
+    pygame.init()
+    font = fonts.load('comicsans', 30)
+    win = pygame.display.set_mode((arena.num_col * BOX, arena.num_row * BOX + 75))
+    renderer = Renderer(win, arena.num_col, arena.num_row, font)
+    palette = colors(arena.num_player)
+    keys = {pygame.K_RIGHT: 'r', pygame.K_LEFT: 'l', pygame.K_UP: 'u', pygame.K_DOWN: 'd'}
+    clock = pygame.time.Clock()
+    arena.start()
+    try:
+        while True:
+            clock.tick(tick_rate)
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    return
+                if play and event.type == pygame.KEYDOWN and event.key in keys:
+                    arena.snakes[0].turn(keys[event.key])
+            if arena.over():
+                pygame.time.delay(1000)
+                arena.reset()
+                arena.start()
+            actions = [None if play and ind == 0 or not arena.alive[ind] else arena.bot_turn(ind)
+                       for ind in range(arena.num_player)]
+            arena.step(actions)
+            # Many snakes change every tick, the grid is drawn again whole
+            win.blit(renderer.background, (0, 0))
+            if arena.applec is not None:
+                renderer.square(RED, arena.applec, arena.appler)
+            for ind, snake in enumerate(arena.snakes):
+                if arena.alive[ind]:
+                    renderer.draw_snake(snake, palette[ind])
+            renderer.scores([("ALIVE : %d / %d" % (sum(arena.alive), arena.num_player), palette[0], 20)])
+            renderer.flip()
+    finally:
+        pygame.quit()
+
+
+# python arena.py [snakes] [columns] [rows] [--watch | --play]: bots play rounds without a window and the ticks
+# per second are printed (or the rounds are shown in a window)
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:] if not arg.startswith('--')]
+    (num_player, num_col, num_row) = (args + [64, 50, 30][len(args):])[:3]
+    arena = Arena(num_col, num_row, num_player, seed=0)
+    if '--watch' in sys.argv or '--play' in sys.argv:
+        watch(arena, play='--play' in sys.argv)
+    else:
+        rng = Random(0)
+        arena.start()
+        ticks = 0
+        rounds = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < 5:
+            if arena.over():
+                arena.reset()
+                arena.start()
+                rounds += 1
+            # Bots sometimes turn at random so rounds end
+            actions = [None if not arena.alive[ind] else
+                       rng.choice('rlud') if rng.random() < 0.02 else arena.bot_turn(ind)
+                       for ind in range(num_player)]
+            arena.step(actions)
+            ticks += 1
+        t = time.perf_counter() - start
+        print("%d snakes on %dx%d: %.0f ticks/s with bots (%d rounds)"
+              % (num_player, num_col, num_row, ticks / t, rounds))
@@ -0,0 +1,421 @@
+import heapq
+import time
+from collections import deque
+from body import DIRECTIONS
+
+# Bot that can play any snake of a GameState (singleplayer, PvP or arena)
+# It looks for the shortest path to the apple (A*, body parts count as free once the snake moved past them) and only
+# takes it if the snake can still reach its own tail after eating, otherwise it goes where it can follow its tail
+# or where there is the most room
+# Room is known from Regions: every empty square has the number of its region (squares connected to each other),
+# updated between ticks from the squares that changed instead of filling the whole grid again
+
+# Time given to each decision by default (seconds), the bot plays a safe move if the search takes longer
+BUDGET = 0.005
+# Squares looked at by the path search between two checks of the time
+CHECK_EVERY = 8
+# Number of decision times kept for the metric
+SAMPLES = 100
+
+# Squares next to each square for each grid size (columns, rows), made once and shared by every Regions
+neighbor_lists = {}
+
+
+# Simple bot of the arenas and of the network client: turn that keeps a snake alive on the next move and brings its
+# head closer to target (column, row), None to go straight (also when no move is safe or there is no target)
+# empty(col, row) tells if the head can go into a square, each game knows its own grid
+def greedy_turn(snake, empty, target):
+    if snake.dir is None:
+        return None
+    (col, row) = snake.body[0]
+    best = None
+    for direction, (speed_x, speed_y) in DIRECTIONS.items():
+        # No going back into the neck
+        if (direction in 'rl') == (snake.dir in 'rl') and direction != snake.dir:
+            continue
+        if not empty(col + speed_x, row + speed_y):
+            continue
+        distance = 0
+        if target is not None:
+            distance = abs(col + speed_x - target[0]) + abs(row + speed_y - target[1])
+        if best is None or distance < best[0]:
+            best = (distance, direction)
+    if best is None or best[1] == snake.dir:
+        return None
+    return best[1]
+
+
+# Empty squares grouped in regions (connected squares have the same label, 0 for a taken square)
+class Regions:
+    def __init__(self, num_col, num_row, taken=()):
+        self.num_col = num_col
+        self.num_row = num_row
+        # Squares next to each square (the searches look at them many times per tick)
+        if (num_col, num_row) not in neighbor_lists:
+            neighbor_lists[num_col, num_row] = [list(self.neighbors(ind)) for ind in range(num_col * num_row)]
+        self.around = neighbor_lists[num_col, num_row]
+        self.labels = [1] * (num_col * num_row)
+        for (col, row) in taken:
+            if 0 <= col < num_col and 0 <= row < num_row:
+                self.labels[row * num_col + col] = 0
+        self.sizes = {}
+        self.next_label = 1
+        # Label every region with a fill from each square not labeled yet
+        done = [False] * len(self.labels)
+        for ind, label in enumerate(self.labels):
+            if label and not done[ind]:
+                cells = self.fill(ind, lambda other: self.labels[other] != 0 and not done[other])
+                new = self.new_label()
+                for cell in cells:
+                    done[cell] = True
+                    self.labels[cell] = new
+                self.sizes[new] = len(cells)
+
+    def new_label(self):
+        self.next_label += 1
+        return self.next_label
+
+    # Squares next to a square (index row * num_col + col) that are in the grid
+    def neighbors(self, ind):
+        (row, col) = divmod(ind, self.num_col)
+        if col > 0:
+            yield ind - 1
+        if col < self.num_col - 1:
+            yield ind + 1
+        if row > 0:
+            yield ind - self.num_col
+        if row < self.num_row - 1:
+            yield ind + self.num_col
+
+    # Every square connected to start through squares accepted by keep
+    def fill(self, start, keep):
+        around = self.around
+        seen = {start}
+        queue = deque([start])
+        while queue:
+            for other in around[queue.popleft()]:
+                if other not in seen and keep(other):
+                    seen.add(other)
+                    queue.append(other)
+        return seen
+
+    def label(self, col, row):
+        if 0 <= col < self.num_col and 0 <= row < self.num_row:
+            return self.labels[row * self.num_col + col]
+        return 0
+
+    # Number of squares in the region of a square (0 for a taken square)
+    def size(self, col, row):
+        return self.sizes.get(self.label(col, row), 0)
+
+    # A square becomes empty: it joins the regions next to it (the smaller ones take the label of the largest)
+    def free(self, col, row):
+        ind = row * self.num_col + col
+        if self.labels[ind]:
+            return
+        around = {self.labels[other] for other in self.around[ind]} - {0}
+        if not around:
+            label = self.new_label()
+            self.sizes[label] = 0
+        else:
+            label = max(around, key=self.sizes.get)
+            for other_label in around - {label}:
+                start = next(other for other in self.around[ind] if self.labels[other] == other_label)
+                for cell in self.fill(start, lambda other: self.labels[other] == other_label):
+                    self.labels[cell] = label
+                self.sizes[label] += self.sizes.pop(other_label)
+        self.labels[ind] = label
+        self.sizes[label] += 1
+
+    # A square is taken: if it was the only link between parts of its region, the parts get their own labels
+    # The parts are searched at the same time, one square each in turn, so the search stops once all of them
+    # but one are done (only the smaller parts are searched whole)
+    def take(self, col, row):
+        ind = row * self.num_col + col
+        label = self.labels[ind]
+        if not label:
+            return
+        self.labels[ind] = 0
+        self.sizes[label] -= 1
+        labels = self.labels
+        around = self.around
+        starts = [other for other in around[ind] if labels[other] == label]
+        if len(starts) < 2:
+            if self.sizes[label] == 0:
+                del self.sizes[label]
+            return
+        # One search from each square next to it: (squares seen, squares to look at), searches that meet are merged
+        searches = [({start}, deque([start])) for start in starts]
+        while len(searches) > 1:
+            for search in list(searches):
+                if search not in searches:
+                    continue
+                (seen, queue) = search
+                # A search with nothing left to look at is cut from the others
+                if not queue:
+                    new = self.new_label()
+                    for cell in seen:
+                        self.labels[cell] = new
+                    self.sizes[new] = len(seen)
+                    self.sizes[label] -= len(seen)
+                    searches.remove(search)
+                    break
+                cell = queue.popleft()
+                for other in around[cell]:
+                    if labels[other] != label or other in seen:
+                        continue
+                    met = next((found for found in searches if found is not search and other in found[0]), None)
+                    if met is None:
+                        seen.add(other)
+                        queue.append(other)
+                    else:
+                        seen.update(met[0])
+                        queue.extend(met[1])
+                        searches.remove(met)
+
+
+class Autopilot:
+    def __init__(self, ind, budget=BUDGET):
+        # Snake played
+        self.ind = ind
+        self.budget = budget
+        # State and tick the regions were last updated for
+        self.state = None
+        self.snakes = None
+        self.ticks = None
+        self.regions = None
+        # Time taken by the last decisions (seconds) and number of searches stopped by the budget
+        self.times = deque(maxlen=SAMPLES)
+        self.timeouts = 0
+        # Longest time the fallback move took (seconds), the searches stop early enough to leave it that time
+        self.reserve = 0
+        # Ticks since the snake last grew: two bots keeping away from each other's heads could both wait next to
+        # the same apple forever, so after a while (longer for higher snake numbers) the bot takes the risk
+        self.hunger = 0
+        self.length = None
+
+    # Average time of the last decisions in milliseconds
+    def decision_time(self):
+        if not self.times:
+            return 0
+        return sum(self.times) / len(self.times) * 1000
+
+    # Squares taken by every snake still in the game
+    @staticmethod
+    def bodies(state):
+        alive = getattr(state, 'alive', None)
+        return [snake.body for ind, snake in enumerate(state.snakes) if alive is None or alive[ind]]
+
+    # Bring the regions up to date: after one tick only the tails that left and the new heads change
+    def sync(self, state):
+        if (state is self.state and state.snakes is self.snakes and state.ticks == self.ticks + 1
+                and getattr(state, 'alive', None) in (None, self.alive)):
+            for body in self.bodies(state):
+                tail = body.last_tail
+                if tail is not None and tail not in body:
+                    self.regions.free(*tail)
+            for body in self.bodies(state):
+                (col, row) = body[0]
+                if 0 <= col < state.num_col and 0 <= row < state.num_row:
+                    self.regions.take(col, row)
+        elif state is not self.state or state.snakes is not self.snakes or state.ticks != self.ticks:
+            self.regions = Regions(state.num_col, state.num_row, [pos for body in self.bodies(state) for pos in body])
+        self.state = state
+        self.snakes = state.snakes
+        self.ticks = state.ticks
+        self.alive = list(getattr(state, 'alive', ())) or None
+
+    # Turn to take before the next tick ('r', 'l', 'u', 'd' or None to go straight)
+    def decide(self, state):
+        start = time.perf_counter()
+        self.sync(state)
+        snake = state.snakes[self.ind]
+        direction = None
+        if snake.dir is not None:
+            direction = self.choose(state, snake, start + self.budget)
+            if direction == snake.dir:
+                direction = None
+        self.times.append(time.perf_counter() - start)
+        return direction
+
+    # Everything done after sync counts in the budget: the searches (building free_at included) give up in time
+    # for the fallback, whose time is measured
+    def choose(self, state, snake, deadline):
+        body = snake.body
+        if len(body) != self.length:
+            self.length = len(body)
+            self.hunger = 0
+        self.hunger += 1
+        careful = self.hunger < (state.num_col + state.num_row) * (self.ind + 1)
+        search_deadline = deadline - self.reserve
+        if state.applec is not None:
+            free_at = self.free_times(state, body, careful, search_deadline)
+            if free_at is not None:
+                path = self.path(state, body[0], (state.applec, state.appler), free_at, search_deadline)
+                if path is not None and self.safe(state, body, path, search_deadline):
+                    return self.direction(body[0], path[0])
+        start = time.perf_counter()
+        direction = self.fallback(state, snake, careful)
+        self.reserve = max(self.reserve, time.perf_counter() - start)
+        return direction
+
+    # Ticks before each body part is gone (a snake that eats meanwhile keeps it longer, the check after
+    # the path is there for that), None if the budget is spent (many long snakes in an arena)
+    @classmethod
+    def free_times(cls, state, body, careful, deadline):
+        free_at = {}
+        bodies = cls.bodies(state)
+        for other in bodies:
+            if time.perf_counter() > deadline:
+                return None
+            length = len(other)
+            for num, pos in enumerate(other):
+                free_at[pos] = length - num
+        # Squares the other heads can go into on the next tick (after every body, a tail can't hide them)
+        if careful:
+            for other in bodies:
+                if other is not body:
+                    (col, row) = other[0]
+                    for (speed_x, speed_y) in DIRECTIONS.values():
+                        pos = (col + speed_x, row + speed_y)
+                        free_at[pos] = max(free_at.get(pos, 0), 2)
+        return free_at
+
+    # Shortest path from start to goal (squares after start), None if there is none or the budget is spent
+    def path(self, state, start, goal, free_at, deadline):
+        steps = {start: 0}
+        came = {start: None}
+        heap = [(abs(start[0] - goal[0]) + abs(start[1] - goal[1]), 0, start)]
+        count = 0
+        while heap:
+            count += 1
+            if count % CHECK_EVERY == 0 and time.perf_counter() > deadline:
+                self.timeouts += 1
+                return None
+            (_, step, pos) = heapq.heappop(heap)
+            if pos == goal:
+                path = []
+                while pos != start:
+                    path.append(pos)
+                    pos = came[pos]
+                return path[::-1]
+            if step > steps[pos]:
+                continue
+            for (speed_x, speed_y) in DIRECTIONS.values():
+                nxt = (pos[0] + speed_x, pos[1] + speed_y)
+                if not (0 <= nxt[0] < state.num_col and 0 <= nxt[1] < state.num_row):
+                    continue
+                # Body part still there when the head arrives
+                if free_at.get(nxt, 0) > step + 1:
+                    continue
+                if step + 1 < steps.get(nxt, step + 2):
+                    steps[nxt] = step + 1
+                    came[nxt] = pos
+                    heapq.heappush(heap, (step + 1 + abs(nxt[0] - goal[0]) + abs(nxt[1] - goal[1]), step + 1, nxt))
+        return None
+
+    # True if, after following the path and eating, the head can still reach the tail
+    def safe(self, state, body, path, deadline):
+        length = len(body) + 1
+        virtual = (path[::-1] + list(body))[:length]
+        taken = set(virtual)
+        for other in self.bodies(state):
+            if other is not body:
+                taken.update(other)
+        tail = virtual[-1]
+        taken.discard(tail)
+        seen = {virtual[0]}
+        queue = deque([virtual[0]])
+        while queue:
+            if time.perf_counter() > deadline:
+                self.timeouts += 1
+                return False
+            (col, row) = queue.popleft()
+            for (speed_x, speed_y) in DIRECTIONS.values():
+                nxt = (col + speed_x, row + speed_y)
+                if nxt == tail:
+                    return True
+                if (nxt not in seen and nxt not in taken and 0 <= nxt[0] < state.num_col
+                        and 0 <= nxt[1] < state.num_row):
+                    seen.add(nxt)
+                    queue.append(nxt)
+        return False
+
+    # Same as free_at for one square, without going through the bodies: 0 if nothing is there, 1 for a tail
+    # that moves away, 2 or more if the square stays taken (or another head can go there when careful)
+    @classmethod
+    def free_time(cls, state, body, pos, careful):
+        ticks = 0
+        for other in cls.bodies(state):
+            if pos in other:
+                ticks = max(ticks, 1 if pos == other[-1] else 2)
+            if other is not body and careful and abs(pos[0] - other[0][0]) + abs(pos[1] - other[0][1]) == 1:
+                ticks = max(ticks, 2)
+        return ticks
+
+    # Safe move without a path to the apple: one that can reach the tail, then the one with the most room,
+    # then the one closer to the apple
+    # Its time only depends on the number of snakes, not on their length
+    def fallback(self, state, snake, careful):
+        body = snake.body
+        regions = self.regions
+        (tail_col, tail_row) = body[-1]
+        tail_labels = {regions.label(tail_col + speed_x, tail_row + speed_y) for (speed_x, speed_y)
+                       in DIRECTIONS.values()} - {0}
+        (col, row) = body[0]
+        best = None
+        for direction, (speed_x, speed_y) in DIRECTIONS.items():
+            if (direction in 'rl') == (snake.dir in 'rl') and direction != snake.dir:
+                continue
+            pos = (col + speed_x, row + speed_y)
+            if not (0 <= pos[0] < state.num_col and 0 <= pos[1] < state.num_row):
+                continue
+            distance = 0
+            if state.applec is not None:
+                distance = abs(pos[0] - state.applec) + abs(pos[1] - state.appler)
+            if pos == body[-1]:
+                # The tail moves away unless the snake eats, going after it is always safe
+                score = (pos != (state.applec, state.appler), True, len(body), -distance)
+            else:
+                ticks = self.free_time(state, body, pos, careful)
+                if ticks > 1:
+                    continue
+                label = regions.label(*pos)
+                score = (ticks == 0, label in tail_labels, regions.sizes.get(label, 0), -distance)
+            if best is None or score > best[0]:
+                best = (score, direction)
+        if best is None:
+            return None
+        return best[1]
+
+    @staticmethod
+    def direction(start, pos):
+        return next(direction for direction, (speed_x, speed_y) in DIRECTIONS.items()
+                    if (start[0] + speed_x, start[1] + speed_y) == pos)
+
+
+# python autopilot.py [columns] [rows] [players] [rounds] [ticks]: bots play rounds (of at most ticks ticks) without
+# a window, scores and the decision times are printed
+if __name__ == '__main__':
+    import sys
+    from engine import GameState
+
+    args = [int(arg) for arg in sys.argv[1:]]
+    (num_col, num_row, num_player, rounds, max_ticks) = (args + [17, 15, 1, 10, 2000][len(args):])[:5]
+    state = GameState(num_col, num_row, num_player, seed=0)
+    pilots = [Autopilot(ind) for ind in range(num_player)]
+    worst = 0
+    for _ in range(rounds):
+        state.reset()
+        state.start()
+        while not state.over() and state.ticks < max_ticks:
+            actions = []
+            for pilot in pilots:
+                start = time.perf_counter()
+                actions.append(pilot.decide(state))
+                worst = max(worst, time.perf_counter() - start)
+            state.step(actions)
+        print("score %d, length %s, ticks %d" % (state.score, [len(snake.body) for snake in state.snakes], state.ticks))
+    print("decision %.3f ms on average, %.3f ms at worst, %d searches over budget, wins %s"
+          % (sum(pilot.decision_time() for pilot in pilots) / num_player, worst * 1000,
+             sum(pilot.timeouts for pilot in pilots), state.wins))
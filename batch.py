@@ -0,0 +1,179 @@
+import numpy as np
+from body import DIRECTIONS
+
+# Many games stepped together with NumPy (same rules as engine.GameState), used for training agents
+# Actions are direction codes: index of the direction in ACTIONS, or -1 to keep going straight
+ACTIONS = list(DIRECTIONS)
+# Column and row speed of each action code
+SPEED_X = np.array([DIRECTIONS[d][0] for d in ACTIONS])
+SPEED_Y = np.array([DIRECTIONS[d][1] for d in ACTIONS])
+
+
+# N games of one or two snakes stored as arrays:
+# grid (N, num_row, num_col) has 0 for an empty square and 1 + snake index for a body part,
+# bodies (N, P, cells + 1) are ring buffers of square indices (row * num_col + col), head at head_ptr
+class BatchSnakeEnv:
+    def __init__(self, num_env, num_col=17, num_row=15, num_player=1, seed=None):
+        self.num_env = num_env
+        self.num_col = num_col
+        self.num_row = num_row
+        self.num_player = num_player
+        self.cells = num_col * num_row
+        # One more slot than squares so the head never writes over the tail
+        self.size = self.cells + 1
+        self.rng = np.random.default_rng(seed)
+
+        self.grid = np.zeros((num_env, num_row, num_col), np.int8)
+        self.bodies = np.zeros((num_env, num_player, self.size), np.int16 if self.size < 2 ** 15 else np.int32)
+        self.head_ptr = np.zeros((num_env, num_player), np.intp)
+        self.length = np.zeros((num_env, num_player), np.intp)
+        self.head_col = np.zeros((num_env, num_player), np.intp)
+        self.head_row = np.zeros((num_env, num_player), np.intp)
+        self.dir = np.zeros((num_env, num_player), np.intp)
+        self.apple = np.zeros(num_env, np.intp)
+        # False for a snake that lost on the last step (its game was reset right after)
+        self.alive = np.ones((num_env, num_player), bool)
+        # Apples eaten in the current game and games won by each snake
+        self.score = np.zeros((num_env, num_player), np.int32)
+        self.wins = np.zeros((num_env, num_player), np.int32)
+        self.ticks = np.zeros(num_env, np.int64)
+
+        # Flat views and offsets used to index every game at once
+        self._grid = self.grid.reshape(-1)
+        self._bodies = self.bodies.reshape(-1)
+        self._grid_base = (np.arange(num_env) * self.cells)[:, None]
+        self._body_base = np.arange(num_env * num_player).reshape(num_env, num_player) * self.size
+        self._ids = np.arange(1, num_player + 1, dtype=np.int8)[None, :].repeat(num_env, 0)
+
+        # Starting position of every game, same as engine.GameState.reset
+        if num_player == 1:
+            rows = [num_row // 2]
+        else:
+            rows = [num_row // 2 - 1, num_row // 2 + 1]
+        self._start_grid = np.zeros((num_row, num_col), np.int8)
+        self._start_body = np.zeros((num_player, 3), self.bodies.dtype)
+        self._start_row = np.array(rows)
+        for p, row in enumerate(rows):
+            # Tail first in the ring buffer, head at index 2
+            self._start_body[p] = [row * num_col + 2, row * num_col + 3, row * num_col + 4]
+            self._start_grid[row, 2:5] = p + 1
+        self._start_apple = (num_row // 2) * num_col + 3 * num_col // 4
+        self.reset()
+
+    # Put the games back to their starting position (all of them if envs is None)
+    def reset(self, envs=None):
+        if envs is None:
+            envs = slice(None)
+        self.grid[envs] = self._start_grid
+        self.bodies[envs, :, :3] = self._start_body
+        self.head_ptr[envs] = 2
+        self.length[envs] = 3
+        self.head_col[envs] = 4
+        self.head_row[envs] = self._start_row
+        # Everyone starts going to the right
+        self.dir[envs] = ACTIONS.index('r')
+        self.apple[envs] = self._start_apple
+        self.score[envs] = 0
+        self.ticks[envs] = 0
+        return self.grid
+
+    # New apple on a random empty square for each game in envs, returns the games with a full board
+    def _spawn(self, envs):
+        todo = envs
+        # A few random draws are enough unless the board is almost full
+        for _ in range(8):
+            cand = self.rng.integers(0, self.cells, len(todo))
+            free = self._grid[todo * self.cells + cand] == 0
+            self.apple[todo[free]] = cand[free]
+            todo = todo[~free]
+            if len(todo) == 0:
+                break
+        full = np.zeros(self.num_env, bool)
+        for env in todo:
+            empty = np.flatnonzero(self._grid[env * self.cells:(env + 1) * self.cells] == 0)
+            if len(empty) == 0:
+                full[env] = True
+            else:
+                self.apple[env] = empty[self.rng.integers(len(empty))]
+        return full
+
+    # Play one tick in every game, actions is an (N, P) array of action codes (or None to go straight)
+    # Returns the grids, the rewards (+1 apple, -1 lost) and the games that ended (they are reset already)
+    def step(self, actions=None):
+        if actions is not None:
+            actions = np.asarray(actions).reshape(self.num_env, self.num_player)
+            # Only turn perpendicular to the current direction ('r'/'l' are codes 0/1, 'u'/'d' are 2/3)
+            turn = (actions >= 0) & ((actions >> 1) != (self.dir >> 1))
+            self.dir = np.where(turn, actions, self.dir)
+
+        col = self.head_col + SPEED_X[self.dir]
+        row = self.head_row + SPEED_Y[self.dir]
+        out = (col < 0) | (row < 0) | (col >= self.num_col) | (row >= self.num_row)
+        # Heads outside of the grid point to square 0 so every index stays valid
+        cell = np.where(out, 0, row * self.num_col + col)
+        head = self._grid_base + cell
+
+        # Remove the tails first, going into the square a tail just left is allowed
+        tail = self._bodies[self._body_base + (self.head_ptr - self.length + 1) % self.size]
+        tail_sq = self._grid_base + tail
+        self._grid[tail_sq] = 0
+
+        # Snake lost if its head is outside of the grid or in its own body
+        lost = out | (self._grid[head] == self._ids)
+        # Snakes eat in order, so the second snake can't eat an apple the first one just ate
+        eat = ~lost & (cell == self.apple[:, None])
+        if self.num_player == 2:
+            eat[:, 1] &= ~eat[:, 0]
+
+        # Push the new heads, growing snakes keep their tail
+        self.head_ptr = (self.head_ptr + 1) % self.size
+        self._bodies[self._body_base + self.head_ptr] = cell
+        self.length += eat
+        self._grid[tail_sq[eat]] = self._ids[eat]
+
+        if self.num_player == 2:
+            # Head in the other snake (after it grew) or both heads in the same square
+            other = self._ids[:, ::-1]
+            lost |= ~out & ((self._grid[head] == other) | ((cell == cell[:, ::-1]) & ~out[:, ::-1]))
+
+        self._grid[head[~out]] = self._ids[~out]
+        self.head_col = col
+        self.head_row = row
+        self.score += eat
+        self.ticks += 1
+
+        done = lost.any(1)
+        ate = np.flatnonzero(eat.any(1))
+        if len(ate):
+            # A full board ends the game as well
+            done |= self._spawn(ate)
+
+        if self.num_player == 2:
+            # Opponent of the loser gets a point (no point for a tie)
+            single = lost.sum(1) == 1
+            self.wins[single] += ~lost[single]
+
+        # Squares the tails left (still taken by the snakes that ate) and the snakes that ate, so observations
+        # can be updated from what changed
+        self.last_tail = tail
+        self.ate = eat
+        rewards = eat.astype(np.float32) - lost
+        self.alive = ~lost
+        if done.any():
+            self.reset(done)
+        return self.grid, rewards, done
+
+
+# Measure steps per second with random actions
+if __name__ == '__main__':
+    import time
+
+    for players in (1, 2):
+        env = BatchSnakeEnv(4096, num_player=players, seed=0)
+        rng = np.random.default_rng(1)
+        acts = rng.integers(-1, 4, (64, env.num_env, players))
+        start = time.perf_counter()
+        for i in range(640):
+            env.step(acts[i % 64])
+        t = time.perf_counter() - start
+        print("%d player(s): %.0f env-steps/s" % (players, 640 * env.num_env / t))
@@ -0,0 +1,221 @@
+import json
+import os
+import platform
+import sys
+import time
+from random import Random
+from body import Body
+from engine import GameState
+from freecells import FreeCells
+from hamilton import CycleSolver, cycle
+
+# Benchmarks of the parts of the game that run on every tick: moving snakes of any length, new apples on a grid
+# more or less full, ticks with two snakes (heads checked against the other body) and drawing a frame, whole or
+# only what changed (pygame with the dummy video driver, no window is opened)
+# Every benchmark plays the same moves with the same seeds on every run, and is timed a few times: the fastest
+# time is kept (the others were slowed down by something else running on the computer)
+# python bench.py                  run everything, save the results and compare them with the baseline
+# python bench.py --save-baseline  run everything and make the results the new baseline
+# python bench.py NAME...          only the benchmarks whose name starts with one of the NAMEs
+# bench_baseline.json in the repository was made with python bench.py --save-baseline on the last commit that
+# changed a benchmark: times depend on the computer, so on another one make a baseline first (on the commit to
+# compare with), then run python bench.py on the changes
+
+# Next to this file, wherever it is run from
+FOLDER = os.path.dirname(os.path.abspath(__file__))
+RESULTS_PATH = os.path.join(FOLDER, 'bench_results.json')
+BASELINE_PATH = os.path.join(FOLDER, 'bench_baseline.json')
+# A benchmark more than this much slower than the baseline is a regression
+THRESHOLD = 0.2
+REPEAT = 5
+TICKS = 20000
+SPAWNS = 100000
+FRAMES = 1000
+NUM_COL = 17
+NUM_ROW = 15
+
+
+# Snake of length cells on the cycle of its part of the grid, head on the square at position end of the cycle
+# (col and row are added to the squares so two snakes can have their own part of the grid)
+def lay(snake, order, length, end, col=0, row=0):
+    cells = [order[(end - num) % len(order)] for num in range(length)]
+    snake.body = Body([(cell_col + col, cell_row + row) for (cell_col, cell_row) in cells])
+    snake.dir = CycleSolver.direction(cells[1], cells[0])
+
+
+# Turn to take on each square of a cycle to go to the next one
+def turns(order, col=0, row=0):
+    return {(order[num][0] + col, order[num][1] + row): CycleSolver.direction(order[num], order[(num + 1) % len(order)])
+            for num in range(len(order))}
+
+
+# State where the snakes have the given lengths and follow cycles without apple (nothing is eaten, the lengths
+# stay the same), parts is a list of (column, row, columns, rows) of the part of the grid of each snake
+def following(lengths, parts):
+    state = GameState(NUM_COL, NUM_ROW, len(lengths), seed=0)
+    steering = []
+    for snake, length, (col, row, num_col, num_row) in zip(state.snakes, lengths, parts):
+        order = cycle(num_col, num_row)[0]
+        lay(snake, order, length, length - 1, col, row)
+        steering.append(turns(order, col, row))
+    state.free = FreeCells(NUM_COL, NUM_ROW, [pos for snake in state.snakes for pos in snake.body])
+    state.applec = state.appler = None
+    return state, steering
+
+
+def play(state, steering, ticks):
+    for _ in range(ticks):
+        for snake, turn in zip(state.snakes, steering):
+            snake.turn(turn[snake.body[0]])
+        state.step()
+    if state.loser:
+        raise RuntimeError("a snake lost during the benchmark")
+
+
+# Time of the fastest of REPEAT runs divided by the number of operations (microseconds), setup is not timed
+def measure(setup, run, count):
+    best = None
+    for _ in range(REPEAT):
+        args = setup()
+        start = time.perf_counter()
+        run(*args)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best / count * 1e6
+
+
+def bench_move():
+    results = {}
+    size = len(cycle(NUM_COL, NUM_ROW)[0])
+    # From the starting length to every square of the cycle but one
+    for length in (3, size // 4, size // 2, size - 1):
+        results['move/length_%d' % length] = measure(
+            lambda: following([length], [(0, 0, NUM_COL, NUM_ROW)]),
+            lambda state, steering: play(state, steering, TICKS), TICKS)
+    return results
+
+
+def bench_spawn():
+    results = {}
+    squares = [(col, row) for row in range(NUM_ROW) for col in range(NUM_COL)]
+    for fill in (0, 50, 90, 99):
+        def setup():
+            state = GameState(NUM_COL, NUM_ROW, seed=0)
+            taken = Random(fill).sample(squares, len(squares) * fill // 100)
+            state.free = FreeCells(NUM_COL, NUM_ROW, taken)
+            return (state,)
+
+        def spawn(state):
+            for _ in range(SPAWNS):
+                state.apple()
+        results['spawn/fill_%d' % fill] = measure(setup, spawn, SPAWNS)
+    return results
+
+
+def bench_collision():
+    results = {}
+    # Each snake on its half of the grid, every tick checks both heads against the other body
+    half = NUM_COL // 2
+    parts = [(0, 0, half, NUM_ROW), (half, 0, NUM_COL - half, NUM_ROW)]
+    size = len(cycle(half, NUM_ROW)[0])
+    for length in (3, size // 2, size - 1):
+        results['collision/length_%d' % length] = measure(
+            lambda: following([length, length], parts), lambda state, steering: play(state, steering, TICKS), TICKS)
+    return results
+
+
+def bench_render():
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    import fonts
+    import pygame
+    from render import BLUE, BOX, Renderer
+
+    pygame.display.init()
+    pygame.font.init()
+    win = pygame.display.set_mode((NUM_COL * BOX, NUM_ROW * BOX + 75))
+    font = fonts.load('comicsans', 50)
+    size = len(cycle(NUM_COL, NUM_ROW)[0])
+    results = {}
+
+    def setup(length):
+        (state, steering) = following([length], [(0, 0, NUM_COL, NUM_ROW)])
+        renderer = Renderer(win, NUM_COL, NUM_ROW, font)
+        renderer.full(state, [("SCORE : 0", BLUE, 20)])
+        return state, steering, renderer
+
+    # Whole window drawn again for every frame
+    def full(state, steering, renderer):
+        for frame in range(FRAMES):
+            play(state, steering, 1)
+            renderer.full(state, [("SCORE : %d" % frame, BLUE, 20)])
+
+    # What the game does: squares that changed, interpolated heads and tails, only the changed parts sent
+    def incremental(state, steering, renderer):
+        for frame in range(FRAMES):
+            play(state, steering, 1)
+            renderer.tick(state, [("SCORE : %d" % frame, BLUE, 20)])
+            renderer.interpolate(state, 0.5)
+            renderer.update()
+
+    try:
+        for length in (3, size // 2):
+            results['render_full/length_%d' % length] = measure(lambda: setup(length), full, FRAMES)
+            results['render_incremental/length_%d' % length] = measure(lambda: setup(length), incremental, FRAMES)
+    finally:
+        pygame.quit()
+    return results
+
+
+BENCHMARKS = [('move', bench_move), ('spawn', bench_spawn), ('collision', bench_collision), ('render', bench_render)]
+
+
+# Print every result next to the baseline, returns the names of the benchmarks that got slower than THRESHOLD
+def compare(results, baseline, threshold=THRESHOLD):
+    slower = []
+    print("%-32s %12s %12s %8s" % ("benchmark (us per op)", "baseline", "now", "change"))
+    for name, now in results.items():
+        before = baseline.get(name)
+        if before is None:
+            print("%-32s %12s %12.3f %8s" % (name, "-", now, "new"))
+            continue
+        change = now / before - 1
+        flag = ""
+        if change > threshold:
+            slower.append(name)
+            flag = "  SLOWER"
+        print("%-32s %12.3f %12.3f %+7.0f%%%s" % (name, before, now, change * 100, flag))
+    return slower
+
+
+def save(path, results):
+    with open(path, 'w') as file:
+        json.dump({'python': platform.python_version(), 'machine': platform.machine(), 'results': results}, file,
+                  indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    names = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    results = {}
+    for name, benchmark in BENCHMARKS:
+        if not names or any(name.startswith(prefix) or prefix.startswith(name) for prefix in names):
+            for key, value in benchmark().items():
+                if not names or any(key.startswith(prefix) for prefix in names):
+                    results[key] = value
+    save(RESULTS_PATH, results)
+    if '--save-baseline' in sys.argv:
+        save(BASELINE_PATH, results)
+        print("baseline saved to %s" % BASELINE_PATH)
+    elif os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as file:
+            baseline = json.load(file)
+        if (baseline['python'], baseline['machine']) != (platform.python_version(), platform.machine()):
+            print("baseline made with Python %s on %s, make one on this computer to compare times: "
+                  "python bench.py --save-baseline" % (baseline['python'], baseline['machine']))
+        slower = compare(results, baseline['results'])
+        if slower:
+            print("%d benchmark(s) slower than the baseline" % len(slower))
+            sys.exit(1)
+    else:
+        compare(results, {})
+        print("no baseline yet, run python bench.py --save-baseline")
@@ -0,0 +1,47 @@
+from collections import deque
+
+# Vector (column, row) for each direction a snake can take
+DIRECTIONS = {'r': (1, 0), 'l': (-1, 0), 'u': (0, -1), 'd': (0, 1)}
+
+
+# Body of a snake: a deque of positions (column, row) from head to tail and a set of the squares it occupies
+# Moving pushes a new head and pops the tail, growing puts the popped tail back, and checking if a square is
+# part of the body is a set lookup, so every tick costs the same no matter how long the snake is
+class Body:
+    def __init__(self, cells):
+        self.cells = deque(cells)
+        self.occupied = set(self.cells)
+        # Tail removed by the last move (put back if the snake grows)
+        self.last_tail = None
+        # True if the head went into the rest of the body on the last move (the snake is dead after that)
+        self.hit = False
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __iter__(self):
+        return iter(self.cells)
+
+    # Only the head (0) and tail (-1) are constant time, which is all the game needs
+    def __getitem__(self, ind):
+        return self.cells[ind]
+
+    def __contains__(self, pos):
+        return pos in self.occupied
+
+    # Move the head to (col, row) and return the square freed by the tail
+    def move(self, col, row):
+        # Remove the tail first, going into the square the tail just left is allowed
+        tail = self.cells.pop()
+        self.occupied.discard(tail)
+        self.last_tail = tail
+        self.hit = (col, row) in self.occupied
+        self.cells.appendleft((col, row))
+        self.occupied.add((col, row))
+        return tail
+
+    # Add one body part where the tail was before the last move
+    def grow(self):
+        self.cells.append(self.last_tail)
+        self.occupied.add(self.last_tail)
+        return self.last_tail
@@ -0,0 +1,453 @@
+import asyncio
+import copy
+import sys
+import time
+from collections import deque
+from random import Random
+from autopilot import greedy_turn
+from body import Body, DIRECTIONS
+from engine import GameState
+from replay import CODES, decode_cells
+from server import APPLE_MOVED, END, GREW, LENGTH, LOST, START, TICK, Server, decode_apple
+
+# Client of server.py: sends the turns of its snake and keeps a copy of the game from the messages of the server
+# (the copy is a GameState, so it can be drawn by render.Renderer like a local game)
+
+# Direction of each head move
+MOVES = {speed: direction for direction, speed in DIRECTIONS.items()}
+# Most ticks played ahead of the last tick received (the prediction stops there if the server stops answering)
+MAX_AHEAD = 20
+# Number of ticks and turns kept to estimate the clock of the server and the round trip time
+SAMPLES = 20
+
+
+class Client:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        # Copy of the game, None until the first round starts
+        self.state = None
+        # Index of our snake and number of ticks per second of the server
+        self.player = None
+        self.tick_rate = None
+        # Winner of the last round (-1 for a tie)
+        self.winner = None
+        # Turns of each snake the server used or dropped so far (2 bytes, starts again at 0 after 65535)
+        self.done = [0, 0]
+
+    @classmethod
+    async def connect(cls, host='127.0.0.1', port=5555):
+        (reader, writer) = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    # Ask our snake to turn ('r', 'l', 'u' or 'd')
+    def turn(self, direction):
+        self.writer.write(bytes((CODES[direction],)))
+
+    def close(self):
+        self.writer.close()
+
+    # Wait for the next message and put it in the copy of the game, returns its type (b'S', b'G', b'T' or b'E')
+    # or None once the server closed the connection
+    async def receive(self):
+        try:
+            (length,) = LENGTH.unpack(await self.reader.readexactly(LENGTH.size))
+            message = await self.reader.readexactly(length)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return None
+        kind = message[:1]
+        if kind == b'S':
+            self.new_round(message)
+        elif kind == b'G':
+            self.state.start()
+        elif kind == b'T':
+            self.tick(message)
+        elif kind == b'E':
+            (_, self.winner, *self.state.wins) = END.unpack(message)
+        return kind
+
+    def new_round(self, message):
+        (_, num_col, num_row, self.player, self.tick_rate, *wins) = START.unpack_from(message)
+        if self.state is None or (self.state.num_col, self.state.num_row) != (num_col, num_row):
+            self.state = GameState(num_col, num_row, 2)
+        state = self.state
+        state.reset()
+        state.wins = wins
+        offset = START.size
+        (state.applec, state.appler) = decode_apple(message[offset:offset + 2])
+        offset += 2
+        for snake in state.snakes:
+            (length,) = LENGTH.unpack_from(message, offset)
+            offset += LENGTH.size
+            snake.body = Body(decode_cells(message[offset:offset + 2 * length]))
+            offset += 2 * length
+
+    def tick(self, message):
+        state = self.state
+        (_, state.ticks, flags, *self.done) = TICK.unpack_from(message)
+        offset = TICK.size
+        heads = decode_cells(message[offset:offset + 2 * len(state.snakes)])
+        offset += 2 * len(state.snakes)
+        for ind, (snake, (col, row)) in enumerate(zip(state.snakes, heads)):
+            (head_col, head_row) = snake.body[0]
+            snake.dir = MOVES.get((col - head_col, row - head_row), snake.dir)
+            snake.body.move(col, row)
+            if flags & GREW << 2 * ind:
+                snake.body.grow()
+            if flags & LOST << 2 * ind:
+                state.loser.append(ind)
+        if flags & APPLE_MOVED:
+            (state.applec, state.appler) = decode_apple(message[offset:offset + 2])
+
+
+# Client that moves its own snake as soon as a key is pressed instead of waiting for the server
+# The game is played ahead of the last tick received, by about the round trip time, on a copy of it with the turns
+# the server didn't use yet (the other snake goes straight), and played again from every new tick received,
+# so a wrong guess (other snake turned, new apple) only lasts until the server's tick comes
+class PredictingClient(Client):
+    def __init__(self, reader, writer):
+        super().__init__(reader, writer)
+        # Turns not used by the server yet: [number, direction, tick it is used on, time sent, shown]
+        self.pending = deque()
+        self.sent = 0
+        # tick - time * tick_rate of the last ticks received (the largest comes from the least delayed message)
+        self.offsets = deque(maxlen=SAMPLES)
+        # Times pings were sent and the last round trip times measured with them
+        self.pings = deque()
+        self.round_trips = deque(maxlen=SAMPLES)
+        # Copy played ahead and the tick it was played to (None when it has to be played again)
+        self.predicted = None
+        self.predicted_tick = None
+        # Snakes and apple predicted for each tick, compared to the server's tick when it comes
+        self.guesses = {}
+        self.checked = 0
+        self.wrong = 0
+        # Seconds between a turn and the move that shows it (predicted) or the server's tick that used it (confirmed)
+        self.shown = []
+        self.confirmed = []
+
+    # Tick the server will be at when a turn sent now gets to it
+    def ahead(self, now):
+        state = self.state
+        if not self.offsets or state.over() or state.snakes[self.player].dir is None:
+            return state.ticks
+        server = now * self.tick_rate + max(self.offsets)
+        if self.round_trips:
+            server += min(self.round_trips) * self.tick_rate
+        return max(state.ticks, min(int(server), state.ticks + MAX_AHEAD))
+
+    def turn(self, direction, now=None):
+        if now is None:
+            now = time.perf_counter()
+        self.sent += 1
+        self.pending.append([self.sent, direction, self.ahead(now) + 1, now, False])
+        self.predicted = None
+        super().turn(direction)
+
+    # Measure the round trip time (the answer is read by receive)
+    def ping(self):
+        self.sent += 1
+        self.pings.append(time.perf_counter())
+        self.writer.write(bytes((0,)))
+
+    async def receive(self):
+        kind = await super().receive()
+        now = time.perf_counter()
+        state = self.state
+        if kind == b'P':
+            self.round_trips.append(now - self.pings.popleft())
+        elif kind == b'S':
+            # Turns sent before the round started are dropped by the server
+            self.pending.clear()
+            self.offsets.clear()
+            self.guesses.clear()
+        elif kind == b'T':
+            self.offsets.append(state.ticks - now * self.tick_rate)
+            guess = self.guesses.pop(state.ticks, None)
+            if guess is not None:
+                self.checked += 1
+                self.wrong += guess != self.snapshot(state)
+            # Turns used or dropped by the server (the server only sends the last 2 bytes of the count)
+            done = self.sent - ((self.sent - self.done[self.player]) & 0xFFFF)
+            while self.pending and self.pending[0][0] <= done:
+                (_, _, _, sent, shown) = self.pending.popleft()
+                self.confirmed.append(now - sent)
+                if not shown:
+                    self.shown.append(now - sent)
+        self.predicted = None
+        return kind
+
+    @staticmethod
+    def snapshot(state):
+        return [list(snake.body) for snake in state.snakes], state.applec, state.appler
+
+    # Game as it should be now on the server (the state received if there is nothing to predict)
+    def predict(self, now=None):
+        if now is None:
+            now = time.perf_counter()
+        target = self.ahead(now)
+        if self.predicted is not None and self.predicted_tick == target:
+            return self.predicted
+        state = self.state
+        if target > state.ticks:
+            state = copy.deepcopy(state)
+            own = state.snakes[self.player]
+            turns = iter(self.pending)
+            waiting = next(turns, None)
+            for tick in range(state.ticks + 1, target + 1):
+                if state.over():
+                    break
+                while waiting is not None and waiting[2] <= tick:
+                    own.turn(waiting[1], waiting[0])
+                    waiting = next(turns, None)
+                state.step()
+                # First time a turn shows on the screen
+                for turn in self.pending:
+                    if turn[0] == own.input_time and not turn[4]:
+                        turn[4] = True
+                        self.shown.append(now - turn[3])
+                self.guesses[tick] = self.snapshot(state)
+        self.predicted = state
+        self.predicted_tick = target
+        return state
+
+
+# Turn that keeps the snake alive and brings it closer to the apple (None to go straight)
+def bot_turn(state, ind):
+    # Tails move away on the next tick, so their squares count as empty
+    def empty(col, row):
+        return (0 <= col < state.num_col and 0 <= row < state.num_row
+                and not any((col, row) in other.body and (col, row) != other.body[-1] for other in state.snakes))
+
+    target = None if state.applec is None else (state.applec, state.appler)
+    return greedy_turn(state.snakes[ind], empty, target)
+
+
+# Player controlled by bot_turn, plays until the server closes the connection
+async def bot(host='127.0.0.1', port=5555):
+    client = await Client.connect(host, port)
+    try:
+        while True:
+            kind = await client.receive()
+            if kind is None:
+                return
+            if kind in (b'G', b'T') and not client.state.over():
+                direction = bot_turn(client.state, client.player)
+                if direction is not None:
+                    client.turn(direction)
+    finally:
+        client.close()
+
+
+# Run a server on localhost with matches of bots for some seconds and print what a match costs the server
+async def load_test(matches, seconds=10, tick_rate=20):
+    server = Server(tick_rate=tick_rate, seed=0)
+    serving = asyncio.create_task(server.serve('127.0.0.1', 0))
+    while not hasattr(server, 'port'):
+        await asyncio.sleep(0.01)
+    bots = [asyncio.create_task(bot('127.0.0.1', server.port)) for _ in range(2 * matches)]
+    await asyncio.sleep(seconds)
+    print("%d matches, %d ticks in %d s (%.1f ticks/s for %d wanted)"
+          % (len(server.matches), server.ticks, seconds, server.ticks / seconds, tick_rate))
+    print("%.1f us and %.1f bytes sent per match tick, %.1f%% of the time spent stepping matches"
+          % (server.tick_time / max(server.match_ticks, 1) * 1e6, server.bytes_sent / max(server.match_ticks, 1),
+             server.tick_time / seconds * 100))
+    for task in bots:
+        task.cancel()
+    await asyncio.gather(*bots, return_exceptions=True)
+    # Let the server see every bot leave before stopping it
+    while server.matches:
+        await asyncio.sleep(0.01)
+    serving.cancel()
+    await asyncio.gather(serving, return_exceptions=True)
+
+
+# Connection that delays everything going through it by half of latency plus up to jitter (seconds) each way,
+# to try the game with a slow network on localhost (messages stay in order)
+async def lag_proxy(port, latency, jitter, seed=None):
+    rng = Random(seed)
+    loop = asyncio.get_running_loop()
+
+    async def pipe(reader, writer):
+        last = 0
+        try:
+            while True:
+                data = await reader.read(4096)
+                if not data:
+                    break
+                last = max(loop.time() + latency / 2 + rng.uniform(0, jitter), last + 1e-6)
+                loop.call_at(last, writer.write, data)
+        except ConnectionError:
+            pass
+        loop.call_at(max(loop.time(), last + 1e-6), writer.close)
+
+    async def handle(reader, writer):
+        (server_reader, server_writer) = await asyncio.open_connection('127.0.0.1', port)
+        await asyncio.gather(pipe(reader, server_writer), pipe(server_reader, writer))
+
+    return await asyncio.start_server(handle, '127.0.0.1', 0)
+
+
+# Bots playing through lag_proxy with prediction: how long a turn takes to show and how often the guesses are wrong
+async def lag_test(latency, jitter, seconds=20, tick_rate=10):
+    server = Server(tick_rate=tick_rate, seed=0)
+    serving = asyncio.create_task(server.serve('127.0.0.1', 0))
+    while not hasattr(server, 'port'):
+        await asyncio.sleep(0.01)
+    proxy = await lag_proxy(server.port, latency, jitter, seed=0)
+    port = proxy.sockets[0].getsockname()[1]
+    clients = [await PredictingClient.connect('127.0.0.1', port) for _ in range(2)]
+
+    async def read(client):
+        while await client.receive() is not None:
+            pass
+
+    async def ping(client):
+        while True:
+            client.ping()
+            await asyncio.sleep(0.5)
+
+    # Decide once per predicted tick, on the prediction (what a player would see)
+    async def decide(client, rng):
+        last = None
+        while True:
+            await asyncio.sleep(1 / (4 * tick_rate))
+            if client.state is None:
+                continue
+            state = client.predict()
+            if state.ticks == last or state.over() or state.snakes[client.player].dir is None:
+                continue
+            last = state.ticks
+            direction = bot_turn(state, client.player)
+            if direction is None and rng.random() < 0.2:
+                direction = rng.choice('rlud')
+            if direction is not None:
+                client.turn(direction)
+
+    tasks = [asyncio.create_task(read(client)) for client in clients]
+    tasks += [asyncio.create_task(decide(client, Random(ind))) for ind, client in enumerate(clients)]
+    tasks += [asyncio.create_task(ping(client)) for client in clients]
+    await asyncio.sleep(seconds)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    def percentiles(times):
+        times = sorted(times)
+        if not times:
+            return "-"
+        return "%.0f / %.0f ms" % (times[len(times) // 2] * 1000, times[int(len(times) * 0.95)] * 1000)
+
+    shown = [t for client in clients for t in client.shown]
+    confirmed = [t for client in clients for t in client.confirmed]
+    checked = sum(client.checked for client in clients)
+    wrong = sum(client.wrong for client in clients)
+    print("latency %d ms + up to %d ms jitter, %d ticks/s" % (latency * 1000, jitter * 1000, tick_rate))
+    print("turn shown after (median / 95%%) %s, used by the server after %s"
+          % (percentiles(shown), percentiles(confirmed)))
+    print("%d predicted ticks checked, %.1f%% wrong" % (checked, 100 * wrong / max(checked, 1)))
+    for client in clients:
+        client.close()
+    proxy.close()
+    while server.matches:
+        await asyncio.sleep(0.01)
+    serving.cancel()
+    await asyncio.gather(serving, return_exceptions=True)
+
+
+# Play online in a window, arrows or WASD to turn (the own snake turns without waiting for the server)
+async def play(host, port):
+    import fonts
+    import pygame
+    from render import BOX, BLUE, GREEN, RED, YELLOW, Renderer, text_cache
+
+    client = await PredictingClient.connect(host, port)
+    pygame.init()
+    font = fonts.load('comicsans', 50)
+    win = pygame.display.set_mode((17 * BOX, 15 * BOX + 75))
+    pygame.display.set_caption("Snake - waiting for an opponent")
+    renderer = None
+    keys = {pygame.K_RIGHT: 'r', pygame.K_LEFT: 'l', pygame.K_UP: 'u', pygame.K_DOWN: 'd',
+            pygame.K_d: 'r', pygame.K_a: 'l', pygame.K_w: 'u', pygame.K_s: 'd'}
+
+    def score_texts(state):
+        return [("GREEN : " + str(state.wins[1]), GREEN, (state.num_col - 6) * BOX),
+                ("BLUE : " + str(state.wins[0]), BLUE, 20)]
+
+    # Messages are read by a task of their own and handled between two frames
+    messages = asyncio.Queue()
+
+    async def read_messages():
+        while True:
+            kind = await client.receive()
+            messages.put_nowait(kind)
+            if kind is None:
+                return
+
+    async def ping():
+        while True:
+            client.ping()
+            await asyncio.sleep(1)
+
+    reading = asyncio.create_task(read_messages())
+    pinging = asyncio.create_task(ping())
+    # State on the screen and whether the round is over
+    drawn = None
+    ended = False
+    try:
+        while True:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    return
+                if event.type == pygame.KEYDOWN and event.key in keys and renderer is not None:
+                    client.turn(keys[event.key])
+            while not messages.empty():
+                kind = messages.get_nowait()
+                state = client.state
+                if kind is None:
+                    return
+                if kind == b'S':
+                    size = (state.num_col * BOX, state.num_row * BOX + 75)
+                    if win.get_size() != size:
+                        win = pygame.display.set_mode(size)
+                    if renderer is None or renderer.num_col != state.num_col or renderer.num_row != state.num_row:
+                        renderer = Renderer(win, state.num_col, state.num_row, font)
+                    else:
+                        renderer.set_window(win)
+                    pygame.display.set_caption("Snake - you are " + ("BLUE", "GREEN")[client.player])
+                    ended = False
+                elif kind == b'E':
+                    ended = True
+            if renderer is not None:
+                # The prediction is played again from every tick received, so it is drawn whole when it changes
+                predicted = client.predict()
+                if predicted is not drawn:
+                    drawn = predicted
+                    renderer.full(predicted, score_texts(client.state))
+                    if ended:
+                        text = ('BLUE WINS', 'GREEN WINS', 'TIE')[client.winner]
+                        text_box = pygame.Rect((20, 20), (270, 60))
+                        pygame.draw.rect(win, YELLOW, text_box)
+                        win.blit(text_cache.render(font, text, RED), (30, 35))
+                        renderer.dirty.append(text_box)
+                renderer.update()
+            await asyncio.sleep(1 / 60)
+    finally:
+        reading.cancel()
+        pinging.cancel()
+        client.close()
+        pygame.quit()
+
+
+# python client.py [host] [port]: play online
+# python client.py --bots matches [seconds]: load test of a local server with bots
+# python client.py --lag latency_ms [jitter_ms] [seconds]: prediction test through a slow connection on localhost
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--bots':
+        asyncio.run(load_test(int(sys.argv[2]), int(sys.argv[3]) if len(sys.argv) > 3 else 10))
+    elif len(sys.argv) > 1 and sys.argv[1] == '--lag':
+        asyncio.run(lag_test(int(sys.argv[2]) / 1000, int(sys.argv[3]) / 1000 if len(sys.argv) > 3 else 0,
+                             int(sys.argv[4]) if len(sys.argv) > 4 else 20))
+    else:
+        asyncio.run(play(sys.argv[1] if len(sys.argv) > 1 else '127.0.0.1',
+                         int(sys.argv[2]) if len(sys.argv) > 2 else 5555))
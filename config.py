@@ -0,0 +1,70 @@
+import os
+import sys
+
+# Settings of the last game (grid size, number of players, window or fullscreen) kept between launches
+# They are the starting values of the settings window, and python Snake.py --quick uses them directly without
+# opening the settings window at all
+# The file has one "name = value" per line, lines starting with # are ignored and a missing or wrong value
+# uses the default
+
+DEFAULTS = {'columns': 17, 'rows': 15, 'players': 1, 'fullscreen': 0}
+# Smallest and largest value allowed (same limits as the settings window)
+LIMITS = {'columns': (12, 50), 'rows': (10, 30), 'players': (1, 2), 'fullscreen': (0, 1)}
+
+
+# File of the data folder (icons, image and font of the game), found from where the game is and not from the
+# folder it is started from: next to the code, or next to the executable once built with setup.py
+def data_path(name):
+    if getattr(sys, 'frozen', False):
+        folder = os.path.dirname(sys.executable)
+    else:
+        folder = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(folder, 'data', name)
+
+
+# Settings in the folder of the user (the game folder may not be writable)
+def config_path():
+    folder = os.environ.get('APPDATA') or os.environ.get('XDG_CONFIG_HOME')
+    if not folder:
+        folder = os.path.join(os.path.expanduser('~'), '.config')
+    return os.path.join(folder, 'snake', 'settings.txt')
+
+
+# Number value of a setting, None if it isn't a number or is out of the limits
+def valid(name, value):
+    try:
+        value = int(value)
+    except ValueError:
+        return None
+    (low, high) = LIMITS[name]
+    return value if low <= value <= high else None
+
+
+def load():
+    values = dict(DEFAULTS)
+    try:
+        with open(config_path(), encoding='utf-8') as file:
+            for line in file:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                (name, _, value) = line.partition('=')
+                name = name.strip()
+                if name in LIMITS and valid(name, value) is not None:
+                    values[name] = valid(name, value)
+    except OSError:
+        pass
+    return values
+
+
+def save(values):
+    path = config_path()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write("# Snake settings, saved when the game closes (fullscreen: 0 or 1)\n")
+            for name in DEFAULTS:
+                file.write("%s = %d\n" % (name, values[name]))
+    # Nothing is saved on a read-only disk, the next launch uses the defaults
+    except OSError:
+        pass
@@ -0,0 +1,192 @@
+from collections import deque
+from random import Random
+from body import Body, DIRECTIONS
+from freecells import FreeCells
+
+# Game rules without any drawing, so games can be played without a window (no pygame here)
+
+# Number of turns a snake remembers, one is used on each move
+INPUT_QUEUE = 3
+
+
+# Create a class for the snake object (every snake has the same attributes)
+class Snake:
+    # Declare the attributes that each snake has
+    def __init__(self, start_col, start_row):
+        # Snake body contains the position of each body part as tuples (column, row), head first
+        self.body = Body([(start_col, start_row), (start_col - 1, start_row), (start_col - 2, start_row)])
+        # Direction the head is going ('r', 'l', 'u' or 'd'), None while the snake waits for the start
+        self.dir = None
+        # Turns to take on the next moves with the time they were asked (the rest of the body follows the head)
+        # so two keys pressed during the same tick are both used
+        self.inputs = deque()
+        # Turn used by the last move and the time it was asked (None if the snake went straight)
+        self.input = None
+        self.input_time = None
+
+    # Direction of the next move
+    def heading(self):
+        if self.inputs:
+            return self.inputs[0][0]
+        return self.dir
+
+    # Ask the snake to turn after the turns already asked, time is when it was asked (any unit, only kept)
+    def turn(self, direction, time=None):
+        # Only turn perpendicular to the previous turn (a snake can't go back into its own neck)
+        last = self.inputs[-1][0] if self.inputs else self.dir
+        if len(self.inputs) < INPUT_QUEUE and (last is None or (direction in 'rl') != (last in 'rl')):
+            self.inputs.append((direction, time))
+
+    # Moving the snake by one box (returns False if the snake didn't move)
+    def move_snake(self):
+        self.input = None
+        self.input_time = None
+        if self.inputs:
+            (self.input, self.input_time) = self.inputs.popleft()
+            self.dir = self.input
+        # Snake doesn't move before the start
+        if self.dir is None:
+            return False
+        # New head one square ahead of the current head, the tail is removed
+        (col, row) = self.body[0]
+        (speed_x, speed_y) = DIRECTIONS[self.dir]
+        self.body.move(col + speed_x, row + speed_y)
+        return True
+
+    # Check if snake lost (boolean function -> if snake dies, returns True, otherwise, False)
+    def lose(self, num_col, num_row):
+        # Check if snake head went into its own body
+        if self.body.hit:
+            return True
+        # Check if snake head is outside of game grid
+        (col, row) = self.body[0]
+        if col < 0 or row < 0 or col >= num_col or row >= num_row:
+            return True
+        # Default return value of function
+        return False
+
+    # Check collision between snake head and apple (boolean function)
+    def check_eat(self, applec, appler):
+        # If the snake head is on the apple, there is collision
+        if self.body[0] == (applec, appler):
+            # Add one body part where the tail was before moving
+            self.body.grow()
+            return True
+        # If no collision, function returns False
+        return False
+
+
+# Everything needed to play one game: grid size, snakes, apple and scores
+class GameState:
+    def __init__(self, num_col=17, num_row=15, num_player=1, seed=None):
+        self.num_col = num_col
+        self.num_row = num_row
+        self.num_player = num_player
+        # Each game has its own random generator, so a seed always gives the same apples
+        # (a seed is picked when none is given so the game can still be replayed)
+        if seed is None:
+            seed = Random().getrandbits(64)
+        self.seed = seed
+        self.rng = Random(seed)
+        # Apples eaten during the current round (singleplayer)
+        self.score = 0
+        # Rounds won by each snake (multiplayer)
+        self.wins = [0] * num_player
+        # timing.Profiler told when each part of a tick ends (None when nothing is timed)
+        self.profiler = None
+        self.reset()
+
+    # Start a new round (scores are kept)
+    def reset(self):
+        if self.num_player == 1:
+            self.snakes = [Snake(4, self.num_row // 2)]
+        else:
+            self.snakes = [Snake(4, self.num_row // 2 - 1), Snake(4, self.num_row // 2 + 1)]
+        # Initial apple position
+        self.applec = 3 * self.num_col // 4
+        self.appler = self.num_row // 2
+        # Empty squares, updated on every move so a new apple is one random draw
+        self.free = FreeCells(self.num_col, self.num_row, [pos for snake in self.snakes for pos in snake.body])
+        # List of the snakes that lost this round (two losers is a tie)
+        self.loser = []
+        self.ticks = 0
+        if self.num_player == 1:
+            self.score = 0
+
+    # Make everyone go to the right (already moving, so the first turn can't go back to the left)
+    def start(self):
+        for snake in self.snakes:
+            snake.dir = 'r'
+
+    # True once at least one snake lost or the grid is full (no apple left)
+    def over(self):
+        return len(self.loser) != 0 or self.applec is None
+
+    # Snake that won the round, None if there is no winner (tie, singleplayer or game not over)
+    def winner(self):
+        if self.num_player == 2 and len(self.loser) == 1:
+            return 1 - self.loser[0]
+        return None
+
+    # Create new apple on a square that is not already in a snake (None when the snakes fill the grid)
+    def apple(self):
+        pos = self.free.choice(self.rng)
+        if pos is None:
+            self.applec = self.appler = None
+        else:
+            (self.applec, self.appler) = pos
+
+    # Play one tick, actions has a turn ('r', 'l', 'u', 'd') or None for each snake
+    # Returns the list of snakes that lost
+    def step(self, actions=None):
+        snakes = self.snakes
+        if actions is not None:
+            for snake, action in zip(snakes, actions):
+                if action is not None:
+                    snake.turn(action)
+
+        # Move the snakes all at the same time to get true ties
+        moved = [snake for snake in snakes if snake.move_snake()]
+        self.ticks += 1
+        # Free the tails before taking the heads, a head can go where a tail just was
+        free = self.free
+        for snake in moved:
+            free.give(snake.body.last_tail)
+        for snake in moved:
+            free.take(snake.body[0])
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.mark('move')
+
+        loser = self.loser
+        for ind, snake in enumerate(snakes):
+            # Check which snake lost
+            if snake.lose(self.num_col, self.num_row):
+                loser.append(ind)
+            # Check if the snake ate
+            elif snake.check_eat(self.applec, self.appler):
+                free.take(snake.body[-1])
+                self.score += 1
+                if profiler is not None:
+                    profiler.mark('collisions')
+                self.apple()
+                if profiler is not None:
+                    profiler.mark('apple')
+
+        # Check if a snake head is in another snake (head against head included)
+        # A snake that lost in two ways (its own body and the other head on the same square) is only listed once:
+        # the round is a tie when both snakes lost, when only one did the other one wins
+        for ind, snake in enumerate(snakes):
+            head = snake.body[0]
+            for other_ind, other in enumerate(snakes):
+                if other_ind != ind and head in other.body and ind not in loser:
+                    loser.append(ind)
+        if profiler is not None:
+            profiler.mark('collisions')
+
+        # Opponent of the loser gets a point
+        if loser:
+            winner = self.winner()
+            if winner is not None:
+                self.wins[winner] += 1
+        return loser
@@ -0,0 +1,80 @@
+import os
+import pygame
+import config
+
+# Fonts loaded by name like pygame.font.SysFont, without looking through the fonts of the system on every launch
+# SysFont lists every installed font the first time it is called (slow on some computers), the file found for
+# each name is saved in a small text file (name, tab, path on each line) and opened directly on the next launches
+# A name that isn't installed uses the font shipped in data/, the same file as pygame's default font that SysFont
+# falls back to (a build made with setup.py may not have the one inside pygame)
+
+# pygame.font.Font(None, size) draws its default font at this part of the size asked, the font in data/ is opened
+# at the same size so the text looks the same as with SysFont (the text boxes of the game are made for that size)
+FALLBACK = config.data_path('freesansbold.ttf')
+FALLBACK_SCALE = 0.6875
+
+# File of each font name already looked for ('' when the font isn't installed), read from the cache on first use
+paths = None
+# True once the fonts of the system were listed during this launch (shown by python Snake.py --startup-time)
+scanned = False
+
+
+# Cache in the folder of the user (the game folder may not be writable)
+def cache_path():
+    folder = os.environ.get('LOCALAPPDATA') or os.environ.get('XDG_CACHE_HOME')
+    if not folder:
+        folder = os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(folder, 'snake', 'fonts.txt')
+
+
+def read_cache():
+    found = {}
+    try:
+        with open(cache_path(), encoding='utf-8') as file:
+            for line in file:
+                (name, _, path) = line.rstrip('\n').partition('\t')
+                found[name] = path
+    except OSError:
+        pass
+    return found
+
+
+def write_cache():
+    path = cache_path()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as file:
+            for name, font in sorted(paths.items()):
+                file.write("%s\t%s\n" % (name, font))
+    # Nothing is saved on a read-only disk, the fonts are looked for again on the next launch
+    except OSError:
+        pass
+
+
+# Font file of a font name ('' if it isn't installed)
+def font_path(name):
+    global paths, scanned
+    if paths is None:
+        paths = read_cache()
+    path = paths.get(name)
+    if path is None or path and not os.path.exists(path):
+        scanned = True
+        path = pygame.font.match_font(name) or ''
+        paths[name] = path
+        write_cache()
+    return path
+
+
+# Same as pygame.font.SysFont(name, size)
+def load(name, size):
+    path = font_path(name)
+    if path:
+        try:
+            return pygame.font.Font(path, size)
+        except (OSError, pygame.error):
+            pass
+    try:
+        return pygame.font.Font(FALLBACK, max(1, int(size * FALLBACK_SCALE)))
+    # Font in data/ missing too: font inside pygame
+    except (OSError, pygame.error):
+        return pygame.font.Font(None, size)
@@ -0,0 +1,38 @@
+# Squares of the grid that are not part of any snake, to put an apple on a random empty square in one draw
+# Squares are kept in a list (order doesn't matter) with a dictionary giving the index of each square in the list,
+# so adding or removing a square swaps it with the last one instead of searching the list
+class FreeCells:
+    def __init__(self, num_col, num_row, taken=()):
+        self.cells = [(col, row) for row in range(num_row) for col in range(num_col)]
+        self.index = {pos: ind for ind, pos in enumerate(self.cells)}
+        for pos in taken:
+            self.take(pos)
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __contains__(self, pos):
+        return pos in self.index
+
+    # Square becomes part of a snake (nothing happens if it is not free or outside of the grid)
+    def take(self, pos):
+        ind = self.index.pop(pos, None)
+        if ind is None:
+            return
+        last = self.cells.pop()
+        # Move the last square into the hole, unless the removed square was the last one
+        if ind < len(self.cells):
+            self.cells[ind] = last
+            self.index[last] = ind
+
+    # Square is free again
+    def give(self, pos):
+        if pos not in self.index:
+            self.index[pos] = len(self.cells)
+            self.cells.append(pos)
+
+    # Random free square, None if the grid is full
+    def choice(self, rng):
+        if not self.cells:
+            return None
+        return self.cells[rng.randrange(len(self.cells))]
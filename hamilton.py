@@ -0,0 +1,197 @@
+import time
+from collections import deque
+from body import DIRECTIONS
+
+# Bot that never loses in singleplayer: the snake follows a cycle that goes through every square of the grid
+# (a Hamiltonian cycle), so its body is always on the part of the cycle behind the head and the squares in front
+# of it are free until the tail. While the snake is short it takes shortcuts (skips part of the cycle) towards
+# the apple, a shortcut is safe as long as it lands before the tail on the cycle
+# Rounds played by this bot go on until the grid is full, the longest and fullest games there can be
+#
+# A grid with an odd number of columns and rows has an odd number of squares and no such cycle (every move goes
+# from a "black" square to a "white" one, so a cycle has as many of each), the cycle then leaves out the bottom
+# right corner. The two cycle squares next to the corner are on each side of the square in their diagonal:
+# when the apple is on the corner the cycle goes through the corner instead of that square, which is left
+# out until the apple is on it (the last apple of the round is on it or on the corner, both are reachable)
+
+# Cycle of each grid size: (squares in cycle order, square left out or None, position in the cycle of the
+# square that can be swapped with the one left out)
+cycles = {}
+# Shortcuts are only taken while the snake is shorter than this part of the cycle (skipped squares stay empty
+# until the tail gets there, a long snake would have to go around them again)
+SHORTCUT_LIMIT = 0.5
+# Number of decision times kept for the metric
+SAMPLES = 100
+
+
+# Cycle of a grid where num_row is even: the first row from left to right, every other row back and forth
+# without the first column, then the first column upwards
+def even_rows(num_col, num_row):
+    order = [(col, 0) for col in range(num_col)]
+    for row in range(1, num_row):
+        cols = range(num_col - 1, 0, -1) if row % 2 == 1 else range(1, num_col)
+        order.extend((col, row) for col in cols)
+    order.extend((0, row) for row in range(num_row - 1, 0, -1))
+    return order
+
+
+def cycle(num_col, num_row):
+    key = (num_col, num_row)
+    if key not in cycles:
+        if num_row % 2 == 0:
+            cycles[key] = (tuple(even_rows(num_col, num_row)), None, None)
+        elif num_col % 2 == 0:
+            # Same cycle turned on its side
+            cycles[key] = (tuple((col, row) for (row, col) in even_rows(num_row, num_col)), None, None)
+        else:
+            # Cycle of the grid without its last row, the last row (without the corner) is added in pairs of
+            # squares: on the row above it, the cycle goes right to left, the move from (col, row) to
+            # (col - 1, row) becomes a step down, a step to the left and a step back up
+            last = num_row - 1
+            order = []
+            for pos in even_rows(num_col, last):
+                (col, row) = pos
+                order.append(pos)
+                if row == last - 1 and col % 2 == 1 and col < num_col - 1:
+                    order.extend([(col, last), (col - 1, last)])
+            # The cycle goes (num_col - 1, last - 1), (num_col - 2, last - 1), (num_col - 2, last): the middle one
+            # is the diagonal of the corner and can be swapped with it
+            cycles[key] = (tuple(order), (num_col - 1, last), order.index((num_col - 2, last - 1)))
+    return cycles[key]
+
+
+class CycleSolver:
+    def __init__(self, ind=0, shortcut_limit=SHORTCUT_LIMIT):
+        # Snake played
+        self.ind = ind
+        self.shortcut_limit = shortcut_limit
+        # Round the cycle was copied for (the swap of an odd grid changes the copy)
+        self.snakes = None
+        # Moves the snake made to the next square of the cycle in a row: once there are as many as body parts,
+        # the whole body is on the cycle in order (a snake handed over in the middle of a round has to get there)
+        self.streak = 0
+        # Time taken by the last decisions (seconds)
+        self.times = deque(maxlen=SAMPLES)
+
+    # Average time of the last decisions in milliseconds
+    def decision_time(self):
+        if not self.times:
+            return 0
+        return sum(self.times) / len(self.times) * 1000
+
+    # Copy of the cycle for a new round (position of each square in it)
+    def load(self, state):
+        (order, self.spare, self.slot) = cycle(state.num_col, state.num_row)
+        self.order = list(order)
+        self.index = {pos: num for num, pos in enumerate(order)}
+        self.snakes = state.snakes
+        self.streak = 0
+
+    # True if nothing is on the square (a tail is there but moves away unless its snake eats)
+    def free(self, state, pos):
+        (col, row) = pos
+        if not (0 <= col < state.num_col and 0 <= row < state.num_row):
+            return False
+        return not any(pos in snake.body for snake in state.snakes)
+
+    # Turn to take before the next tick ('r', 'l', 'u', 'd' or None to go straight)
+    def decide(self, state):
+        start = time.perf_counter()
+        if state.snakes is not self.snakes:
+            self.load(state)
+        snake = state.snakes[self.ind]
+        direction = None
+        if snake.dir is not None:
+            pos = self.choose(state, snake)
+            if pos is not None:
+                direction = self.direction(snake.body[0], pos)
+                if direction == snake.dir:
+                    direction = None
+        self.times.append(time.perf_counter() - start)
+        return direction
+
+    # Square to move to, only a few lookups whatever the size of the grid and the length of the snake
+    def choose(self, state, snake):
+        body = snake.body
+        order = self.order
+        size = len(order)
+        head = self.index[body[0]]
+        apple = (state.applec, state.appler)
+        following = self.streak >= len(body)
+
+        # Apple on the square left out of the cycle: the cycle goes through it instead of the square next
+        # to the head (only when that square is in front of the tail, or when this apple fills the grid)
+        if self.spare is not None and apple == self.spare and following and head == self.slot - 1:
+            room = (self.index[body[-1]] - head) % size
+            if room >= 2 or len(body) == size:
+                swapped = order[self.slot]
+                order[self.slot] = self.spare
+                self.index[self.spare] = self.slot
+                del self.index[swapped]
+                self.spare = swapped
+                self.streak += 1
+                return order[self.slot]
+
+        following_pos = order[(head + 1) % size]
+        if not following:
+            # Getting onto the cycle: next square of the cycle if it is free, otherwise any free square
+            # (the neck is never free)
+            if self.free(state, following_pos) or following_pos == body[-1]:
+                self.streak += 1
+                return following_pos
+            self.streak = 0
+            (col, row) = body[0]
+            for (speed_x, speed_y) in DIRECTIONS.values():
+                pos = (col + speed_x, row + speed_y)
+                if self.free(state, pos):
+                    return pos
+            return None
+
+        self.streak += 1
+        if len(body) >= self.shortcut_limit * size or apple not in self.index:
+            return following_pos
+        # Squares of the cycle in front of the head up to the tail are free, the snake can go to any of them
+        # that is next to the head: the one closest to the apple without going past it
+        room = (self.index[body[-1]] - head) % size
+        goal = (self.index[apple] - head) % size
+        best = (1, following_pos)
+        (col, row) = body[0]
+        for (speed_x, speed_y) in DIRECTIONS.values():
+            pos = (col + speed_x, row + speed_y)
+            if pos not in self.index:
+                continue
+            distance = (self.index[pos] - head) % size
+            if best[0] < distance < room and distance <= goal and self.free(state, pos):
+                best = (distance, pos)
+        return best[1]
+
+    @staticmethod
+    def direction(start, pos):
+        return next(direction for direction, (speed_x, speed_y) in DIRECTIONS.items()
+                    if (start[0] + speed_x, start[1] + speed_y) == pos)
+
+
+# python hamilton.py [columns] [rows] [rounds]: the bot plays rounds until the grid is full, the number of ticks
+# and the decision times are printed
+if __name__ == '__main__':
+    import sys
+    from engine import GameState
+
+    args = [int(arg) for arg in sys.argv[1:]]
+    (num_col, num_row, rounds) = (args + [17, 15, 3][len(args):])[:3]
+    state = GameState(num_col, num_row, seed=0)
+    solver = CycleSolver()
+    for _ in range(rounds):
+        state.reset()
+        state.start()
+        start = time.perf_counter()
+        worst = 0
+        while not state.over():
+            before = time.perf_counter()
+            state.step([solver.decide(state)])
+            worst = max(worst, time.perf_counter() - before)
+        t = time.perf_counter() - start
+        result = "grid full" if state.applec is None else "lost"
+        print("%dx%d: %s after %d ticks, length %d, %.0f ticks/s, decision %.3f ms (tick worst %.3f ms)"
+              % (num_col, num_row, result, state.ticks, len(state.snakes[0].body), state.ticks / t,
+                 solver.decision_time(), worst * 1000))
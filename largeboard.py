@@ -0,0 +1,289 @@
+import sys
+import time
+from random import Random
+from arena import Arena, colors
+from autopilot import greedy_turn
+
+# Arena on a very large grid (1000x1000 and more): nothing is stored or done for the empty part of the grid
+# Squares taken by the snakes are bits in chunks of CHUNK x CHUNK squares, a chunk only exists while something is
+# in it, apples are put on random squares until one is empty (a few tries while the grid is mostly empty)
+# and collisions are found while the bits are set, so a tick costs the same on any grid size
+# Only the squares around the player's head are drawn (a camera following the head)
+
+# Chunks are 2 ** CHUNK_BITS squares wide (64 x 64 squares = 512 bytes)
+CHUNK_BITS = 6
+CHUNK = 1 << CHUNK_BITS
+# Tries to find an empty square for an apple before giving up (the grid is almost full)
+APPLE_TRIES = 100
+# Squares shown around the head
+VIEW_COL = 25
+VIEW_ROW = 19
+GRAY = (90, 90, 90)
+
+
+# Set of squares stored as bits, in chunks that are only created when a square in them is added
+class ChunkedBits:
+    def __init__(self):
+        # bytearray of each chunk and number of squares in it
+        self.chunks = {}
+        self.counts = {}
+
+    @staticmethod
+    def locate(pos):
+        (col, row) = pos
+        return (col >> CHUNK_BITS, row >> CHUNK_BITS), (row & CHUNK - 1) << CHUNK_BITS | col & CHUNK - 1
+
+    def __contains__(self, pos):
+        (key, bit) = self.locate(pos)
+        chunk = self.chunks.get(key)
+        return chunk is not None and chunk[bit >> 3] >> (bit & 7) & 1 == 1
+
+    # Add a square, returns False if it was already there
+    def add(self, pos):
+        (key, bit) = self.locate(pos)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            chunk = self.chunks[key] = bytearray(CHUNK * CHUNK // 8)
+            self.counts[key] = 0
+        mask = 1 << (bit & 7)
+        if chunk[bit >> 3] & mask:
+            return False
+        chunk[bit >> 3] |= mask
+        self.counts[key] += 1
+        return True
+
+    # Remove a square (nothing happens if it isn't there), an empty chunk is dropped
+    def discard(self, pos):
+        (key, bit) = self.locate(pos)
+        chunk = self.chunks.get(key)
+        mask = 1 << (bit & 7)
+        if chunk is None or not chunk[bit >> 3] & mask:
+            return
+        chunk[bit >> 3] &= ~mask
+        self.counts[key] -= 1
+        if self.counts[key] == 0:
+            del self.chunks[key]
+            del self.counts[key]
+
+
+class LargeArena(Arena):
+    def __init__(self, num_col=1000, num_row=1000, num_player=256, num_apple=None, seed=None):
+        # Enough apples for the snakes to find some without crossing the whole grid
+        self.num_apple = num_apple or max(1, num_player // 2)
+        super().__init__(num_col, num_row, num_player, seed)
+
+    def reset(self):
+        self.snakes = self.spawn()
+        self.bits = ChunkedBits()
+        for snake in self.snakes:
+            for pos in snake.body:
+                self.bits.add(pos)
+        # Apples, also by chunk so the apples near a square are found without looking at all of them
+        self.apples = set()
+        self.apple_chunks = {}
+        self.alive = [True] * self.num_player
+        self.scores = [0] * self.num_player
+        self.score = 0
+        self.loser = []
+        self.ticks = 0
+        # There is always an apple somewhere (used by GameState for a full grid)
+        self.applec = self.appler = 0
+        for _ in range(self.num_apple):
+            self.apple()
+
+    def over(self):
+        if self.num_player == 1:
+            return not self.alive[0]
+        return sum(self.alive) <= 1
+
+    def empty(self, col, row):
+        return 0 <= col < self.num_col and 0 <= row < self.num_row and (col, row) not in self.bits
+
+    # New apple on a random empty square (no apple is added if none is found)
+    def apple(self):
+        for _ in range(APPLE_TRIES):
+            pos = (self.rng.randrange(self.num_col), self.rng.randrange(self.num_row))
+            if pos not in self.bits and pos not in self.apples:
+                self.apples.add(pos)
+                self.apple_chunks.setdefault(ChunkedBits.locate(pos)[0], set()).add(pos)
+                return
+
+    def eat(self, pos):
+        self.apples.discard(pos)
+        key = ChunkedBits.locate(pos)[0]
+        self.apple_chunks[key].discard(pos)
+        if not self.apple_chunks[key]:
+            del self.apple_chunks[key]
+
+    # Apples in the chunks around a square (the chunk of the square and the 8 next to it)
+    def apples_near(self, col, row):
+        (chunk_col, chunk_row) = (col >> CHUNK_BITS, row >> CHUNK_BITS)
+        for key_col in range(chunk_col - 1, chunk_col + 2):
+            for key_row in range(chunk_row - 1, chunk_row + 2):
+                yield from self.apple_chunks.get((key_col, key_row), ())
+
+    # Same rules as Arena.step, a head that sets a bit already set hit something
+    def step(self, actions=None):
+        snakes = self.snakes
+        bits = self.bits
+        playing = [ind for ind in range(self.num_player) if self.alive[ind]]
+        if actions is not None:
+            for ind in playing:
+                if actions[ind] is not None:
+                    snakes[ind].turn(actions[ind])
+
+        moved = [ind for ind in playing if snakes[ind].move_snake()]
+        self.ticks += 1
+        for ind in moved:
+            bits.discard(snakes[ind].body.last_tail)
+        # Snake whose head is on each square taken this tick, snakes that hit something
+        # and snakes whose head took its square (the square is freed with the rest of the body if they lose)
+        heads = {}
+        crashed = set()
+        placed = set()
+        for ind in moved:
+            (col, row) = pos = snakes[ind].body[0]
+            if not (0 <= col < self.num_col and 0 <= row < self.num_row):
+                crashed.add(ind)
+            elif bits.add(pos):
+                heads[pos] = ind
+                placed.add(ind)
+            else:
+                crashed.add(ind)
+                # Head against head, both lose
+                if pos in heads:
+                    crashed.add(heads[pos])
+
+        eaten = 0
+        for ind in moved:
+            snake = snakes[ind]
+            if ind not in crashed and snake.body[0] in self.apples:
+                self.eat(snake.body[0])
+                snake.body.grow()
+                # A head that went where the tail was hits the tail that stays
+                if not bits.add(snake.body[-1]):
+                    other = heads[snake.body[-1]]
+                    crashed.add(other)
+                    placed.discard(other)
+                self.scores[ind] += 1
+                self.score += 1
+                eaten += 1
+
+        loser = sorted(crashed)
+        for ind in loser:
+            self.alive[ind] = False
+            body = snakes[ind].body
+            for ind_part in range(1, len(body)):
+                bits.discard(body[ind_part])
+            if ind in placed:
+                bits.discard(body[0])
+        self.loser.extend(loser)
+        for _ in range(eaten):
+            self.apple()
+
+        winner = self.winner()
+        if winner is not None:
+            self.wins[winner] += 1
+        return loser
+
+    # Turn that keeps a snake alive on the next move and brings it closer to the nearest apple around
+    def bot_turn(self, ind):
+        snake = self.snakes[ind]
+        if snake.dir is None:
+            return None
+        (col, row) = snake.body[0]
+        target = min(self.apples_near(col, row), key=lambda pos: abs(pos[0] - col) + abs(pos[1] - row), default=None)
+        return greedy_turn(snake, self.empty, target)
+
+
+# Draw the squares around a head: top left square shown is (left, top)
+def draw_view(renderer, arena, palette, left, top):
+    from render import RED
+
+    renderer.win.blit(renderer.background, (0, 0))
+    for view_row in range(renderer.num_row):
+        for view_col in range(renderer.num_col):
+            if not (0 <= left + view_col < arena.num_col and 0 <= top + view_row < arena.num_row):
+                renderer.square(GRAY, view_col, view_row)
+    center = (left + renderer.num_col // 2, top + renderer.num_row // 2)
+    for (col, row) in arena.apples_near(*center):
+        if 0 <= col - left < renderer.num_col and 0 <= row - top < renderer.num_row:
+            renderer.square(RED, col - left, row - top)
+    # Only snakes with a head close enough to have a part on the screen
+    reach_col = renderer.num_col // 2 + 1
+    reach_row = renderer.num_row // 2 + 1
+    for ind, snake in enumerate(arena.snakes):
+        if not arena.alive[ind]:
+            continue
+        (col, row) = snake.body[0]
+        if abs(col - center[0]) > reach_col + len(snake.body) or abs(row - center[1]) > reach_row + len(snake.body):
+            continue
+        for (col, row) in snake.body:
+            if 0 <= col - left < renderer.num_col and 0 <= row - top < renderer.num_row:
+                renderer.square(palette[ind], col - left, row - top)
+
+
+# Follow the first snake (or the first one alive) with bots playing, the first snake is played with the arrows
+# if play is True
+def watch(arena, tick_rate=10, play=False):
+    import fonts
+    import pygame
+    from render import BOX, Renderer
+
+    pygame.init()
+    font = fonts.load('comicsans', 30)
+    win = pygame.display.set_mode((VIEW_COL * BOX, VIEW_ROW * BOX + 75))
+    renderer = Renderer(win, VIEW_COL, VIEW_ROW, font)
+    palette = colors(arena.num_player)
+    keys = {pygame.K_RIGHT: 'r', pygame.K_LEFT: 'l', pygame.K_UP: 'u', pygame.K_DOWN: 'd'}
+    clock = pygame.time.Clock()
+    arena.start()
+    try:
+        while True:
+            clock.tick(tick_rate)
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    return
+                if play and event.type == pygame.KEYDOWN and event.key in keys:
+                    arena.snakes[0].turn(keys[event.key])
+            if arena.over():
+                pygame.time.delay(1000)
+                arena.reset()
+                arena.start()
+            actions = [None if play and ind == 0 or not arena.alive[ind] else arena.bot_turn(ind)
+                       for ind in range(arena.num_player)]
+            arena.step(actions)
+            followed = 0 if arena.alive[0] else arena.alive.index(True) if any(arena.alive) else 0
+            (col, row) = arena.snakes[followed].body[0]
+            draw_view(renderer, arena, palette, col - VIEW_COL // 2, row - VIEW_ROW // 2)
+            renderer.scores([("ALIVE : %d / %d - LENGTH : %d - (%d, %d)"
+                              % (sum(arena.alive), arena.num_player, len(arena.snakes[followed].body), col, row),
+                              palette[followed], 20)])
+            renderer.flip()
+    finally:
+        pygame.quit()
+
+
+# python largeboard.py [snakes] [columns] [rows] [--watch | --play]
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:] if not arg.startswith('--')]
+    (num_player, num_col, num_row) = (args + [256, 1000, 1000][len(args):])[:3]
+    start = time.perf_counter()
+    arena = LargeArena(num_col, num_row, num_player, seed=0)
+    print("round set up in %.1f ms" % ((time.perf_counter() - start) * 1000))
+    if '--watch' in sys.argv or '--play' in sys.argv:
+        watch(arena, play='--play' in sys.argv)
+    else:
+        rng = Random(0)
+        arena.start()
+        ticks = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < 5 and not arena.over():
+            actions = [None if not arena.alive[ind] else
+                       rng.choice('rlud') if rng.random() < 0.02 else arena.bot_turn(ind)
+                       for ind in range(num_player)]
+            arena.step(actions)
+            ticks += 1
+        t = time.perf_counter() - start
+        print("%d snakes on %dx%d: %.0f ticks/s with bots, %d alive, %d chunks in memory"
+              % (num_player, num_col, num_row, ticks / t, sum(arena.alive), len(arena.bits.chunks)))
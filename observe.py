@@ -0,0 +1,221 @@
+import numpy as np
+from batch import ACTIONS, SPEED_X, SPEED_Y
+
+# Observations of the games of a BatchSnakeEnv for training agents, from the point of view of each snake
+# Every encoder writes into its own array made once (obs), agents can keep a reference to it: the same
+# array is filled again after each step
+# GridPlanes  (N, P, 4, num_row, num_col) planes: own body, other snake's body, heads, apple
+# EgoCrop     (N, P, 5, size, size) squares around the head turned so the snake goes up: the 4 planes and
+#             a plane for the squares outside of the grid
+# Rays        (N, P, 24) 8 rays from the head (ahead, ahead right, right... turned like EgoCrop):
+#             1 / distance to the wall, 1 / distance to a body (0 if none) and 1 if the apple is on the ray
+# The planes are only changed where the snakes moved: tails that left, old and new heads and the apple,
+# games that were reset are copied again from the grid. The crop and the rays move with the head, they are read
+# from the grid of the env (one byte per square) with the same index arrays for every game
+
+OWN = 0
+OTHER = 1
+HEADS = 2
+APPLE = 3
+# Steps (ahead, right) of the rays
+RAYS = [(1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1)]
+# Column and row of the square ahead and of the square to the right for each direction code
+AHEAD_X = SPEED_X
+AHEAD_Y = SPEED_Y
+RIGHT_X = -SPEED_Y
+RIGHT_Y = SPEED_X
+
+
+class GridPlanes:
+    def __init__(self, env, dtype=np.float32):
+        self.env = env
+        self.obs = np.zeros((env.num_env, env.num_player, 4, env.num_row, env.num_col), dtype)
+        self._obs = self.obs.reshape(-1)
+        # Start of the planes of each (game, point of view) in the flat array
+        self._base = np.arange(env.num_env * env.num_player).reshape(env.num_env, env.num_player) * 4 * env.cells
+        # Heads and apple written last, to clear them on the next step
+        self.heads = np.zeros((env.num_env, env.num_player), np.intp)
+        self.apple = np.zeros(env.num_env, np.intp)
+        self.reset()
+
+    # Copy the planes of the games in envs from the grid (all games if envs is None)
+    def reset(self, envs=None):
+        env = self.env
+        if envs is None:
+            envs = np.arange(env.num_env)
+        grid = env.grid[envs].reshape(len(envs), 1, env.num_row, env.num_col)
+        ids = np.arange(1, env.num_player + 1).reshape(1, -1, 1, 1)
+        obs = np.zeros((len(envs), env.num_player, 4, env.num_row, env.num_col), self.obs.dtype)
+        obs[:, :, OWN] = grid == ids
+        obs[:, :, OTHER] = (grid != 0) & (grid != ids)
+        heads = env.head_row[envs] * env.num_col + env.head_col[envs]
+        apple = env.apple[envs]
+        flat = obs.reshape(len(envs), env.num_player, 4, env.cells)
+        for viewer in range(env.num_player):
+            for snake in range(env.num_player):
+                flat[np.arange(len(envs)), viewer, HEADS, heads[:, snake]] = 1
+            flat[np.arange(len(envs)), viewer, APPLE, apple] = 1
+        self.obs[envs] = obs
+        self.heads[envs] = heads
+        self.apple[envs] = apple
+        return self.obs
+
+    # Set value on the planes channel of the snakes (own body for each snake, other body for the other one)
+    # at the squares cells, only in the games envs
+    def _body(self, envs, cells, value):
+        env = self.env
+        for snake in range(env.num_player):
+            for viewer in range(env.num_player):
+                channel = OWN if viewer == snake else OTHER
+                self._obs[self._base[envs, viewer] + channel * env.cells + cells[:, snake]] = value
+
+    # Same square for every point of view
+    def _all(self, envs, channel, cells, value):
+        env = self.env
+        for viewer in range(env.num_player):
+            self._obs[self._base[envs, viewer] + channel * env.cells + cells] = value
+
+    # Call after each env.step with the games that ended (they were reset by the env)
+    def update(self, done):
+        env = self.env
+        playing = np.flatnonzero(~done)
+        if len(playing):
+            # Tails that left (a snake that ate keeps its tail)
+            tails = np.where(env.ate[playing], -1, env.last_tail[playing])
+            for snake in range(env.num_player):
+                left = tails[:, snake] >= 0
+                for viewer in range(env.num_player):
+                    channel = OWN if viewer == snake else OTHER
+                    self._obs[self._base[playing[left], viewer] + channel * env.cells + tails[left, snake]] = 0
+            # Heads move, the square they left stays in the body
+            heads = env.head_row[playing] * env.num_col + env.head_col[playing]
+            for snake in range(env.num_player):
+                self._all(playing, HEADS, self.heads[playing, snake], 0)
+            for snake in range(env.num_player):
+                self._all(playing, HEADS, heads[:, snake], 1)
+            self._body(playing, heads, 1)
+            self.heads[playing] = heads
+            # Apple (the same square if it wasn't eaten)
+            self._all(playing, APPLE, self.apple[playing], 0)
+            self._all(playing, APPLE, env.apple[playing], 1)
+            self.apple[playing] = env.apple[playing]
+        ended = np.flatnonzero(done)
+        if len(ended):
+            self.reset(ended)
+        return self.obs
+
+
+class EgoCrop:
+    def __init__(self, env, radius=5, dtype=np.float32):
+        self.env = env
+        self.size = 2 * radius + 1
+        self.obs = np.zeros((env.num_env, env.num_player, 5, self.size, self.size), dtype)
+        self._obs = self.obs.reshape(env.num_env, env.num_player, 5, self.size * self.size)
+        # Steps ahead and to the right of each square of the crop (the head is in the middle, ahead is up)
+        ahead = np.arange(radius, -radius - 1, -1)[:, None].repeat(self.size, 1).reshape(-1)
+        right = np.arange(-radius, radius + 1)[None, :].repeat(self.size, 0).reshape(-1)
+        # Column and row offsets of the squares for each direction code (4, size * size)
+        self._dx = AHEAD_X[:, None] * ahead + RIGHT_X[:, None] * right
+        self._dy = AHEAD_Y[:, None] * ahead + RIGHT_Y[:, None] * right
+        self._grid_base = env._grid_base[..., None]
+        self._ids = env._ids[..., None]
+
+    # The crop moves with the head, so it is read again from the grid (one byte per square, the planes are
+    # made from it like GridPlanes)
+    def update(self, done=None):
+        env = self.env
+        obs = self._obs
+        col = env.head_col[..., None] + self._dx[env.dir]
+        row = env.head_row[..., None] + self._dy[env.dir]
+        inside = (col >= 0) & (col < env.num_col) & (row >= 0) & (row < env.num_row)
+        cells = np.clip(row, 0, env.num_row - 1) * env.num_col + np.clip(col, 0, env.num_col - 1)
+        cells[~inside] = -1
+        grid = env._grid[self._grid_base + cells]
+        obs[:, :, OWN] = grid == self._ids
+        obs[:, :, OTHER] = (grid != 0) & (grid != self._ids)
+        heads = (env.head_row * env.num_col + env.head_col)[:, None, :, None]
+        obs[:, :, HEADS] = (cells[:, :, None, :] == heads).any(2)
+        obs[:, :, APPLE] = cells == env.apple[:, None, None]
+        obs[:, :, 4] = ~inside
+        # Squares outside of the grid read the last square of the game, nothing is drawn there
+        obs[:, :, OWN] *= inside
+        obs[:, :, OTHER] *= inside
+        return self.obs
+
+
+class Rays:
+    def __init__(self, env, dtype=np.float32):
+        self.env = env
+        self.length = max(env.num_col, env.num_row)
+        self.obs = np.zeros((env.num_env, env.num_player, 3 * len(RAYS)), dtype)
+        steps = np.arange(1, self.length + 1)
+        ahead = np.array([ray[0] for ray in RAYS])[:, None] * steps
+        right = np.array([ray[1] for ray in RAYS])[:, None] * steps
+        # Column and row offsets along each ray for each direction code (4, rays, length)
+        self._dx = AHEAD_X[:, None, None] * ahead + RIGHT_X[:, None, None] * right
+        self._dy = AHEAD_Y[:, None, None] * ahead + RIGHT_Y[:, None, None] * right
+        self._grid_base = env._grid_base[..., None, None]
+        self._inverse = np.concatenate([[0], 1 / steps])
+
+    def update(self, done=None):
+        env = self.env
+        col = env.head_col[..., None, None] + self._dx[env.dir]
+        row = env.head_row[..., None, None] + self._dy[env.dir]
+        inside = (col >= 0) & (col < env.num_col) & (row >= 0) & (row < env.num_row)
+        cells = np.clip(row, 0, env.num_row - 1) * env.num_col + np.clip(col, 0, env.num_col - 1)
+        # Squares along the rays until the wall: 1 + steps to the first body part (0 if none)
+        body = inside & (env._grid[self._grid_base + cells] != 0)
+        hit = np.where(body.any(-1), body.argmax(-1) + 1, 0)
+        wall = inside.sum(-1) + 1
+        # The apple counts if nothing is in front of it
+        apple = inside & (cells == env.apple[:, None, None, None])
+        seen = apple.any(-1) & ((hit == 0) | (apple.argmax(-1) + 1 < hit))
+        self.obs[..., 0::3] = self._inverse[np.minimum(wall, self.length)]
+        self.obs[..., 1::3] = self._inverse[hit]
+        self.obs[..., 2::3] = seen
+        return self.obs
+
+
+# Gym-style loop over a BatchSnakeEnv: reset and step return the observations of every encoder
+class ObservedEnv:
+    def __init__(self, env, crop_radius=5, dtype=np.float32):
+        self.env = env
+        self.planes = GridPlanes(env, dtype)
+        self.crop = EgoCrop(env, crop_radius, dtype)
+        self.rays = Rays(env, dtype)
+        self.encoders = [self.planes, self.crop, self.rays]
+
+    def reset(self):
+        self.env.reset()
+        return [self.planes.reset(), self.crop.update(), self.rays.update()]
+
+    # actions are direction codes (see batch.ACTIONS), returns the observations, rewards and games that ended
+    def step(self, actions=None):
+        (_, rewards, done) = self.env.step(actions)
+        return [encoder.update(done) for encoder in self.encoders], rewards, done
+
+
+# Measure steps per second with and without the observations
+if __name__ == '__main__':
+    import time
+    from batch import BatchSnakeEnv
+
+    for players in (1, 2):
+        rng = np.random.default_rng(1)
+        acts = rng.integers(-1, len(ACTIONS), (64, 4096, players))
+        env = BatchSnakeEnv(4096, num_player=players, seed=0)
+        start = time.perf_counter()
+        for i in range(200):
+            env.step(acts[i % 64])
+        alone = time.perf_counter() - start
+        observed = ObservedEnv(BatchSnakeEnv(4096, num_player=players, seed=0))
+        observed.reset()
+        times = [0] * len(observed.encoders)
+        for i in range(200):
+            (_, _, done) = observed.env.step(acts[i % 64])
+            for ind, encoder in enumerate(observed.encoders):
+                before = time.perf_counter()
+                encoder.update(done)
+                times[ind] += time.perf_counter() - before
+        print("%d player(s): env %.0f env-steps/s, planes %.0f, crop %.0f, rays %.0f obs/s"
+              % ((players, 200 * 4096 / alone) + tuple(200 * 4096 / t for t in times)))
@@ -0,0 +1,141 @@
+import numpy as np
+from multiprocessing import Pipe, Process
+from multiprocessing.shared_memory import SharedMemory
+from batch import BatchSnakeEnv
+
+# Games split between worker processes, each stepping its own BatchSnakeEnv
+# Grids, actions, rewards and dones live in shared memory, so a step only sends one byte to each worker
+
+
+# NumPy array on a shared memory block
+# frombuffer keeps the buffer of the block exported while the array exists, so the block can't be unmapped under
+# an array still in use (np.ndarray(buffer=...) doesn't, closing the block then crashes on the next read)
+def _array(shm, shape, dtype):
+    return np.frombuffer(shm.buf, dtype, int(np.prod(shape))).reshape(shape)
+
+
+# Create a NumPy array in a new shared memory block
+def _shared(shape, dtype):
+    size = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+    shm = SharedMemory(create=True, size=size)
+    return shm, _array(shm, shape, dtype)
+
+
+# Loop run by each worker on its games [start, stop)
+def _worker(conn, buffers, start, stop, num_col, num_row, num_player, seed):
+    blocks = []
+    arrays = []
+    for (name, shape, dtype) in buffers:
+        shm = SharedMemory(name=name)
+        blocks.append(shm)
+        arrays.append(_array(shm, shape, dtype))
+    (grids, actions, rewards, dones) = arrays
+    # Every worker gets its own seed, so a pool seed always plays the same games
+    env = BatchSnakeEnv(stop - start, num_col, num_row, num_player, seed=seed)
+    grids[start:stop] = env.grid
+    conn.send_bytes(b'r')
+
+    while conn.recv_bytes() == b's':
+        (grid, reward, done) = env.step(actions[start:stop])
+        grids[start:stop] = grid
+        rewards[start:stop] = reward
+        dones[start:stop] = done
+        conn.send_bytes(b'd')
+
+    del grids, actions, rewards, dones, arrays
+    for shm in blocks:
+        shm.close()
+
+
+class RolloutPool:
+    def __init__(self, num_env, num_worker=2, num_col=17, num_row=15, num_player=1, seed=None):
+        self.num_env = num_env
+        self.num_worker = num_worker
+        self.num_player = num_player
+        shapes = [((num_env, num_row, num_col), np.int8), ((num_env, num_player), np.int8),
+                  ((num_env, num_player), np.float32), ((num_env,), bool)]
+        self._blocks = []
+        arrays = []
+        for (shape, dtype) in shapes:
+            (shm, array) = _shared(shape, dtype)
+            self._blocks.append(shm)
+            arrays.append(array)
+        (self.grids, self.actions, self.rewards, self.dones) = arrays
+        # -1 keeps every snake going straight
+        self.actions[:] = -1
+        buffers = [(shm.name, shape, dtype) for shm, (shape, dtype) in zip(self._blocks, shapes)]
+
+        # Independent seeds for every worker, derived from the pool seed
+        seeds = np.random.SeedSequence(seed).spawn(num_worker)
+        # Games split as evenly as possible
+        bounds = np.linspace(0, num_env, num_worker + 1).astype(int)
+        self._conns = []
+        self._procs = []
+        for i in range(num_worker):
+            (conn, child) = Pipe()
+            proc = Process(target=_worker, daemon=True,
+                           args=(child, buffers, bounds[i], bounds[i + 1], num_col, num_row, num_player, seeds[i]))
+            proc.start()
+            self._conns.append(conn)
+            self._procs.append(proc)
+        for conn in self._conns:
+            conn.recv_bytes()
+
+    # Play one tick in every game, actions is an (N, P) array of action codes (None to go straight)
+    # Returned arrays are the shared buffers, they are overwritten by the next step
+    def step(self, actions=None):
+        if actions is None:
+            self.actions[:] = -1
+        else:
+            self.actions[:] = np.asarray(actions).reshape(self.num_env, self.num_player)
+        # Start every worker before waiting for any of them
+        for conn in self._conns:
+            conn.send_bytes(b's')
+        for conn in self._conns:
+            conn.recv_bytes()
+        return self.grids, self.rewards, self.dones
+
+    def close(self):
+        if not self._procs:
+            return
+        for conn in self._conns:
+            conn.send_bytes(b'q')
+        for proc in self._procs:
+            proc.join()
+        self._procs = []
+        del self.grids, self.actions, self.rewards, self.dones
+        for shm in self._blocks:
+            # The name is removed right away, the memory itself is freed once nothing uses it any more
+            shm.unlink()
+            # Arrays returned by step and still held by the caller keep the block mapped, callers have to drop
+            # them for the block to be closed here (otherwise it is closed when the pool is deleted)
+            try:
+                shm.close()
+            except BufferError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+# Measure how env-steps per second grow with the number of workers
+if __name__ == '__main__':
+    import os
+    import sys
+    import time
+
+    num_env = int(sys.argv[1]) if len(sys.argv) > 1 else 16384
+    workers = 1
+    while workers <= (os.cpu_count() or 1):
+        with RolloutPool(num_env, workers, seed=0) as pool:
+            acts = np.random.default_rng(1).integers(-1, 4, (16, num_env, 1))
+            pool.step(acts[0])
+            start = time.perf_counter()
+            for i in range(200):
+                pool.step(acts[i % 16])
+            t = time.perf_counter() - start
+        print("%d worker(s): %.0f env-steps/s" % (workers, 200 * num_env / t))
+        workers *= 2
@@ -0,0 +1,336 @@
+import pygame
+from body import DIRECTIONS
+from collections import OrderedDict, deque
+from time import perf_counter
+
+# Drawing shared by Snake.py and SnakePvP.py
+# Only the squares that changed during a tick are drawn and sent to the screen (pygame.display.update(rects)),
+# the black background and the grid lines are drawn once per window size on a surface that is copied where something
+# disappears, and squares are copies of surfaces already filled with their color
+
+# Length in pixels of each square
+BOX = 32
+# Colors used
+RED = (255, 0, 0)
+BLUE = (0, 100, 255)
+GREEN = (0, 160, 0)
+BLACK = (0, 0, 0)
+WHITE = (255, 255, 255)
+YELLOW = (255, 255, 0)
+# Color of each snake
+COLORS = [BLUE, GREEN]
+# Number of window sizes whose background is kept (window and fullscreen, and the size before a resize), each one
+# is a surface as big as the window so resizing by dragging the border must not keep all of them
+LAYOUTS = 3
+
+
+# True if the window is fullscreen (pygame 2 returns the flags unsigned and with other flags set, comparing them
+# with the old signed value of FULLSCREEN never matched)
+def is_fullscreen(win):
+    return win.get_flags() & pygame.FULLSCREEN != 0
+
+
+# Text surfaces already rendered, the least recently used ones are dropped when there are more than size of them
+class TextCache:
+    def __init__(self, size=64):
+        self.size = size
+        self.surfaces = OrderedDict()
+
+    # Same as font.render(text, True, color), but each text is only rendered once
+    def render(self, font, text, color):
+        key = (font, text, color)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = font.render(text, True, color)
+            self.surfaces[key] = surface
+            if len(self.surfaces) > self.size:
+                self.surfaces.popitem(last=False)
+        else:
+            self.surfaces.move_to_end(key)
+        return surface
+
+
+# Shared by everything that draws text
+text_cache = TextCache()
+
+
+# Durations of the last frames (or of anything else timed)
+class Timer:
+    def __init__(self, size=100):
+        self.times = deque(maxlen=size)
+        self.start_time = None
+
+    # Start timing a frame (nothing happens if it is already timed)
+    def start(self):
+        if self.start_time is None:
+            self.start_time = perf_counter()
+
+    def stop(self):
+        if self.start_time is not None:
+            self.times.append(perf_counter() - self.start_time)
+            self.start_time = None
+
+    # Add a duration measured elsewhere (in seconds)
+    def add(self, seconds):
+        self.times.append(seconds)
+
+    # Average duration in milliseconds
+    def average(self):
+        if not self.times:
+            return 0
+        return sum(self.times) / len(self.times) * 1000
+
+
+class Renderer:
+    def __init__(self, win, num_col, num_row, font):
+        self.num_col = num_col
+        self.num_row = num_row
+        # Width and Height of the game grid in pixels
+        self.game_w = num_col * BOX
+        self.game_h = num_row * BOX
+        # Font of the scores
+        self.font = font
+        # Parts of the window changed since the last update
+        self.dirty = []
+        # Background, rectangle of every square and score area of the last window sizes used
+        self.layouts = OrderedDict()
+        # One square already filled for each color
+        self.sprites = {}
+        self.timer = Timer()
+        # timing.Profiler told when drawing, text and sending to the screen end (None when nothing is timed)
+        self.profiler = None
+        # Square each snake head is going into, partly drawn between two ticks
+        self.leads = []
+        self.set_window(win)
+
+    # New window (first window, resize, fullscreen), the background is only drawn for a window size not used lately
+    def set_window(self, win):
+        self.win = win
+        size = win.get_size()
+        if size not in self.layouts:
+            self.layouts[size] = self.layout(size)
+            # The least recently used size is dropped
+            if len(self.layouts) > LAYOUTS:
+                self.layouts.popitem(last=False)
+        else:
+            self.layouts.move_to_end(size)
+        (self.background, self.rects, self.x, self.y, self.score_rect) = self.layouts[size]
+        # Scores have to be drawn again on the new window
+        self.last_scores = None
+        self.apple = None
+        self.leads = []
+
+    # Everything that depends on the window size
+    def layout(self, size):
+        (w, h) = size
+        # Top left corner of the grid (grid is centered, with 75 pixels for the scores under it)
+        x = int(w / 2 - self.game_w / 2)
+        y = int((h - 75) / 2 - self.game_h / 2)
+        # Rectangle in pixels of each square, row by row
+        rects = [pygame.Rect((x + col * BOX, y + row * BOX), (BOX, BOX))
+                 for row in range(self.num_row) for col in range(self.num_col)]
+        # Everything under the grid is the score area
+        score_rect = pygame.Rect(0, y + self.game_h + 1, w, max(h - y - self.game_h - 1, 0))
+        background = pygame.Surface((w, h))
+        background.fill(BLACK)
+        self.grid(background, x, y)
+        return background, rects, x, y, score_rect
+
+    # Square filled with a color
+    def sprite(self, color):
+        surface = self.sprites.get(color)
+        if surface is None:
+            surface = pygame.Surface((BOX, BOX))
+            surface.fill(color)
+            self.sprites[color] = surface
+        return surface
+
+    # Drawing the grid with its top left corner at (x, y)
+    def grid(self, surface, x, y):
+        # Draw a rectangle which is the outline of the entire game grid
+        r1 = pygame.Rect((x, y), (self.game_w, self.game_h))
+        pygame.draw.rect(surface, WHITE, r1, 1)
+
+        # Draw a rectangle for every two columns (one rectangle = two lines = two columns drawn)
+        for n in range(1, self.num_col // 2 + 1):
+            r_n = pygame.Rect((x + (2 * n - 1) * BOX, y), (BOX, self.game_h))
+            pygame.draw.rect(surface, WHITE, r_n, 1)
+
+        # Draw a rectangle for every two rows (one rectangle = two lines = two rows drawn)
+        for n in range(1, self.num_row // 2 + 1):
+            r_n = pygame.Rect((x, y + (2 * n - 1) * BOX), (self.game_w, BOX))
+            pygame.draw.rect(surface, WHITE, r_n, 1)
+
+    # Rectangle in pixels of a square of the grid
+    def rect(self, col, row):
+        if 0 <= col < self.num_col and 0 <= row < self.num_row:
+            return self.rects[row * self.num_col + col]
+        return pygame.Rect((self.x + col * BOX, self.y + row * BOX), (BOX, BOX))
+
+    # Draw a solid square based on column and row alone
+    def square(self, color, col, row, width=0):
+        r = self.rect(col, row)
+        if width == 0:
+            self.win.blit(self.sprite(color), r)
+        else:
+            pygame.draw.rect(self.win, color, r, width)
+        self.dirty.append(r)
+
+    # Put the background back on a square
+    def erase(self, col, row):
+        r = self.rect(col, row)
+        self.win.blit(self.background, r, r)
+        self.dirty.append(r)
+
+    # Fill part of a square from one of its sides (color None puts the background back)
+    # (side_x, side_y) points from the center of the square to the side and size goes from 0 to 1
+    def part(self, color, col, row, side_x, side_y, size):
+        r = self.rect(col, row)
+        n = int(BOX * size)
+        if side_x == -1:
+            p = pygame.Rect(r.x, r.y, n, BOX)
+        elif side_x == 1:
+            p = pygame.Rect(r.right - n, r.y, n, BOX)
+        elif side_y == -1:
+            p = pygame.Rect(r.x, r.y, BOX, n)
+        else:
+            p = pygame.Rect(r.x, r.bottom - n, BOX, n)
+        if color is None:
+            self.win.blit(self.background, p, p)
+        else:
+            self.win.fill(color, p)
+        self.dirty.append(p)
+
+    # Draw a square again with what is in it (background, apple or snake)
+    def refresh(self, state, col, row):
+        if (col, row) == (state.applec, state.appler):
+            self.square(RED, col, row)
+            return
+        for snake, color in zip(state.snakes, COLORS):
+            if (col, row) in snake.body:
+                self.square(color, col, row)
+                return
+        self.erase(col, row)
+
+    # Draw a square for every body part of the snake
+    def draw_snake(self, snake, color):
+        for (col, row) in snake.body:
+            self.square(color, col, row)
+
+    # Draw the scores if they changed, texts is a list of (text, color, x offset from the left of the grid)
+    def scores(self, texts):
+        if texts == self.last_scores:
+            return
+        self.last_scores = texts
+        if self.profiler is not None:
+            self.profiler.mark('draw')
+        self.win.blit(self.background, self.score_rect, self.score_rect)
+        for (text, color, offset) in texts:
+            self.win.blit(text_cache.render(self.font, text, color), (self.x + offset, self.y + self.game_h + 20))
+        self.dirty.append(self.score_rect)
+        if self.profiler is not None:
+            self.profiler.mark('text')
+
+    # Draw the whole window (black background + grid, apple, snakes and scores)
+    def full(self, state, texts):
+        self.win.blit(self.background, (0, 0))
+        self.last_scores = None
+        self.apple = (state.applec, state.appler)
+        if state.applec is not None:
+            self.square(RED, state.applec, state.appler)
+        for snake, color in zip(state.snakes, COLORS):
+            self.draw_snake(snake, color)
+        self.scores(texts)
+        self.leads = []
+        self.flip()
+
+    # Draw what changed during the last tick: removed tails, new heads and the apple if it moved
+    def tick(self, state, texts):
+        self.timer.start()
+        snakes = state.snakes
+        # Tails first, a head can go where a tail just was
+        for snake in snakes:
+            tail = snake.body.last_tail
+            if snake.dir is not None and tail is not None and not any(tail in other.body for other in snakes):
+                self.erase(*tail)
+        # Tail of a snake that grew is still in its body, so it is not erased and doesn't need drawing
+        for snake, color in zip(snakes, COLORS):
+            (col, row) = snake.body[0]
+            if snake.dir is not None and 0 <= col < self.num_col and 0 <= row < self.num_row:
+                self.square(color, col, row)
+        if (state.applec, state.appler) != self.apple:
+            self.apple = (state.applec, state.appler)
+            if state.applec is not None:
+                self.square(RED, state.applec, state.appler)
+        # Tails only partly drawn by the last interpolated frame
+        for snake, color in zip(snakes, COLORS):
+            if snake.dir is not None:
+                self.square(color, *snake.body[-1])
+        # Squares where a head was expected but didn't go (player turned at the last moment, or game over)
+        heads = [snake.body[0] for snake in snakes]
+        for lead in self.leads:
+            if lead is not None and lead not in heads:
+                self.refresh(state, *lead)
+        self.leads = []
+        self.scores(texts)
+
+    # Draw the snakes part of the way to their next square, progress goes from 0 (last tick) to 1 (next tick)
+    def interpolate(self, state, progress):
+        self.timer.start()
+        snakes = state.snakes
+        apple = (state.applec, state.appler)
+        # Square each head is going into, if the snake keeps its direction or takes the turn already asked
+        leads = []
+        sides = []
+        for snake in snakes:
+            lead = None
+            side = None
+            if snake.dir is not None:
+                (speed_x, speed_y) = DIRECTIONS[snake.heading()]
+                (col, row) = snake.body[0]
+                if 0 <= col + speed_x < self.num_col and 0 <= row + speed_y < self.num_row:
+                    lead = (col + speed_x, row + speed_y)
+                    # Head comes in from the side of the square next to the current head
+                    side = (-speed_x, -speed_y)
+            leads.append(lead)
+            sides.append(side)
+
+        # Squares expected during the last frame but not anymore (the player turned)
+        for old in self.leads:
+            if old is not None and old not in leads:
+                self.refresh(state, *old)
+        self.leads = leads
+        # Empty the squares heads are going into (only background and apple, bodies stay)
+        for lead in leads:
+            if lead is not None and not any(lead in snake.body for snake in snakes):
+                self.refresh(state, *lead)
+        # Tails leave their square from the side opposite to the next body part (no tail move if the snake eats)
+        for snake, color, lead in zip(snakes, COLORS, leads):
+            if lead is not None and lead != apple:
+                (tail_col, tail_row) = snake.body[-1]
+                (next_col, next_row) = snake.body[-2]
+                self.square(color, tail_col, tail_row)
+                self.part(None, tail_col, tail_row, tail_col - next_col, tail_row - next_row, progress)
+        # Heads come into their next square
+        for color, lead, side in zip(COLORS, leads, sides):
+            if lead is not None:
+                self.part(color, lead[0], lead[1], side[0], side[1], progress)
+
+    # Send the changed parts of the window to the screen
+    def update(self):
+        if self.profiler is not None:
+            self.profiler.mark('draw')
+        pygame.display.update(self.dirty)
+        self.dirty = []
+        self.timer.stop()
+        if self.profiler is not None:
+            self.profiler.mark('flip')
+
+    # Send the whole window to the screen
+    def flip(self):
+        if self.profiler is not None:
+            self.profiler.mark('draw')
+        pygame.display.flip()
+        self.dirty = []
+        if self.profiler is not None:
+            self.profiler.mark('flip')
@@ -0,0 +1,388 @@
+import os
+import struct
+import sys
+import time
+import zlib
+from bisect import bisect_right
+from body import Body, DIRECTIONS
+from engine import GameState, Snake
+from freecells import FreeCells
+
+# Games recorded as the seed, the grid size and the turn each snake took on every tick, so they can be played again
+# File: header (magic, version, columns, rows, players, seed, ticks) followed by the ticks compressed with zlib
+# Each tick is one byte: turn of the first snake in the low 4 bits, turn of the second snake in the high 4 bits
+# (0 = no turn, then 1 + index in DIRECTIONS), most ticks are 0 so the file stays small
+# Version 2 adds a keyframe (whole game state, random generator included) every few ticks after the ticks:
+# keyframe header (interval, size of the compressed ticks, number of keyframes), index of (tick, offset, size)
+# and the keyframes compressed one by one, so going to any tick only plays the ticks since the keyframe before it
+# Version 3 is written a part at a time: the header and the keyframe interval, then one chunk per save with the
+# ticks played since the save before (size once compressed, number of keyframes, ticks) and the keyframes of
+# these ticks (tick, size, keyframe). A save adds a chunk at the end and only changes the number of ticks in
+# the header, the file isn't written again every round, and a chunk cut by a crash is left out
+
+MAGIC = b'SNKR'
+VERSION = 3
+HEADER = struct.Struct('<4sBBBBQI')
+KEYFRAME_HEADER = struct.Struct('<III')
+INDEX = struct.Struct('<III')
+INTERVAL = struct.Struct('<I')
+CHUNK = struct.Struct('<II')
+KEYFRAME = struct.Struct('<II')
+# Largest seed the header has room for
+MAX_SEED = 2 ** 64 - 1
+# Ticks between two keyframes: a keyframe takes about 3 KB (mostly the random generator, which doesn't compress)
+# when the ticks take a few bytes per thousand, and playing 16384 ticks again takes less than 50 ms, so seeking
+# stays fast without the keyframes making the file hundreds of times bigger
+KEYFRAME_INTERVAL = 16384
+# Keyframe: ticks of the round, score, losers (bit per snake), apple column and row (255 if no apple),
+# then wins, direction and length of each snake with its body squares, then the free squares in the order of the
+# list the apple is drawn from, then the random generator
+# Squares are two bytes (column + 1, row + 1), a head that left the grid is at -1
+STATE = struct.Struct('<IIBBB')
+SNAKE = struct.Struct('<IBH')
+FREE = struct.Struct('<H')
+RNG = struct.Struct('<B625I')
+# Turn of each code and code of each turn
+TURNS = [None] + list(DIRECTIONS)
+CODES = {turn: code for code, turn in enumerate(TURNS)}
+
+
+# Squares as bytes and back
+def encode_cells(cells):
+    return bytes(v + 1 for pos in cells for v in pos)
+
+
+def decode_cells(data):
+    return [(col - 1, row - 1) for col, row in zip(data[::2], data[1::2])]
+
+
+# Whole game state as bytes
+def encode_state(state):
+    losers = 0
+    for ind in state.loser:
+        losers |= 1 << ind
+    no_apple = state.applec is None
+    parts = [STATE.pack(state.ticks, state.score, losers, 255 if no_apple else state.applec,
+                        255 if no_apple else state.appler)]
+    for wins, snake in zip(state.wins, state.snakes):
+        parts.append(SNAKE.pack(wins, CODES[snake.dir], len(snake.body)))
+        parts.append(encode_cells(snake.body))
+    parts.append(FREE.pack(len(state.free)))
+    parts.append(encode_cells(state.free.cells))
+    (_, internal, gauss) = state.rng.getstate()
+    parts.append(RNG.pack(gauss is not None, *internal))
+    parts.append(struct.pack('<d', gauss or 0.0))
+    return b''.join(parts)
+
+
+# Put a state encoded by encode_state back into state (a new GameState with the same grid and players)
+# Turns waiting in the snakes are not kept, a replay gives each turn on the tick it was used
+def decode_state(state, data):
+    (state.ticks, state.score, losers, applec, appler) = STATE.unpack_from(data)
+    offset = STATE.size
+    state.loser = [ind for ind in range(state.num_player) if losers >> ind & 1]
+    if applec == 255:
+        state.applec = state.appler = None
+    else:
+        (state.applec, state.appler) = (applec, appler)
+    state.snakes = []
+    for ind in range(state.num_player):
+        (state.wins[ind], code, length) = SNAKE.unpack_from(data, offset)
+        offset += SNAKE.size
+        snake = Snake(0, 0)
+        snake.body = Body(decode_cells(data[offset:offset + 2 * length]))
+        offset += 2 * length
+        snake.dir = TURNS[code]
+        state.snakes.append(snake)
+    (length,) = FREE.unpack_from(data, offset)
+    offset += FREE.size
+    # Same order as when it was saved, so the next apples land on the same squares
+    state.free = FreeCells(0, 0)
+    state.free.cells = decode_cells(data[offset:offset + 2 * length])
+    state.free.index = {pos: ind for ind, pos in enumerate(state.free.cells)}
+    offset += 2 * length
+    (has_gauss, *internal) = RNG.unpack_from(data, offset)
+    offset += RNG.size
+    (gauss,) = struct.unpack_from('<d', data, offset)
+    state.rng.setstate((3, tuple(internal), gauss if has_gauss else None))
+    return state
+
+
+# Records a game while it is played (one byte added per tick, and a keyframe every interval ticks)
+class Recorder:
+    def __init__(self, state, path=None, interval=KEYFRAME_INTERVAL):
+        # Random uses the absolute value of a seed, so a negative seed is saved without its sign (same apples),
+        # a seed too big for the header can't be saved at all
+        self.seed = abs(state.seed)
+        if self.seed > MAX_SEED:
+            raise ValueError("seed %d can't be recorded (largest is %d)" % (state.seed, MAX_SEED))
+        self.state = state
+        self.moves = bytearray()
+        self.interval = interval
+        # (tick, compressed state before that tick)
+        self.keyframes = []
+        if path is None:
+            path = os.path.join('replays', time.strftime('snake-%Y%m%d-%H%M%S.snkr'))
+        self.path = path
+        # True once a save failed
+        self.failed = False
+        # Ticks and keyframes already in the file, and size of the file (None until the header is written)
+        self.saved_ticks = 0
+        self.saved_keyframes = 0
+        self.size = None
+
+    # Call after every state.step()
+    def record(self):
+        snakes = self.state.snakes
+        code = CODES[snakes[0].input]
+        if len(snakes) > 1:
+            code |= CODES[snakes[1].input] << 4
+        self.moves.append(code)
+        if len(self.moves) % self.interval == 0:
+            self.keyframes.append((len(self.moves), zlib.compress(encode_state(self.state))))
+
+    # Header with the number of ticks in the file
+    def header(self, ticks):
+        state = self.state
+        return HEADER.pack(MAGIC, VERSION, state.num_col, state.num_row, state.num_player, self.seed, ticks)
+
+    # Ticks from tick and keyframes from keyframe on
+    def chunk(self, tick, keyframe):
+        moves = zlib.compress(bytes(self.moves[tick:]), 9)
+        keyframes = self.keyframes[keyframe:]
+        parts = [CHUNK.pack(len(moves), len(keyframes)), moves]
+        for (tick, data) in keyframes:
+            parts.append(KEYFRAME.pack(tick, len(data)))
+            parts.append(data)
+        return b''.join(parts)
+
+    # Whole file in one chunk
+    def to_bytes(self):
+        return self.header(len(self.moves)) + INTERVAL.pack(self.interval) + self.chunk(0, 0)
+
+    # Add what was recorded since the last save to the file
+    # Returns False if it couldn't be written (game folder not writable, disk full...), the game goes on and the
+    # whole file is written again at the next save
+    def save(self):
+        try:
+            if self.size is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(self.path, 'wb') as file:
+                    file.write(self.header(0) + INTERVAL.pack(self.interval))
+                self.size = HEADER.size + INTERVAL.size
+            if self.saved_ticks < len(self.moves):
+                chunk = self.chunk(self.saved_ticks, self.saved_keyframes)
+                with open(self.path, 'r+b') as file:
+                    # Whatever a failed save left after the last chunk is written over
+                    file.seek(self.size)
+                    file.truncate()
+                    file.write(chunk)
+                    file.flush()
+                    # The ticks are only counted once the chunk is written
+                    file.seek(0)
+                    file.write(self.header(len(self.moves)))
+                self.size += len(chunk)
+                self.saved_ticks = len(self.moves)
+                self.saved_keyframes = len(self.keyframes)
+        except OSError as error:
+            # Said once, not at the end of every round
+            if not self.failed:
+                print("replay not saved to %s: %s" % (self.path, error))
+            self.failed = True
+            self.size = None
+            self.saved_ticks = self.saved_keyframes = 0
+            return False
+        return True
+
+
+class Replay:
+    def __init__(self, num_col, num_row, num_player, seed, moves, keyframes=()):
+        self.num_col = num_col
+        self.num_row = num_row
+        self.num_player = num_player
+        self.seed = seed
+        self.moves = moves
+        # Ticks of the keyframes (sorted) and their compressed states
+        self.keyframe_ticks = [tick for (tick, _) in keyframes]
+        self.keyframes = [keyframe for (_, keyframe) in keyframes]
+
+    @classmethod
+    def from_bytes(cls, data):
+        if len(data) < HEADER.size:
+            raise ValueError("not a snake replay")
+        (magic, version, num_col, num_row, num_player, seed, ticks) = HEADER.unpack_from(data)
+        if magic != MAGIC or version not in (1, 2, VERSION):
+            raise ValueError("not a snake replay")
+        keyframes = []
+        if version == 1:
+            moves = zlib.decompress(data[HEADER.size:])
+        elif version == 3:
+            offset = HEADER.size + INTERVAL.size
+            parts = []
+            found = 0
+            # Chunks after the number of ticks in the header were cut by a crash
+            while found < ticks and offset + CHUNK.size <= len(data):
+                (size, count) = CHUNK.unpack_from(data, offset)
+                offset += CHUNK.size
+                if offset + size > len(data):
+                    break
+                parts.append(zlib.decompress(data[offset:offset + size]))
+                found += len(parts[-1])
+                offset += size
+                for ind in range(count):
+                    (tick, length) = KEYFRAME.unpack_from(data, offset)
+                    offset += KEYFRAME.size
+                    keyframes.append((tick, data[offset:offset + length]))
+                    offset += length
+            moves = b''.join(parts)
+        else:
+            (_, size, count) = KEYFRAME_HEADER.unpack_from(data, HEADER.size)
+            start = HEADER.size + KEYFRAME_HEADER.size
+            moves = zlib.decompress(data[start:start + size])
+            start += size
+            blobs = start + count * INDEX.size
+            for ind in range(count):
+                (tick, offset, length) = INDEX.unpack_from(data, start + ind * INDEX.size)
+                keyframes.append((tick, data[blobs + offset:blobs + offset + length]))
+        if len(moves) != ticks:
+            raise ValueError("replay is truncated")
+        return cls(num_col, num_row, num_player, seed, moves, keyframes)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as file:
+            return cls.from_bytes(file.read())
+
+    # Number of ticks
+    def __len__(self):
+        return len(self.moves)
+
+    # Turn of each snake on a tick
+    def actions(self, tick):
+        code = self.moves[tick]
+        if self.num_player == 1:
+            return [TURNS[code & 15]]
+        return [TURNS[code & 15], TURNS[code >> 4]]
+
+    # Game as it was when the recording started
+    def new_state(self):
+        state = GameState(self.num_col, self.num_row, self.num_player, self.seed)
+        state.start()
+        return state
+
+    # Play one tick on state (state must be at this tick), returns the list of snakes that lost
+    def step(self, state, tick):
+        return state.step(self.actions(tick))
+
+    # Start the next round once a round is over, like the game does
+    @staticmethod
+    def next_round(state):
+        state.reset()
+        state.start()
+
+    # Game as it was after a number of ticks (played again from the keyframe before it, or from the first tick
+    # if keyframes is False)
+    # A round that is over is only reset before the next tick, so the end of the last round can be seen
+    def seek(self, tick, keyframes=True):
+        tick = min(tick, len(self))
+        state = self.new_state()
+        start = 0
+        ind = bisect_right(self.keyframe_ticks, tick) - 1 if keyframes else -1
+        if ind >= 0:
+            start = self.keyframe_ticks[ind]
+            decode_state(state, zlib.decompress(self.keyframes[ind]))
+        for t in range(start, tick):
+            if state.over():
+                self.next_round(state)
+            self.step(state, t)
+        return state
+
+
+# Play a replay in a window: space pauses, up/down change speed, left/right go 50 ticks back/forward
+def watch(replay, tick_rate=5):
+    # pygame is only needed to watch, not to play a replay again without a window
+    import fonts
+    import pygame
+    from render import BOX, BLUE, GREEN, RED, YELLOW, Renderer, text_cache
+
+    pygame.init()
+    font = fonts.load('comicsans', 50)
+    win = pygame.display.set_mode((replay.num_col * BOX, replay.num_row * BOX + 75))
+    renderer = Renderer(win, replay.num_col, replay.num_row, font)
+
+    # Same scores as the game
+    def score_texts(state):
+        if replay.num_player == 1:
+            return [("SCORE : " + str(state.score), BLUE, 20)]
+        return [("GREEN : " + str(state.wins[1]), GREEN, (replay.num_col - 6) * BOX),
+                ("BLUE : " + str(state.wins[0]), BLUE, 20)]
+
+    tick = 0
+    state = replay.new_state()
+    speed = 1
+    paused = False
+    lag = 0
+    clock = pygame.time.Clock()
+    renderer.full(state, score_texts(state))
+    try:
+        while True:
+            lag += clock.tick(60) * speed
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    return
+                if event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_SPACE:
+                        paused = not paused
+                    elif event.key == pygame.K_UP:
+                        speed *= 2
+                    elif event.key == pygame.K_DOWN:
+                        speed = max(speed / 2, 1 / 8)
+                    elif event.key in (pygame.K_LEFT, pygame.K_RIGHT):
+                        step = 50 if event.key == pygame.K_RIGHT else -50
+                        tick = max(0, min(len(replay), tick + step))
+                        state = replay.seek(tick)
+                        renderer.full(state, score_texts(state))
+            if paused or tick == len(replay):
+                lag = min(lag, 0)
+            while lag >= 1000 / tick_rate and tick < len(replay):
+                lag -= 1000 / tick_rate
+                if state.over():
+                    replay.next_round(state)
+                    renderer.full(state, score_texts(state))
+                replay.step(state, tick)
+                tick += 1
+                renderer.tick(state, score_texts(state))
+                if state.over():
+                    # Show the end of the round for a moment (one second at normal speed)
+                    text_box = pygame.Rect((20, 20), (250, 60))
+                    pygame.draw.rect(win, YELLOW, text_box)
+                    win.blit(text_cache.render(font, 'ROUND OVER', RED), (30, 35))
+                    renderer.dirty.append(text_box)
+                    lag = -1000
+            if not paused and tick < len(replay) and not state.over():
+                renderer.interpolate(state, max(lag, 0) * tick_rate / 1000)
+            renderer.update()
+            pygame.display.set_caption("Snake replay - tick %d / %d - x%g" % (tick, len(replay), speed))
+    finally:
+        pygame.quit()
+
+
+# python replay.py file [--headless]
+if __name__ == '__main__':
+    replay = Replay.load(sys.argv[1])
+    if '--headless' in sys.argv:
+        # Every tick played again from the start (the keyframes would skip most of them)
+        start = time.perf_counter()
+        final = replay.seek(len(replay), keyframes=False)
+        t = time.perf_counter() - start
+        print("%d ticks in %.3f s (%.0f ticks/s), score %d, wins %s"
+              % (len(replay), t, len(replay) / max(t, 1e-9), final.score, final.wins))
+        # Then the end found again from the last keyframe
+        start = time.perf_counter()
+        replay.seek(len(replay))
+        print("seek to the end with %d keyframe(s): %.1f ms"
+              % (len(replay.keyframes), (time.perf_counter() - start) * 1000))
+    else:
+        watch(replay)
@@ -0,0 +1,273 @@
+import asyncio
+import struct
+import sys
+import time
+from random import Random
+from engine import GameState
+from replay import TURNS, decode_cells, encode_cells
+
+# Online PvP: the server plays every match (clients can't cheat on the rules) and clients only send their turns
+# All the matches of the server are stepped by one loop, TICK_RATE times per second
+
+# Messages from the server: 2 bytes of length, then the message (first byte is its type)
+# START  'S' grid size, your snake, tick rate, wins, apple, then each body (length + squares): a new round
+# GO     'G' the snakes start moving to the right
+# TICK   'T' tick, flags (apple moved, snake grew, snake lost), turns of each snake already used or dropped
+#        (count of the turns received, 2 bytes), new heads, then the new apple if it moved
+#        (the tail of a snake that didn't grow is removed, like Body.move)
+# END    'E' winner (-1 for a tie), wins
+# PONG   'P' answer to a ping, right away (to measure the round trip time)
+# Squares are two bytes (column + 1, row + 1), 255 for the apple when the grid is full
+# Messages from a client: one byte per turn (code of the turn in replay.TURNS), 0 is a ping
+LENGTH = struct.Struct('<H')
+START = struct.Struct('<cBBBBII')
+TICK = struct.Struct('<cIBHH')
+END = struct.Struct('<cbII')
+# Flags of a TICK message: apple moved, then two bits per snake (grew, lost)
+APPLE_MOVED = 1
+GREW = 2
+LOST = 4
+
+TICK_RATE = 5
+# Seconds before the snakes start moving and seconds between the end of a round and the next one
+COUNTDOWN = 3
+PAUSE = 2
+# A client that doesn't read its messages is dropped once this many bytes wait to be sent to it
+MAX_BUFFER = 64 * 1024
+
+
+# Message with its length in front
+def frame(message):
+    return LENGTH.pack(len(message)) + message
+
+
+def encode_apple(state):
+    if state.applec is None:
+        return bytes((255, 255))
+    return encode_cells([(state.applec, state.appler)])
+
+
+def decode_apple(data):
+    if data == bytes((255, 255)):
+        return (None, None)
+    return decode_cells(data)[0]
+
+
+def start_message(state, player, tick_rate):
+    parts = [START.pack(b'S', state.num_col, state.num_row, player, tick_rate, *state.wins), encode_apple(state)]
+    for snake in state.snakes:
+        parts.append(LENGTH.pack(len(snake.body)))
+        parts.append(encode_cells(snake.body))
+    return frame(b''.join(parts))
+
+
+class Match:
+    def __init__(self, server, players, seed):
+        self.server = server
+        # (reader, writer) of each player, None once a player left
+        self.players = list(players)
+        self.state = GameState(server.num_col, server.num_row, 2, seed)
+        # Number of turns received from each player (a turn is queued with its number)
+        self.received = [0, 0]
+        self.wait = 0
+        self.new_round()
+
+    def send(self, data):
+        for player in self.players:
+            if player is not None:
+                self.server.send(player[1], data)
+
+    def new_round(self):
+        self.state.reset()
+        for ind, player in enumerate(self.players):
+            if player is not None:
+                self.server.send(player[1], start_message(self.state, ind, self.server.tick_rate))
+        self.wait = COUNTDOWN * self.server.tick_rate
+
+    # Turn asked by a player (only once the snakes move, a turn before the start could go back into the neck)
+    def turn(self, ind, code):
+        self.received[ind] += 1
+        if code == 0:
+            self.server.send(self.players[ind][1], frame(b'P'))
+            return
+        snake = self.state.snakes[ind]
+        if snake.dir is not None and not self.state.over() and 0 < code < len(TURNS):
+            snake.turn(TURNS[code], self.received[ind])
+
+    # Turns of a player that were used or dropped (the ones still queued come after them)
+    def done(self, ind):
+        inputs = self.state.snakes[ind].inputs
+        if inputs:
+            return inputs[0][1] - 1
+        return self.received[ind]
+
+    # Called by the server on every tick
+    def tick(self):
+        state = self.state
+        if self.wait:
+            self.wait -= 1
+            if self.wait == 0:
+                if state.over():
+                    self.new_round()
+                else:
+                    state.start()
+                    self.send(frame(b'G'))
+            return
+
+        lengths = [len(snake.body) for snake in state.snakes]
+        apple = (state.applec, state.appler)
+        loser = state.step()
+        flags = 0
+        if (state.applec, state.appler) != apple:
+            flags |= APPLE_MOVED
+        for ind, snake in enumerate(state.snakes):
+            if len(snake.body) > lengths[ind]:
+                flags |= GREW << 2 * ind
+            if ind in loser:
+                flags |= LOST << 2 * ind
+        message = TICK.pack(b'T', state.ticks, flags, self.done(0) & 0xFFFF, self.done(1) & 0xFFFF)
+        message += encode_cells(snake.body[0] for snake in state.snakes)
+        if flags & APPLE_MOVED:
+            message += encode_apple(state)
+        self.send(frame(message))
+
+        if state.over():
+            winner = state.winner()
+            self.send(frame(END.pack(b'E', -1 if winner is None else winner, *state.wins)))
+            self.wait = PAUSE * self.server.tick_rate
+
+    # A player left, the other one wins and the match is over
+    def leave(self, ind):
+        self.players[ind] = None
+        other = self.players[1 - ind]
+        if other is not None:
+            self.state.wins[1 - ind] += 1
+            self.server.send(other[1], frame(END.pack(b'E', 1 - ind, *self.state.wins)))
+            other[1].close()
+            self.players[1 - ind] = None
+        self.server.matches.discard(self)
+
+
+class Server:
+    def __init__(self, num_col=17, num_row=15, tick_rate=TICK_RATE, seed=None):
+        self.num_col = num_col
+        self.num_row = num_row
+        self.tick_rate = tick_rate
+        # Seed of every match comes from the server seed, so a server seed always plays the same apples
+        self.rng = Random(seed)
+        self.matches = set()
+        # Player waiting for an opponent and the future that gets their match
+        self.waiting = None
+        self.ticks = 0
+        # Time spent stepping matches (seconds) and number of match ticks, to measure the cost of a match
+        self.tick_time = 0
+        self.match_ticks = 0
+        self.bytes_sent = 0
+
+    def send(self, writer, data):
+        if writer.is_closing():
+            return
+        if writer.transport.get_write_buffer_size() > MAX_BUFFER:
+            writer.close()
+            return
+        writer.write(data)
+        self.bytes_sent += len(data)
+
+    # Called by asyncio for every new connection, reads the turns of the player until they leave
+    async def handle(self, reader, writer):
+        player = (reader, writer)
+        # Read started while waiting for an opponent, the match gets its data
+        reading = None
+        if self.waiting is None or self.waiting[0][1].is_closing():
+            # Wait for an opponent, the match is created when they connect
+            found = asyncio.get_running_loop().create_future()
+            self.waiting = (player, found)
+            # The connection is read while waiting (is_closing stays False when the other side closes): a player
+            # who leaves is not given to the next opponent, and what they sent goes to the match once it starts
+            # (clients count every byte they send, pings included)
+            early = bytearray()
+            left = False
+            try:
+                while not found.done() and not left:
+                    reading = asyncio.ensure_future(reader.read(64))
+                    await asyncio.wait((found, reading), return_when=asyncio.FIRST_COMPLETED)
+                    if reading.done():
+                        data = reading.result()
+                        reading = None
+                        left = not data
+                        early += data
+            except ConnectionError:
+                left = True
+            except asyncio.CancelledError:
+                if reading is not None:
+                    reading.cancel()
+                raise
+            finally:
+                if self.waiting is not None and self.waiting[1] is found:
+                    self.waiting = None
+            if left:
+                # An opponent paired on the same tick wins the match right away
+                if found.done():
+                    found.result().leave(0)
+                writer.close()
+                return
+            match = found.result()
+            ind = 0
+            for code in early:
+                match.turn(ind, code)
+        else:
+            (other, found) = self.waiting
+            self.waiting = None
+            match = Match(self, [other, player], self.rng.getrandbits(64))
+            self.matches.add(match)
+            found.set_result(match)
+            ind = 1
+
+        try:
+            while True:
+                if reading is not None:
+                    data = await reading
+                    reading = None
+                else:
+                    data = await reader.read(64)
+                if not data:
+                    break
+                for code in data:
+                    match.turn(ind, code)
+        except ConnectionError:
+            pass
+        finally:
+            if match.players[ind] is not None:
+                match.leave(ind)
+            writer.close()
+
+    # Step every match on a fixed tick (the next tick time doesn't drift if a tick is late)
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        interval = 1 / self.tick_rate
+        next_tick = loop.time()
+        while True:
+            start = time.perf_counter()
+            for match in list(self.matches):
+                match.tick()
+            self.tick_time += time.perf_counter() - start
+            self.match_ticks += len(self.matches)
+            self.ticks += 1
+            next_tick += interval
+            await asyncio.sleep(max(next_tick - loop.time(), 0))
+
+    # Accept players and run the matches until cancelled
+    async def serve(self, host='127.0.0.1', port=5555):
+        server = await asyncio.start_server(self.handle, host, port, backlog=1024)
+        self.port = server.sockets[0].getsockname()[1]
+        async with server:
+            await self.run()
+
+
+# python server.py [port]
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 5555
+    try:
+        asyncio.run(Server().serve('0.0.0.0', port))
+    except KeyboardInterrupt:
+        pass
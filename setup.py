@@ -1,7 +1,9 @@
 import sys
 from cx_Freeze import setup, Executable
 
+# data/ is copied next to the executable: icons and image, and the font used when a system font is missing
 build_exe_options = {"packages": ["pygame", "random", "tkinter"],
+                     "include_files": ["data"],
                      "excludes": ["numpy", "pytz", "asyncio", "concurrent", "ctypes", "distutils", "email", "html",
                                   "http", "json", "logging", "multiprocessing", "neat", "pkg_resources", "pydoc_data",
                                   "test", "unittest", "urllib", "xmlrpc"]}
@@ -0,0 +1,173 @@
+import gc
+import os
+import sys
+import time
+import traceback
+from random import Random
+
+# Soak test: the real game loop of Snake.py played by bots for as long as asked, without the settings window and
+# without a screen (SDL dummy drivers), as fast as it can go
+# Every REPORT seconds a line shows the ticks per second, the memory used and the number of Python objects, so a
+# leak shows up as numbers that keep going up. Exceptions are printed with their traceback (Snake.py hides
+# pygame errors when it quits) and the game is started again with the next seed, unless the game keeps failing
+# the same way before playing a single tick (a missing file, a wrong option...): restarting can't fix that
+# python soak.py [columns rows players seed] [--minutes M] [--input autopilot|cycle|random] [--record]
+#                [--stop-on-error]
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+# Seconds between two reports
+REPORT = 10
+# Chance of a random turn on each tick with --input random
+TURN_CHANCE = 0.1
+# The soak test stops when the game fails this many times in a row with the same exception before its first tick
+SETUP_FAILURES = 3
+
+
+# Memory used by the process in MB (None if it can't be read on this system)
+def memory():
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Highest memory used so far (kilobytes on Linux, bytes on macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+# Bot turning at random (rounds are short, a lot of them are played)
+class RandomTurns:
+    def __init__(self, ind, rng):
+        self.ind = ind
+        self.rng = rng
+
+    def decide(self, state):
+        if self.rng.random() < TURN_CHANCE:
+            return self.rng.choice('rlud')
+        return None
+
+    def decision_time(self):
+        return 0
+
+
+class Soak:
+    def __init__(self, num_col=17, num_row=15, num_player=1, seed=0, minutes=60, bots='autopilot', record=False):
+        self.num_col = num_col
+        self.num_row = num_row
+        self.num_player = num_player
+        self.seed = seed
+        self.bots = bots
+        self.record = record
+        self.rng = Random(seed)
+        self.start_time = time.perf_counter()
+        self.end_time = self.start_time + minutes * 60
+        self.ticks = 0
+        self.rounds = 0
+        # (seconds since the start, traceback) of every exception
+        self.errors = []
+        # Time, ticks and memory of the last report, memory and objects when the test started
+        self.last_time = self.start_time
+        self.last_ticks = 0
+        self.first_memory = memory()
+        self.first_objects = len(gc.get_objects())
+        self.peak_memory = self.first_memory
+
+    # Bots playing the snakes (called by Snake.main)
+    def pilots(self, num_player):
+        if self.bots == 'random':
+            return [RandomTurns(ind, self.rng) for ind in range(num_player)]
+        if self.bots == 'cycle':
+            from hamilton import CycleSolver
+            return [CycleSolver(ind) for ind in range(num_player)]
+        from autopilot import Autopilot
+        return [Autopilot(ind) for ind in range(num_player)]
+
+    # Called by Snake.main after every tick
+    def tick(self, state):
+        self.ticks += 1
+        if state.over():
+            self.rounds += 1
+        if self.ticks % 256 == 0 and time.perf_counter() - self.last_time >= REPORT:
+            self.report()
+
+    def finished(self):
+        return time.perf_counter() >= self.end_time
+
+    def report(self):
+        now = time.perf_counter()
+        used = memory()
+        if used is not None:
+            self.peak_memory = max(self.peak_memory, used)
+        print("%7.0f s  %10d ticks  %7d rounds  %8.0f ticks/s  memory %s  objects %+d  errors %d"
+              % (now - self.start_time, self.ticks, self.rounds,
+                 (self.ticks - self.last_ticks) / (now - self.last_time),
+                 "-" if used is None else "%.1f MB (%+.1f)" % (used, used - self.first_memory),
+                 len(gc.get_objects()) - self.first_objects, len(self.errors)))
+        sys.stdout.flush()
+        self.last_time = now
+        self.last_ticks = self.ticks
+
+    def summary(self):
+        seconds = time.perf_counter() - self.start_time
+        used = memory()
+        print("%d ticks and %d rounds in %.0f s: %.0f ticks/s"
+              % (self.ticks, self.rounds, seconds, self.ticks / seconds))
+        if used is not None:
+            print("memory %.1f MB at the start, %.1f MB at the end (%+.1f MB), %.1f MB at most"
+                  % (self.first_memory, used, used - self.first_memory, max(self.peak_memory, used)))
+        print("%+d Python objects" % (len(gc.get_objects()) - self.first_objects))
+        print("%d exception(s)" % len(self.errors))
+        for (when, text) in self.errors:
+            print("at %.0f s:\n%s" % (when, text))
+
+
+# Value given after an option on the command line
+def option(name, default):
+    if name in sys.argv:
+        return sys.argv[sys.argv.index(name) + 1]
+    return default
+
+
+if __name__ == '__main__':
+    import pygame
+    import Snake
+
+    # Numbers that are not the value of an option
+    args = [int(arg) for ind, arg in enumerate(sys.argv[1:], 1)
+            if not arg.startswith('--') and sys.argv[ind - 1] not in ('--minutes', '--input')]
+    (num_col, num_row, num_player, seed) = (args + [17, 15, 1, 0][len(args):])[:4]
+    soak = Soak(num_col, num_row, num_player, seed, float(option('--minutes', 60)), option('--input', 'autopilot'),
+                '--record' in sys.argv)
+    print("soak test: %dx%d, %d player(s), seed %d, %s bots" % (num_col, num_row, num_player, seed, soak.bots))
+    # Same exception before the first tick, times in a row
+    failures = 0
+    while not soak.finished():
+        ticks = soak.ticks
+        try:
+            Snake.main(soak)
+        except Exception:
+            text = traceback.format_exc()
+            if soak.ticks == ticks and soak.errors and text == soak.errors[-1][1]:
+                failures += 1
+            else:
+                failures = 1 if soak.ticks == ticks else 0
+            soak.errors.append((time.perf_counter() - soak.start_time, text))
+            print(text)
+            if '--stop-on-error' in sys.argv:
+                break
+            if failures == SETUP_FAILURES:
+                print("stopped: the game failed %d times in a row the same way before playing a tick" % failures)
+                break
+            # Start again on other apples, the same seed would most likely fail the same way
+            soak.seed += 1
+            pygame.display.quit()
+            pygame.display.init()
+    soak.summary()
+    pygame.quit()
+    sys.exit(1 if soak.errors else 0)
@@ -0,0 +1,22 @@
+import os
+
+import pytest
+
+from archive import GAMES_MAGIC, HEADER, VERSION, Archive
+
+
+def test_new_archive(tmp_path):
+    archive = Archive(str(tmp_path))
+    assert len(archive) == 0
+    assert len(archive.games()) == 0
+    # Opened again once the files exist
+    assert len(Archive(str(tmp_path))) == 0
+
+
+# Empty, cut in the header or another file: ValueError, not struct.error
+@pytest.mark.parametrize('data', [b'', HEADER.pack(GAMES_MAGIC, VERSION)[:5], HEADER.pack(b'SNKR', VERSION)])
+def test_bad_header(tmp_path, data):
+    with open(os.path.join(str(tmp_path), 'games'), 'wb') as file:
+        file.write(data)
+    with pytest.raises(ValueError):
+        Archive(str(tmp_path))
@@ -0,0 +1,61 @@
+from random import Random
+from arena import Arena
+
+# Arena keeps a grid counting the body parts on each square instead of looking at the bodies, these tests play
+# random rounds and check every tick against a count made again from the bodies
+
+
+# Number of body parts on each square of the grid for the given snakes
+def recount(arena, snakes):
+    counts = {}
+    for ind in snakes:
+        for (col, row) in arena.snakes[ind].body:
+            if 0 <= col < arena.num_col and 0 <= row < arena.num_row:
+                counts[(col, row)] = counts.get((col, row), 0) + 1
+    return counts
+
+
+def play(num_col, num_row, num_player, seed, ticks=3000):
+    rng = Random(seed)
+    arena = Arena(num_col, num_row, num_player, seed)
+    arena.start()
+    for _ in range(ticks):
+        if arena.over():
+            arena.reset()
+            arena.start()
+        playing = [ind for ind in range(num_player) if arena.alive[ind]]
+        # Bots most of the time, random turns to get every kind of crash
+        actions = [None if not arena.alive[ind] else
+                   rng.choice('rlud') if rng.random() < 0.2 else arena.bot_turn(ind) for ind in range(num_player)]
+        loser = arena.step(actions)
+
+        # A snake loses when its head left the grid or is on a square with another body part (its own body,
+        # another body or another head), snakes that lost on this tick still count
+        counts = recount(arena, playing)
+        expected = []
+        for ind in playing:
+            (col, row) = head = arena.snakes[ind].body[0]
+            if not (0 <= col < num_col and 0 <= row < num_row) or counts[head] > 1:
+                expected.append(ind)
+        assert sorted(loser) == expected
+        assert [ind for ind in range(num_player) if arena.alive[ind]] == [ind for ind in playing if ind not in loser]
+
+        # Grid and free squares are the same as a count of the snakes still playing
+        counts = recount(arena, [ind for ind in range(num_player) if arena.alive[ind]])
+        assert arena.grid == [counts.get((col, row), 0) for row in range(num_row) for col in range(num_col)]
+        assert set(arena.free.cells) == {(col, row) for row in range(num_row) for col in range(num_col)
+                                         if (col, row) not in counts}
+        assert arena.applec is None or (arena.applec, arena.appler) not in counts
+
+
+def test_many_snakes():
+    play(50, 30, 64, 1)
+
+
+def test_few_snakes():
+    for seed in range(4):
+        play(20, 12, 4, seed, 1000)
+
+
+def test_one_snake():
+    play(12, 10, 1, 2)
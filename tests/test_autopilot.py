@@ -0,0 +1,73 @@
+from random import Random
+from autopilot import Autopilot, Regions
+from engine import GameState
+
+# Regions are updated square by square instead of being filled again, these tests check them against new Regions
+# made from the same taken squares
+
+
+# Regions as a set of groups of squares, so labels can be compared whatever their numbers
+def groups(regions):
+    found = {}
+    for ind, label in enumerate(regions.labels):
+        if label:
+            found.setdefault(label, set()).add(ind)
+    # Every label has the right size and no size is left for a label that is gone
+    assert regions.sizes == {label: len(cells) for label, cells in found.items()}
+    return {frozenset(cells) for cells in found.values()}
+
+
+def same(regions, num_col, num_row, taken):
+    fresh = Regions(num_col, num_row, taken)
+    assert groups(regions) == groups(fresh)
+
+
+def test_random_squares():
+    for seed in range(5):
+        rng = Random(seed)
+        (num_col, num_row) = (rng.randint(3, 20), rng.randint(3, 15))
+        taken = set()
+        regions = Regions(num_col, num_row)
+        for _ in range(1500):
+            pos = (rng.randrange(num_col), rng.randrange(num_row))
+            if pos in taken:
+                taken.discard(pos)
+                regions.free(*pos)
+            else:
+                taken.add(pos)
+                regions.take(*pos)
+            same(regions, num_col, num_row, taken)
+
+
+# Walls drawn and opened one square at a time cut the grid into parts and join them again
+def test_walls():
+    (num_col, num_row) = (16, 12)
+    regions = Regions(num_col, num_row)
+    taken = set()
+    for row in range(num_row):
+        taken.add((8, row))
+        regions.take(8, row)
+        same(regions, num_col, num_row, taken)
+    for col in range(num_col):
+        taken.add((col, 6))
+        regions.take(col, 6)
+        same(regions, num_col, num_row, taken)
+    for pos in sorted(taken):
+        taken.discard(pos)
+        regions.free(*pos)
+        same(regions, num_col, num_row, taken)
+
+
+# Regions kept by the autopilot while it plays (tails freed, heads taken on every tick)
+def test_played_games():
+    for num_player in (1, 2):
+        state = GameState(12, 10, num_player, seed=num_player)
+        pilots = [Autopilot(ind) for ind in range(num_player)]
+        for _ in range(3):
+            state.reset()
+            state.start()
+            while not state.over() and state.ticks < 1000:
+                actions = [pilot.decide(state) for pilot in pilots]
+                taken = {pos for snake in state.snakes for pos in snake.body}
+                same(pilots[0].regions, state.num_col, state.num_row, taken)
+                state.step(actions)
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from batch import ACTIONS, BatchSnakeEnv
+from engine import GameState
+
+
+# Body of a snake of the batch as (column, row) squares from head to tail, like engine.Snake.body
+def body(env, game, snake):
+    ptr = env.head_ptr[game, snake]
+    cells = env.bodies[game, snake, (ptr - np.arange(env.length[game, snake])) % env.size]
+    return [(int(cell) % env.num_col, int(cell) // env.num_col) for cell in cells]
+
+
+# Same random turns given to the batch and to one GameState per game, the apples of the batch are copied to the
+# GameStates (the two don't draw them the same way): every step the bodies, the losers, the apples eaten and
+# the wins must be the same
+@pytest.mark.parametrize('num_player', [1, 2])
+def test_same_as_engine(num_player):
+    env = BatchSnakeEnv(300, 8, 7, num_player, seed=5)
+    states = [GameState(8, 7, num_player, seed) for seed in range(env.num_env)]
+    for state in states:
+        state.start()
+    rng = np.random.default_rng(5)
+    games = 0
+    for _ in range(200):
+        actions = rng.integers(-1, len(ACTIONS), (env.num_env, num_player))
+        (_, rewards, done) = env.step(actions)
+        for game, state in enumerate(states):
+            lengths = [len(snake.body) for snake in state.snakes]
+            loser = state.step([None if code < 0 else ACTIONS[code] for code in actions[game]])
+            assert sorted(loser) == list(np.flatnonzero(~env.alive[game]))
+            assert list(state.wins) == list(env.wins[game])
+            # +1 for an apple, -1 for losing (a snake can do both on the same tick)
+            assert list(rewards[game]) == [len(snake.body) - length - (ind in loser)
+                                           for ind, (snake, length) in enumerate(zip(state.snakes, lengths))]
+            assert state.over() == done[game]
+            if state.over():
+                games += 1
+                state.reset()
+                state.start()
+                continue
+            for ind, snake in enumerate(state.snakes):
+                assert list(snake.body) == body(env, game, ind)
+            (state.applec, state.appler) = (int(env.apple[game]) % 8, int(env.apple[game]) // 8)
+    assert games >= 300
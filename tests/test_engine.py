@@ -0,0 +1,105 @@
+from body import Body
+from engine import INPUT_QUEUE, GameState, Snake
+from freecells import FreeCells
+
+# Rules of engine.py that everything else builds on: collisions, turns and the winner of a round
+
+
+# Two snakes going right on their own rows, apple out of the way
+def pvp(bodies, dirs=('r', 'r')):
+    state = GameState(17, 15, 2, seed=0)
+    for snake, body, direction in zip(state.snakes, bodies, dirs):
+        snake.body = Body(body)
+        snake.dir = direction
+    state.free = FreeCells(17, 15, [pos for body in bodies for pos in body])
+    (state.applec, state.appler) = (16, 14)
+    return state
+
+
+def test_head_on():
+    # Heads go into the same square: both lose, nobody wins
+    state = pvp([[(4, 5), (3, 5), (2, 5)], [(6, 5), (7, 5), (8, 5)]], ('r', 'l'))
+    assert sorted(state.step()) == [0, 1]
+    assert state.over() and state.winner() is None
+    assert state.wins == [0, 0]
+
+
+def test_head_into_neck():
+    # Second snake goes up into the square behind the head of the first one
+    state = pvp([[(5, 5), (4, 5), (3, 5)], [(4, 6), (4, 7), (4, 8)]], ('r', 'u'))
+    assert state.step() == [1]
+    assert state.winner() == 0
+    assert state.wins == [1, 0]
+
+
+def test_own_neck_is_not_a_turn():
+    # Going back is refused, the snake keeps going straight
+    snake = Snake(4, 5)
+    snake.dir = 'r'
+    snake.turn('l')
+    assert not snake.inputs
+    snake.move_snake()
+    assert snake.body[0] == (5, 5)
+
+
+def test_tail_chasing():
+    # Head goes where its own tail is on this tick, the tail moves away first
+    state = GameState(17, 15, 1, seed=0)
+    snake = state.snakes[0]
+    snake.body = Body([(1, 1), (1, 0), (0, 0), (0, 1)])
+    snake.dir = 'd'
+    snake.turn('l')
+    state.free = FreeCells(17, 15, snake.body)
+    (state.applec, state.appler) = (16, 14)
+    assert state.step() == []
+    assert list(snake.body) == [(0, 1), (1, 1), (1, 0), (0, 0)]
+    # Same with the tail of the other snake
+    state = pvp([[(4, 5), (3, 5), (2, 5)], [(5, 7), (5, 6), (5, 5)]], ('r', 'd'))
+    assert state.step() == []
+    assert state.snakes[0].body[0] == (5, 5)
+
+
+def test_tail_stays_when_eating():
+    # A snake that eats keeps its tail, going there the same tick hits it
+    state = pvp([[(4, 5), (3, 5), (2, 5)], [(2, 7), (2, 6), (1, 6)]], ('r', 'u'))
+    (state.applec, state.appler) = (5, 5)
+    assert state.step() == [1]
+    assert len(state.snakes[0].body) == 4
+
+
+def test_input_queue():
+    snake = Snake(4, 5)
+    snake.dir = 'r'
+    # Each turn has to be perpendicular to the one before it, only INPUT_QUEUE of them are kept
+    snake.turn('u')
+    snake.turn('d')
+    assert [direction for (direction, _) in snake.inputs] == ['u']
+    for direction in 'rdl':
+        snake.turn(direction)
+    assert len(snake.inputs) == INPUT_QUEUE == 3
+    assert [direction for (direction, _) in snake.inputs] == ['u', 'r', 'd']
+    # One turn is used on each move, then the snake goes straight
+    moves = []
+    for _ in range(4):
+        snake.move_snake()
+        moves.append(snake.dir)
+    assert moves == ['u', 'r', 'd', 'd']
+    assert list(snake.body) == [(5, 6), (5, 5), (5, 4)]
+
+
+def test_winner():
+    # Singleplayer has no winner
+    state = GameState(17, 15, 1, seed=0)
+    state.snakes[0].dir = 'u'
+    for _ in range(8):
+        state.step()
+    assert state.over() and state.winner() is None
+    # Only one snake lost: the other one wins the round
+    state = pvp([[(16, 5), (15, 5), (14, 5)], [(12, 6), (11, 6), (10, 6)]])
+    assert state.step() == [0]
+    assert state.winner() == 1 and state.wins == [0, 1]
+    # The first snake goes into its own body on the square the other head goes into: it lost twice but is listed
+    # once, both snakes lost so the round is a tie
+    state = pvp([[(5, 5), (4, 5), (4, 6), (5, 6), (6, 6)], [(5, 7), (5, 8), (5, 9)]], ('d', 'u'))
+    assert state.step() == [0, 1]
+    assert state.winner() is None and state.wins == [0, 0]
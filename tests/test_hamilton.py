@@ -0,0 +1,48 @@
+from engine import GameState
+from hamilton import CycleSolver, cycle
+
+# The solver is only safe if the cycles really go through every square with moves of one square, and the rounds
+# it plays only end when the grid is full
+
+
+def next_to(pos, other):
+    return abs(pos[0] - other[0]) + abs(pos[1] - other[1]) == 1
+
+
+def test_cycles():
+    for num_col in range(2, 201):
+        for num_row in range(2, 400 // num_col + 1):
+            (order, spare, slot) = cycle(num_col, num_row)
+            squares = {(col, row) for col in range(num_col) for row in range(num_row)}
+            assert len(set(order)) == len(order)
+            assert all(next_to(order[num - 1], order[num]) for num in range(len(order)))
+            if num_col % 2 == 1 and num_row % 2 == 1:
+                # Only the corner is left out, and it can take the place of the square at slot
+                assert spare == (num_col - 1, num_row - 1)
+                assert set(order) == squares - {spare}
+                assert next_to(order[slot - 1], spare) and next_to(spare, order[slot + 1])
+            else:
+                assert spare is None
+                assert set(order) == squares
+
+
+def fill(num_col, num_row, seed):
+    state = GameState(num_col, num_row, seed=seed)
+    solver = CycleSolver()
+    state.start()
+    while not state.over():
+        state.step([solver.decide(state)])
+    assert not state.loser
+    assert len(state.snakes[0].body) == num_col * num_row
+
+
+# Every size of the settings window up to 180 squares and a few larger ones, even and odd (the last apple of an
+# odd grid lands on the corner or on its diagonal depending on the seed)
+def test_fills_the_grid():
+    for num_col in range(12, 19):
+        for num_row in range(10, 180 // num_col + 1):
+            fill(num_col, num_row, num_col * num_row)
+    for (num_col, num_row) in [(17, 15), (20, 20), (21, 19)]:
+        fill(num_col, num_row, 0)
+    for seed in range(4):
+        fill(13, 11, seed)
@@ -0,0 +1,83 @@
+from random import Random
+from largeboard import CHUNK_BITS, ChunkedBits, LargeArena
+
+# LargeArena finds collisions while it sets the bits of the heads, these tests play random rounds and check every
+# tick against the bodies: losers, bits, chunks and apples
+
+
+def squares(bits):
+    found = set()
+    for (key_col, key_row), chunk in bits.chunks.items():
+        for byte_ind, byte in enumerate(chunk):
+            for bit_ind in range(8):
+                if byte >> bit_ind & 1:
+                    bit = byte_ind * 8 + bit_ind
+                    found.add(((key_col << CHUNK_BITS) + (bit & (1 << CHUNK_BITS) - 1),
+                               (key_row << CHUNK_BITS) + (bit >> CHUNK_BITS)))
+    return found
+
+
+def test_chunked_bits():
+    rng = Random(0)
+    bits = ChunkedBits()
+    expected = set()
+    for _ in range(20000):
+        pos = (rng.randrange(300), rng.randrange(200))
+        if rng.random() < 0.5:
+            assert bits.add(pos) == (pos not in expected)
+            expected.add(pos)
+        else:
+            bits.discard(pos)
+            expected.discard(pos)
+        assert (pos in bits) == (pos in expected)
+    assert squares(bits) == expected
+    # Chunks only exist while something is in them, with the right count
+    for key, chunk in bits.chunks.items():
+        assert bits.counts[key] == sum(bin(byte).count('1') for byte in chunk) > 0
+
+
+def play(num_col, num_row, num_player, num_apple, seed, ticks=1500):
+    rng = Random(seed)
+    arena = LargeArena(num_col, num_row, num_player, num_apple, seed)
+    arena.start()
+    for _ in range(ticks):
+        if arena.over():
+            arena.reset()
+            arena.start()
+        playing = [ind for ind in range(num_player) if arena.alive[ind]]
+        actions = [None if not arena.alive[ind] else
+                   rng.choice('rlud') if rng.random() < 0.2 else arena.bot_turn(ind) for ind in range(num_player)]
+        loser = arena.step(actions)
+
+        # Head out of the grid or on a square with another body part of a snake that was playing
+        counts = {}
+        for ind in playing:
+            for pos in arena.snakes[ind].body:
+                counts[pos] = counts.get(pos, 0) + 1
+        expected = []
+        for ind in playing:
+            (col, row) = head = arena.snakes[ind].body[0]
+            if not (0 <= col < num_col and 0 <= row < num_row) or counts[head] > 1:
+                expected.append(ind)
+        assert loser == expected
+
+        # Bits are the squares of the snakes still playing, apples are on empty squares and indexed by chunk
+        taken = {pos for ind in range(num_player) if arena.alive[ind] for pos in arena.snakes[ind].body}
+        assert all(pos in arena.bits for pos in taken) and sum(arena.bits.counts.values()) == len(taken)
+        # Every bit read back once in a while (slower)
+        if arena.ticks % 100 == 0:
+            assert squares(arena.bits) == taken
+        assert not arena.apples & taken
+        assert all(0 <= col < num_col and 0 <= row < num_row for (col, row) in arena.apples)
+        assert {pos for chunk in arena.apple_chunks.values() for pos in chunk} == arena.apples
+        assert all(ChunkedBits.locate(pos)[0] == key for key, chunk in arena.apple_chunks.items() for pos in chunk)
+
+
+def test_large_grid():
+    play(300, 200, 64, 200, 1)
+
+
+def test_crowded_grid():
+    # Small grid with many apples, so snakes grow into each other
+    for seed in range(3):
+        play(40, 30, 16, 60, seed, 800)
@@ -0,0 +1,21 @@
+import numpy as np
+import pytest
+
+from batch import ACTIONS, BatchSnakeEnv
+from observe import GridPlanes
+
+
+# Planes changed square by square after each step are the same as planes made again from the grid
+# (small grids so snakes eat, die and games are reset often)
+@pytest.mark.parametrize('num_player', [1, 2])
+def test_incremental_planes(num_player):
+    env = BatchSnakeEnv(128, 8, 7, num_player, seed=3)
+    planes = GridPlanes(env)
+    rng = np.random.default_rng(3)
+    ended = 0
+    for _ in range(300):
+        (_, _, done) = env.step(rng.integers(-1, len(ACTIONS), (env.num_env, num_player)))
+        planes.update(done)
+        ended += done.sum()
+        assert np.array_equal(planes.obs, GridPlanes(env).obs)
+    assert ended > 0
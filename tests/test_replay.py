@@ -0,0 +1,82 @@
+from random import Random
+
+import pytest
+
+from engine import GameState
+from replay import MAX_SEED, HEADER, INTERVAL, Recorder, Replay, encode_state
+
+
+# Game played with random turns like Snake.py plays it, saved every 100 ticks so the file is written in parts
+# Returns the recorder and the state after each tick
+def play(num_player, ticks, path, seed=7, interval=64):
+    state = GameState(12, 10, num_player, seed)
+    state.start()
+    recorder = Recorder(state, path, interval)
+    rng = Random(seed)
+    states = [encode_state(state)]
+    for tick in range(ticks):
+        if state.over():
+            state.reset()
+            state.start()
+        state.step([rng.choice('rlud') if rng.random() < 0.3 else None for _ in range(num_player)])
+        recorder.record()
+        states.append(encode_state(state))
+        if tick % 100 == 99:
+            assert recorder.save()
+    assert recorder.save()
+    return recorder, states
+
+
+@pytest.mark.parametrize('num_player', [1, 2])
+def test_round_trip(tmp_path, num_player):
+    path = str(tmp_path / 'game.snkr')
+    (recorder, states) = play(num_player, 1000, path)
+    replay = Replay.load(path)
+    # Written in parts, read back as if it was written at once
+    with open(path, 'rb') as file:
+        assert Replay.from_bytes(file.read()).moves == Replay.from_bytes(recorder.to_bytes()).moves
+    assert (replay.num_col, replay.num_row, replay.num_player, replay.seed) == (12, 10, num_player, 7)
+    assert len(replay) == 1000
+    assert replay.keyframe_ticks == list(range(64, 1001, 64))
+    # Every tick played again from the start
+    state = replay.new_state()
+    for tick in range(len(replay)):
+        if state.over():
+            replay.next_round(state)
+        replay.step(state, tick)
+        assert encode_state(state) == states[tick + 1]
+
+
+@pytest.mark.parametrize('num_player', [1, 2])
+def test_keyframe_seek(tmp_path, num_player):
+    path = str(tmp_path / 'game.snkr')
+    (_, states) = play(num_player, 1000, path)
+    replay = Replay.load(path)
+    # Before, on and after keyframes
+    for tick in [0, 1, 63, 64, 65, 500, 640, 999, 1000]:
+        assert encode_state(replay.seek(tick)) == states[tick]
+        assert encode_state(replay.seek(tick, keyframes=False)) == states[tick]
+
+
+def test_seed():
+    # Negative seeds give the same apples as their absolute value
+    assert Recorder(GameState(seed=-5)).seed == 5
+    assert Recorder(GameState(seed=MAX_SEED)).seed == MAX_SEED
+    with pytest.raises(ValueError):
+        Recorder(GameState(seed=MAX_SEED + 1))
+
+
+def test_cut_chunk(tmp_path):
+    # A chunk cut by a crash is left out, the ticks saved before it are still there
+    path = str(tmp_path / 'game.snkr')
+    play(1, 250, path)
+    with open(path, 'rb') as file:
+        data = file.read()
+    (magic, version, num_col, num_row, num_player, seed, _) = HEADER.unpack_from(data)
+    header = HEADER.pack(magic, version, num_col, num_row, num_player, seed, 200)
+    replay = Replay.from_bytes(header + data[HEADER.size:-5])
+    assert len(replay) == 200
+    with pytest.raises(ValueError):
+        Replay.from_bytes(data[:HEADER.size + INTERVAL.size - 1])
+    with pytest.raises(ValueError):
+        Replay.from_bytes(b'')
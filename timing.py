@@ -0,0 +1,116 @@
+from collections import deque
+from time import perf_counter
+
+# Time spent in each part of a frame (events, snake moves, collisions, apple, drawing, text, flip...)
+# Code being timed calls mark(phase) at the end of each part: the time since the last mark goes to that phase,
+# so a phase can end in several places and nothing has to be started. frame() closes the frame
+# Everything that can be timed has a profiler attribute that is None unless profiling is on, so a frame
+# costs one "is not None" check per phase when it is off
+
+# Frames kept for the percentiles (10 seconds at 60 frames per second)
+SAMPLES = 600
+PERCENTILES = (50, 95, 99)
+# Frames between two updates of the overlay (sorting the samples every frame would show up in the timings)
+OVERLAY_FRAMES = 30
+# File written when the game closes
+EXPORT_PATH = 'profile.csv'
+
+
+class Profiler:
+    def __init__(self, size=SAMPLES):
+        self.size = size
+        # Durations of the last frames for each phase (seconds), phase totals of the current frame
+        self.samples = {}
+        self.current = {}
+        # Number of frames, total and longest time of each phase since profiling started
+        self.frames = 0
+        self.totals = {}
+        self.worst = {}
+        self.last = perf_counter()
+        # Overlay surface (made again every OVERLAY_FRAMES frames) and the part of the window it covered
+        self.overlay = None
+        self.covered = None
+
+    def mark(self, phase):
+        now = perf_counter()
+        self.current[phase] = self.current.get(phase, 0) + now - self.last
+        self.last = now
+
+    # Forget the time since the last mark (time that belongs to no phase)
+    def skip(self):
+        self.last = perf_counter()
+
+    # End of a frame: each phase gets its time for this frame (0 if it didn't happen), 'frame' is the time of
+    # every phase but 'wait' (time waited to stay under the frame rate)
+    def frame(self):
+        self.mark('other')
+        self.current['frame'] = sum(seconds for phase, seconds in self.current.items() if phase != 'wait')
+        for phase in self.current:
+            if phase not in self.samples:
+                self.samples[phase] = deque([0] * min(self.frames, self.size), maxlen=self.size)
+                self.totals[phase] = 0
+                self.worst[phase] = 0
+        for phase, samples in self.samples.items():
+            seconds = self.current.get(phase, 0)
+            samples.append(seconds)
+            self.totals[phase] += seconds
+            self.worst[phase] = max(self.worst[phase], seconds)
+        self.current = {}
+        self.frames += 1
+        if self.frames % OVERLAY_FRAMES == 0:
+            self.overlay = None
+
+    # Percentiles of the last frames in milliseconds
+    def percentiles(self, phase):
+        samples = sorted(self.samples[phase])
+        return [samples[min(len(samples) - 1, len(samples) * percent // 100)] * 1000 for percent in PERCENTILES]
+
+    # Phases from the slowest to the fastest (p99), frame first
+    def phases(self):
+        return sorted(self.samples, key=lambda phase: (phase != 'frame', -self.percentiles(phase)[-1]))
+
+    # One line per phase: frames, mean, percentiles and worst time in milliseconds
+    def export(self, path=EXPORT_PATH):
+        with open(path, 'w') as file:
+            file.write("phase,frames,mean_ms,%s,max_ms\n" % ",".join("p%d_ms" % percent for percent in PERCENTILES))
+            for phase in self.phases():
+                values = ([self.totals[phase] / self.frames * 1000] + self.percentiles(phase)
+                          + [self.worst[phase] * 1000])
+                file.write("%s,%d,%s\n" % (phase, self.frames, ",".join("%.3f" % value for value in values)))
+
+    # Draw the percentiles on the top left of the window (the squares under it are drawn again before the
+    # next frame by clear)
+    def draw(self, renderer, font):
+        if not self.samples:
+            return
+        if self.overlay is None:
+            import pygame
+            lines = ["%-10s %s" % ("ms", " ".join("%6s" % ("p%d" % percent) for percent in PERCENTILES))]
+            for phase in self.phases():
+                lines.append("%-10s %s" % (phase, " ".join("%6.2f" % value for value in self.percentiles(phase))))
+            surfaces = [font.render(line, True, (255, 255, 255)) for line in lines]
+            height = font.get_linesize()
+            self.overlay = pygame.Surface((max(surface.get_width() for surface in surfaces) + 8,
+                                           height * len(surfaces) + 8))
+            self.overlay.set_alpha(200)
+            for ind, surface in enumerate(surfaces):
+                self.overlay.blit(surface, (4, 4 + ind * height))
+        rect = renderer.win.blit(self.overlay, (renderer.x, renderer.y))
+        renderer.dirty.append(rect)
+        self.covered = rect
+
+    # Draw again the squares under the overlay of the last frame
+    def clear(self, renderer, state):
+        from render import BOX
+
+        rect = self.covered
+        if rect is None:
+            return
+        self.covered = None
+        renderer.win.blit(renderer.background, rect, rect)
+        renderer.dirty.append(rect)
+        last_col = min((rect.right - renderer.x) // BOX, renderer.num_col - 1)
+        last_row = min((rect.bottom - renderer.y) // BOX, renderer.num_row - 1)
+        for row in range(0, last_row + 1):
+            for col in range(0, last_col + 1):
+                renderer.refresh(state, col, row)